@@ -0,0 +1,431 @@
+"""
+Algorithmic execution engine.
+
+Parent orders are sliced into child orders on one asyncio scheduler:
+
+- twap:    child orders follow a linear schedule over the duration
+- pov:     child size tracks a share of the market volume seen on the
+           Binance aggTrade stream since the last slice
+- iceberg: one child of display size rests at the limit price and is
+           replaced as soon as it fills
+
+Every tick, expired children are pulled with one batched cancel, then the
+children due across all parent orders go out as one batched order action,
+so dozens of parents cost one or two round-trips per tick. A cancelled
+child's size is only re-sliced once the cancel is confirmed, and a child
+the venue reports filled stays outstanding until the fill feed confirms
+it, so a lagging feed can't overfill the parent. Fills are tracked per
+child order id, and each parent reports its slippage against the arrival
+price.
+
+The venue only has to provide async bulk_orders / bulk_cancel / ask_bid, the
+hyperliquid-bots AsyncHyperliquid client is used when run as a script.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+
+from websockets import connect
+
+import loop_backend
+
+# Scheduler settings
+TICK_INTERVAL = 0.5  # seconds between scheduler passes
+CHILD_TTL = 10  # seconds before an unfilled child is cancelled and re-sliced
+CROSS_BPS = 2  # children go this far through the touch
+MIN_CHILD_USD = 11  # hyperliquid rejects orders under $10
+DONE_EPSILON = 1e-9
+MAX_SEEN_FILLS = 5000
+MAX_EARLY_FILLS = 1000  # fills for oids we haven't seen an order response for yet
+
+websocket_url_base = "wss://fstream.binance.com/ws/"
+
+_parent_ids = itertools.count(1)
+
+
+def order_statuses(response):
+    try:
+        return response['response']['data']['statuses']
+    except (KeyError, TypeError):
+        return []
+
+
+class ParentOrder:
+    def __init__(self, coin, is_buy, size, mode="twap", duration=300, slice_interval=10,
+                 participation=0.1, display_size=None, limit_px=None, reduce_only=False):
+        self.id = next(_parent_ids)
+        self.coin = coin
+        self.is_buy = is_buy
+        self.size = size
+        self.mode = mode
+        self.duration = duration
+        self.slice_interval = slice_interval
+        self.participation = participation
+        self.display_size = display_size
+        self.limit_px = limit_px
+        self.reduce_only = reduce_only
+
+        self.arrival_px = None
+        self.started = None
+        self.finished = None
+        self.next_slice = 0
+        self.filled = 0.0
+        self.filled_notional = 0.0
+        self.outstanding = 0.0  # size resting in live children
+        self.market_volume = 0.0  # aggTrade volume since start, used by pov
+        self.done = asyncio.Event()
+
+    @property
+    def remaining(self):
+        return max(self.size - self.filled, 0.0)
+
+    @property
+    def avg_px(self):
+        return self.filled_notional / self.filled if self.filled else None
+
+    @property
+    def slippage_bps(self):
+        """Positive means we paid more (buy) / received less (sell) than arrival"""
+        if not self.filled or not self.arrival_px:
+            return None
+        diff = (self.avg_px - self.arrival_px) / self.arrival_px * 10000
+        return diff if self.is_buy else -diff
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "coin": self.coin,
+            "side": "BUY" if self.is_buy else "SELL",
+            "mode": self.mode,
+            "size": self.size,
+            "filled": self.filled,
+            "avg_px": self.avg_px,
+            "arrival_px": self.arrival_px,
+            "slippage_bps": self.slippage_bps,
+            "elapsed": (self.finished or time.time()) - self.started if self.started else 0,
+        }
+
+
+class ChildOrder:
+    __slots__ = ("oid", "parent_id", "size", "px", "placed_at", "awaiting_feed")
+
+    def __init__(self, oid, parent_id, size, px, placed_at, awaiting_feed=False):
+        self.oid = oid
+        self.parent_id = parent_id
+        self.size = size  # not yet seen filled
+        self.px = px
+        self.placed_at = placed_at
+        # filled per the venue, still outstanding until the fill feed confirms it
+        self.awaiting_feed = awaiting_feed
+
+
+class ExecutionEngine:
+    def __init__(self, venue, tick_interval=TICK_INTERVAL, child_ttl=CHILD_TTL,
+                 cross_bps=CROSS_BPS, use_fill_feed=True):
+        self.venue = venue
+        self.tick_interval = tick_interval
+        self.child_ttl = child_ttl
+        self.cross_bps = cross_bps
+        # with a fill feed the fills are counted from it, otherwise from order responses
+        self.use_fill_feed = use_fill_feed
+
+        self.parents = {}
+        self.children = {}  # oid -> ChildOrder
+        # every oid we ever placed, late fills still count after a cancel. None once a
+        # child was settled from its order response, the feed's fills for it are ignored
+        self.oid_parent = {}
+        self.early_fills = OrderedDict()  # oid -> [(size, price)], the feed can beat the order response
+        self.seen_fills = set()
+        self._seen_order = deque()
+        self.should_stop = False
+
+    # ---- inputs ----
+
+    async def submit(self, parent):
+        """Registers a parent order and captures its arrival price"""
+        ask, bid, _ = await self.venue.ask_bid(parent.coin)
+        parent.arrival_px = (ask + bid) / 2
+        parent.started = time.time()
+        self.parents[parent.id] = parent
+        print(f"Parent {parent.id}: {parent.mode.upper()} {'BUY' if parent.is_buy else 'SELL'} "
+              f"{parent.size} {parent.coin} arrival {parent.arrival_px}")
+        return parent
+
+    def on_trade(self, coin, price, quantity):
+        """Market volume from the aggTrade stream, drives pov sizing"""
+        for parent in self.parents.values():
+            if parent.coin == coin and parent.mode == "pov":
+                parent.market_volume += quantity
+
+    def on_fill(self, fill):
+        """Hyperliquid userFills entry (oid, px, sz, tid)"""
+        tid = fill.get("tid")
+        if tid in self.seen_fills:
+            return
+        self.seen_fills.add(tid)
+        self._seen_order.append(tid)
+        if len(self._seen_order) > MAX_SEEN_FILLS:
+            self.seen_fills.discard(self._seen_order.popleft())
+        self._record_fill(fill["oid"], float(fill["sz"]), float(fill["px"]))
+
+    def on_user_fills(self, data):
+        if data.get("isSnapshot"):
+            return
+        for fill in data.get("fills", []):
+            self.on_fill(fill)
+
+    def _record_fill(self, oid, size, price):
+        if oid not in self.oid_parent:
+            # not ours, or its order response hasn't come back yet
+            self.early_fills.setdefault(oid, []).append((size, price))
+            if len(self.early_fills) > MAX_EARLY_FILLS:
+                self.early_fills.popitem(last=False)
+            return
+        parent = self.parents.get(self.oid_parent[oid])
+        if parent is None:
+            return
+
+        parent.filled += size
+        parent.filled_notional += size * price
+
+        child = self.children.get(oid)
+        if child is not None:
+            child.size -= size
+            parent.outstanding = max(parent.outstanding - size, 0.0)
+            if child.size <= DONE_EPSILON:
+                del self.children[oid]
+
+        if parent.remaining <= DONE_EPSILON:
+            self._finish(parent)
+
+    def _add_child(self, parent, oid, size, px, now, awaiting_feed=False):
+        self.oid_parent[oid] = parent.id
+        self.children[oid] = ChildOrder(oid, parent.id, size, px, now, awaiting_feed)
+        parent.outstanding += size
+        for fill_size, fill_px in self.early_fills.pop(oid, ()):
+            self._record_fill(oid, fill_size, fill_px)
+
+    def _settle(self, child):
+        """Counts a fill the feed never confirmed from what the venue told us, later feed fills are ignored"""
+        parent = self.parents[child.parent_id]
+        print(f"Parent {parent.id} child {child.oid}: no fill feed after {self.child_ttl}s, "
+              f"counting {child.size} {parent.coin} at {child.px}")
+        self._record_fill(child.oid, child.size, child.px)
+        self.children.pop(child.oid, None)
+        self.oid_parent[child.oid] = None
+
+    async def _cancel(self, children, now):
+        """
+        Cancels children in one action, their size is only released once the venue confirms.
+        Children without a status in the response stay live and are tried again next tick.
+        """
+        response = await self.venue.bulk_cancel([(self.parents[c.parent_id].coin, c.oid) for c in children])
+        statuses = order_statuses(response)
+        for child, status in zip(children, statuses):
+            if self.children.get(child.oid) is not child:
+                continue  # filled in full while the cancel was out
+            if status == "success":
+                parent = self.parents[child.parent_id]
+                parent.outstanding = max(parent.outstanding - child.size, 0.0)
+                del self.children[child.oid]
+            elif "error" in status:
+                # most likely filled before the cancel landed, keep it outstanding until the feed says
+                child.awaiting_feed = True
+                child.placed_at = now
+
+    def _finish(self, parent):
+        if parent.done.is_set():
+            return
+        parent.finished = time.time()
+        parent.done.set()
+        s = parent.summary()
+        slippage = f"{s['slippage_bps']:.2f}bps" if s['slippage_bps'] is not None else "n/a"
+        print(f"Parent {parent.id} done: {s['filled']}/{s['size']} {parent.coin} "
+              f"avg {s['avg_px']} vs arrival {s['arrival_px']} slippage {slippage} in {s['elapsed']:.1f}s")
+
+    # ---- slicing ----
+
+    def _child_size(self, parent, now):
+        if parent.mode == "iceberg":
+            if parent.outstanding > DONE_EPSILON:
+                return 0.0
+            return min(parent.display_size or parent.size, parent.remaining)
+
+        if now < parent.next_slice:
+            return 0.0
+        parent.next_slice = now + parent.slice_interval
+
+        if parent.mode == "twap":
+            progress = min((now - parent.started) / parent.duration, 1.0)
+            target = parent.size * progress
+        elif parent.mode == "pov":
+            target = min(parent.market_volume * parent.participation, parent.size)
+        else:
+            raise ValueError(f"Unknown execution mode {parent.mode}")
+
+        return min(max(target - parent.filled - parent.outstanding, 0.0), parent.remaining - parent.outstanding)
+
+    def _child_price(self, parent, ask, bid):
+        if parent.mode == "iceberg" and parent.limit_px is not None:
+            return parent.limit_px
+        if parent.is_buy:
+            px = ask * (1 + self.cross_bps / 10000)
+            return min(px, parent.limit_px) if parent.limit_px else px
+        px = bid * (1 - self.cross_bps / 10000)
+        return max(px, parent.limit_px) if parent.limit_px else px
+
+    async def _prices(self, coins):
+        books = await asyncio.gather(*(self.venue.ask_bid(coin) for coin in coins), return_exceptions=True)
+        return {coin: book[:2] for coin, book in zip(coins, books) if not isinstance(book, Exception)}
+
+    async def tick(self):
+        """One scheduler pass over every live parent order"""
+        now = time.time()
+
+        # children past their ttl get pulled in one cancel, their size is re-sliced once it's confirmed
+        cancels = []
+        for child in list(self.children.values()):
+            if now - child.placed_at <= self.child_ttl:
+                continue
+            if child.awaiting_feed:
+                self._settle(child)
+                continue
+            parent = self.parents[child.parent_id]
+            # an iceberg at its limit price is meant to sit there
+            pinned = parent.mode == "iceberg" and parent.limit_px is not None
+            if not pinned or parent.done.is_set():
+                cancels.append(child)
+
+        live = [p for p in self.parents.values() if not p.done.is_set()]
+        for parent in live:
+            if now > parent.started + parent.duration * 2 and parent.mode != "iceberg":
+                print(f"Parent {parent.id} expired with {parent.remaining} {parent.coin} unfilled")
+                cancels += [child for child in self.children.values()
+                            if child.parent_id == parent.id and not child.awaiting_feed and child not in cancels]
+                self._finish(parent)
+
+        if cancels:
+            await self._cancel(cancels, now)
+
+        due = [(p, self._child_size(p, now)) for p in live if not p.done.is_set()]
+        due = [(p, size) for p, size in due if size > DONE_EPSILON]
+
+        prices = await self._prices(sorted({p.coin for p, _ in due})) if due else {}
+        orders, placed = [], []
+        for parent, size in due:
+            if parent.coin not in prices:
+                continue
+            px = self._child_price(parent, *prices[parent.coin])
+            min_size = MIN_CHILD_USD / px
+            available = parent.remaining - parent.outstanding
+            if size * px < MIN_CHILD_USD:
+                if available >= min_size:
+                    size = min_size  # small slices go out at the venue minimum
+                elif parent.outstanding > DONE_EPSILON:
+                    continue  # what's left fits in the live children
+                else:
+                    print(f"Parent {parent.id} done with {parent.remaining} {parent.coin} left, "
+                          f"under the ${MIN_CHILD_USD} minimum order")
+                    self._finish(parent)
+                    continue
+            if 0 < available - size < min_size:
+                size = available  # a remainder under the minimum could never go out on its own
+            orders.append({
+                "coin": parent.coin,
+                "is_buy": parent.is_buy,
+                "sz": size,
+                "limit_px": px,
+                "order_type": {"limit": {"tif": "Gtc"}},
+                "reduce_only": parent.reduce_only,
+            })
+            placed.append((parent, size, px))
+
+        if not orders:
+            return
+        order_response = await self.venue.bulk_orders(orders)
+
+        for (parent, size, px), status in zip(placed, order_statuses(order_response)):
+            if "resting" in status:
+                self._add_child(parent, status["resting"]["oid"], size, px, now)
+            elif "filled" in status:
+                oid = status["filled"]["oid"]
+                filled_size, avg_px = float(status["filled"]["totalSz"]), float(status["filled"]["avgPx"])
+                if self.use_fill_feed:
+                    self._add_child(parent, oid, filled_size, avg_px, now, awaiting_feed=True)
+                else:
+                    self.oid_parent[oid] = parent.id
+                    self._record_fill(oid, filled_size, avg_px)
+            elif "error" in status:
+                print(f"Parent {parent.id} child rejected: {status['error']}")
+
+    async def run(self):
+        while not self.should_stop:
+            started = time.time()
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Error in execution scheduler: {e}")
+            await asyncio.sleep(max(self.tick_interval - (time.time() - started), 0))
+
+    def stop(self):
+        self.should_stop = True
+
+
+async def binance_volume_stream(engine, coin):
+    """Feeds aggTrade volume for coin into the engine, for pov parents"""
+    uri = f"{websocket_url_base}{coin.lower()}usdt@aggTrade"
+    while not engine.should_stop:
+        try:
+            async with connect(uri, ping_interval=20, ping_timeout=20) as websocket:
+                while not engine.should_stop:
+                    data = json.loads(await websocket.recv())
+                    engine.on_trade(coin, float(data["p"]), float(data["q"]))
+        except Exception as e:
+            print(f"{coin} volume stream error: {e}")
+            await asyncio.sleep(5)
+
+
+async def main():
+    """Example: TWAP buy, POV sell and an iceberg running side by side on Hyperliquid"""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hyperliquid-bots"))
+    import eth_account
+    from dotenv import load_dotenv
+    from async_funcs import AsyncHyperliquid
+    from hl_ws import HyperliquidStream
+
+    load_dotenv()
+    account = eth_account.Account.from_key(os.getenv("PH_SECRET_KEY"))
+
+    async with AsyncHyperliquid(account) as venue:
+        engine = ExecutionEngine(venue)
+        stream = HyperliquidStream()
+        stream.subscribe({"type": "userFills", "user": account.address}, engine.on_user_fills)
+
+        parents = [
+            ParentOrder("ETH", True, 0.05, mode="twap", duration=120, slice_interval=15),
+            ParentOrder("SOL", False, 1.0, mode="pov", duration=300, participation=0.01),
+            ParentOrder("BTC", True, 0.001, mode="iceberg", display_size=0.0002),
+        ]
+        for parent in parents:
+            await engine.submit(parent)
+
+        tasks = [
+            asyncio.create_task(stream.run()),
+            asyncio.create_task(engine.run()),
+            asyncio.create_task(binance_volume_stream(engine, "SOL")),
+        ]
+        await asyncio.gather(*(p.done.wait() for p in parents))
+
+        engine.stop()
+        stream.stop()
+        for task in tasks:
+            task.cancel()
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
@@ -0,0 +1,327 @@
+"""
+Bulk importer for Binance's public USD-M futures archives (data.binance.vision).
+
+Reads the daily and monthly zip files straight from a local directory:
+
+    BTCUSDT-aggTrades-2024-01.zip          monthly aggTrades
+    BTCUSDT-aggTrades-2024-02-01.zip       daily aggTrades
+    BTCUSDT-liquidationSnapshot-2023-01-01.zip
+
+Zips are decompressed as a stream and cut into chunks on line boundaries;
+chunks are parsed with NumPy in a process pool while the next ones are being
+read, and results come back in file order. Output goes into the same
+storage the live sinks use:
+
+    --sink trades   recent_trades.csv format, filtered by --min-usd
+    --sink bars     bars.py binary bar store (1s built per chunk, higher resolutions cascaded)
+    --sink liqs     liqs.csv format
+
+Trades already present in the output (by aggregate trade ID, or for bars by
+time) and overlaps between monthly and daily files are skipped, so the same
+directory can be imported again after new files are added.
+
+    python archive_import.py ~/binance-archives --sink bars
+"""
+
+import argparse
+import csv
+import glob
+import io
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bars import BAR_DTYPE, Bar, BarAggregator, BarStore
+
+# Import settings
+CHUNK_BYTES = 16 * 1024 * 1024
+MAX_IN_FLIGHT = 2  # chunks queued per worker
+DEFAULT_OUTPUTS = {"trades": "recent_trades.csv", "bars": "bars", "liqs": "liqs.csv"}
+DEFAULT_MIN_USD = {"trades": 15000, "bars": 0, "liqs": 0}
+END_OF_TIME = 2 ** 62  # closes every open bar
+
+ARCHIVE_PATTERN = re.compile(r"^([A-Z0-9]+)-(aggTrades|liquidationSnapshot)-(\d{4}-\d{2}(?:-\d{2})?)\.zip$")
+
+TRADES_HEADER = "Event Time,Symbol,Aggregate Trade ID,Price,Quantity,First Trade ID,Trade Time,Is Buyer Maker,USD Size\n"
+LIQS_HEADER = ",".join([
+    "symbol", "side", "order_type", "time_in_force",
+    "original_quantity", "price", "average_price", "order_status",
+    "order_last_filled_quantity", "order_last_accumulated_quantity",
+    "order_trade_time", "usd_size"
+]) + "\n"
+
+AGG_TRADE_DTYPE = np.dtype([
+    ("id", "<i8"),
+    ("price", "<f8"),
+    ("quantity", "<f8"),
+    ("first_id", "<i8"),
+    ("last_id", "<i8"),
+    ("time", "<i8"),
+    ("is_buyer_maker", "?"),
+])
+
+
+def find_archives(directory):
+    """{kind: [(symbol, period, path)]} sorted by symbol then date, monthly before its dailies"""
+    archives = {"aggTrades": [], "liquidationSnapshot": []}
+    for path in glob.glob(os.path.join(directory, "**", "*.zip"), recursive=True):
+        match = ARCHIVE_PATTERN.match(os.path.basename(path))
+        if match:
+            symbol, kind, period = match.groups()
+            archives[kind].append((symbol, period, path))
+    for entries in archives.values():
+        entries.sort()
+    return archives
+
+
+def read_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """Decompressed CSV from the zip in chunks that end on a line boundary, header removed"""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(archive.namelist()[0]) as f:
+            remainder = b""
+            first = True
+            while True:
+                data = f.read(chunk_bytes)
+                if not data:
+                    break
+                data = remainder + data
+                cut = data.rfind(b"\n") + 1
+                chunk, remainder = data[:cut], data[cut:]
+                if first:
+                    first = False
+                    if chunk[:1] and not chunk[:1].isdigit():
+                        chunk = chunk[chunk.find(b"\n") + 1:]
+                if chunk:
+                    yield chunk
+            if remainder.strip():
+                yield remainder
+
+
+# ---- worker side ----
+
+def parse_agg_trades(chunk):
+    """aggTrades CSV rows: agg_trade_id,price,quantity,first_trade_id,last_trade_id,transact_time,is_buyer_maker"""
+    chunk = chunk.replace(b"true", b"1").replace(b"false", b"0").replace(b"True", b"1").replace(b"False", b"0")
+    columns = np.loadtxt(io.BytesIO(chunk), delimiter=",", dtype=np.float64, ndmin=2)
+    trades = np.empty(len(columns), dtype=AGG_TRADE_DTYPE)
+    for i, name in enumerate(AGG_TRADE_DTYPE.names):
+        trades[name] = columns[:, i]
+    return trades
+
+
+def one_second_bars(trades):
+    """1s bars (BAR_DTYPE) from time-ordered trades"""
+    if not len(trades):
+        return np.empty(0, dtype=BAR_DTYPE)
+    seconds = trades["time"] - trades["time"] % 1000
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(seconds)) + 1))
+    ends = np.append(starts[1:], len(trades)) - 1
+
+    price = trades["price"]
+    quantity = trades["quantity"]
+    buy_quantity = np.where(trades["is_buyer_maker"], 0.0, quantity)
+
+    bars = np.empty(len(starts), dtype=BAR_DTYPE)
+    bars["start"] = seconds[starts]
+    bars["open"] = price[starts]
+    bars["high"] = np.maximum.reduceat(price, starts)
+    bars["low"] = np.minimum.reduceat(price, starts)
+    bars["close"] = price[ends]
+    bars["volume"] = np.add.reduceat(quantity, starts)
+    bars["buy_volume"] = np.add.reduceat(buy_quantity, starts)
+    bars["sell_volume"] = bars["volume"] - bars["buy_volume"]
+    bars["quote_volume"] = np.add.reduceat(price * quantity, starts)
+    bars["trades"] = ends - starts + 1
+    return bars
+
+
+def process_trade_chunk(chunk, sink, min_usd, after_id, after_time):
+    """(rows parsed, rows already imported, highest trade ID, output array) for one chunk"""
+    trades = parse_agg_trades(chunk)
+    rows = len(trades)
+    highest = int(trades["id"].max()) if rows else after_id
+    trades = trades[(trades["id"] > after_id) & (trades["time"] >= after_time)]
+    duplicates = rows - len(trades)
+    if sink == "bars":
+        return rows, duplicates, highest, one_second_bars(trades)
+    if min_usd:
+        trades = trades[trades["price"] * trades["quantity"] >= min_usd]
+    return rows, duplicates, highest, trades
+
+
+def parse_liquidation_file(path):
+    """liquidationSnapshot rows: time,side,order_type,time_in_force,original_quantity,price,
+    average_price,order_status,last_fill_quantity,accumulated_fill_quantity"""
+    rows = []
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(archive.namelist()[0]) as f:
+            for row in csv.reader(io.TextIOWrapper(f)):
+                if row and row[0].isdigit():
+                    rows.append(row)
+    return rows
+
+
+# ---- importer ----
+
+class ArchiveImporter:
+    def __init__(self, directory, sink="trades", output=None, min_usd=None, workers=None):
+        self.directory = directory
+        self.sink = sink
+        self.output = output or DEFAULT_OUTPUTS[sink]
+        self.min_usd = DEFAULT_MIN_USD[sink] if min_usd is None else min_usd
+        self.workers = workers or os.cpu_count()
+        self.stats = {"files": 0, "rows": 0, "written": 0, "skipped": 0}
+
+    def run(self):
+        start = time.time()
+        archives = find_archives(self.directory)
+        with ProcessPoolExecutor(self.workers) as executor:
+            if self.sink == "liqs":
+                self.import_liquidations(archives["liquidationSnapshot"], executor)
+            elif self.sink == "bars":
+                self.import_bars(archives["aggTrades"], executor)
+            else:
+                self.import_trades(archives["aggTrades"], executor)
+        self.stats["seconds"] = round(time.time() - start, 1)
+        return self.stats
+
+    # ---- aggTrades ----
+
+    def _existing_trade_ids(self):
+        """{symbol: sorted aggregate trade IDs} already in the output CSV"""
+        ids = {}
+        if not os.path.exists(self.output):
+            with open(self.output, "w") as f:
+                f.write(TRADES_HEADER)
+            return ids
+        with open(self.output) as f:
+            for row in csv.DictReader(f):
+                try:
+                    ids.setdefault(row["Symbol"], []).append(int(row["Aggregate Trade ID"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return {symbol: np.unique(values) for symbol, values in ids.items()}
+
+    def _chunk_results(self, path, executor, after_id, after_time):
+        """Results for every chunk of path in order, keeping a bounded number of chunks in flight"""
+        pending = deque()
+        for chunk in read_chunks(path):
+            pending.append(executor.submit(process_trade_chunk, chunk, self.sink, self.min_usd, after_id, after_time))
+            if len(pending) >= self.workers * MAX_IN_FLIGHT:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _results(self, archives, executor, after_times=None):
+        """(symbol, chunk output) for every chunk of every archive in file order"""
+        last_ids = {}
+        for symbol, _, path in archives:
+            after_id = last_ids.get(symbol, -1)
+            after_time = after_times.get(symbol, 0) if after_times else 0
+            print(f"Importing {os.path.basename(path)}...")
+            for rows, duplicates, highest, result in self._chunk_results(path, executor, after_id, after_time):
+                self.stats["rows"] += rows
+                self.stats["skipped"] += duplicates
+                last_ids[symbol] = max(last_ids.get(symbol, -1), highest)
+                yield symbol, result
+            self.stats["files"] += 1
+
+    def import_trades(self, archives, executor):
+        existing = self._existing_trade_ids()
+        with open(self.output, "a") as f:
+            for symbol, trades in self._results(archives, executor):
+                self._write_trades(f, symbol, trades, existing.get(symbol))
+
+    def import_bars(self, archives, executor):
+        store = BarStore(self.output)
+        aggregator = BarAggregator(store)
+        after_times = {}
+        for symbol in {symbol for symbol, _, _ in archives}:
+            stored = store.load(symbol, 1, mmap=True)
+            if len(stored):
+                after_times[symbol] = int(stored["start"][-1]) + 1000
+
+        current = None
+        for symbol, bars in self._results(archives, executor, after_times):
+            if symbol != current:
+                if current is not None:
+                    aggregator.builder(current).flush(END_OF_TIME)
+                current = symbol
+            builder = aggregator.builder(symbol)
+            for record in bars.tolist():
+                builder.on_bar(Bar(*record))
+            self.stats["written"] += len(bars)
+        if current is not None:
+            aggregator.builder(current).flush(END_OF_TIME)
+        store.flush()
+
+    def _write_trades(self, f, symbol, trades, existing_ids):
+        if existing_ids is not None and len(existing_ids):
+            duplicate = np.isin(trades["id"], existing_ids)
+            self.stats["skipped"] += int(duplicate.sum())
+            trades = trades[~duplicate]
+        lines = []
+        for agg_id, price, quantity, first_id, _, trade_time, is_buyer_maker in trades.tolist():
+            lines.append(f"{trade_time},{symbol},{agg_id},{price},{quantity},{first_id},"
+                         f"{trade_time},{is_buyer_maker},{price * quantity:.2f}\n")
+        f.writelines(lines)
+        self.stats["written"] += len(lines)
+
+    # ---- liquidations ----
+
+    def import_liquidations(self, archives, executor):
+        seen = set()
+        if os.path.exists(self.output):
+            with open(self.output) as f:
+                for row in csv.DictReader(f):
+                    seen.add((row["symbol"], row["order_trade_time"], row["side"], row["price"],
+                              row["order_last_accumulated_quantity"]))
+        else:
+            with open(self.output, "w") as f:
+                f.write(LIQS_HEADER)
+
+        paths = [path for _, _, path in archives]
+        with open(self.output, "a") as f:
+            for (symbol, _, path), rows in zip(archives, executor.map(parse_liquidation_file, paths)):
+                coin = symbol.replace("USDT", "")
+                for (trade_time, side, order_type, time_in_force, original_quantity, price,
+                     average_price, order_status, last_filled, accumulated) in rows:
+                    self.stats["rows"] += 1
+                    key = (coin, trade_time, side, price, accumulated)
+                    if key in seen:
+                        self.stats["skipped"] += 1
+                        continue
+                    seen.add(key)
+                    usd_size = float(accumulated) * float(price)
+                    if usd_size < self.min_usd:
+                        continue
+                    f.write(",".join([coin, side, order_type, time_in_force, original_quantity, price,
+                                      average_price, order_status, last_filled, accumulated,
+                                      trade_time, str(usd_size)]) + "\n")
+                    self.stats["written"] += 1
+                self.stats["files"] += 1
+                print(f"Imported {os.path.basename(path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Binance aggTrades / liquidationSnapshot archives")
+    parser.add_argument("directory", help="directory holding the downloaded .zip archives")
+    parser.add_argument("--sink", choices=sorted(DEFAULT_OUTPUTS), default="trades")
+    parser.add_argument("--output", help="output CSV or bar store directory (default depends on --sink)")
+    parser.add_argument("--min-usd", type=float, help="skip trades / liquidations below this USD size")
+    parser.add_argument("--workers", type=int, help="parser processes (default: all cores)")
+    args = parser.parse_args()
+
+    importer = ArchiveImporter(args.directory, args.sink, args.output, args.min_usd, args.workers)
+    stats = importer.run()
+    print(f"Imported {stats['files']} files: {stats['rows']:,} rows read, {stats['written']:,} written, "
+          f"{stats['skipped']:,} duplicates skipped in {stats['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
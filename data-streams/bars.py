@@ -0,0 +1,307 @@
+"""
+Multi-resolution OHLCV bar builder fed by aggTrade streams.
+
+Trades only ever touch the 1s bar. When a 1s bar closes it is folded into
+the live 1m bar, a closed 1m bar into the 5m bar, and so on up to 4h, so
+the higher resolutions are built incrementally and never re-aggregated
+from trades. Bars carry buy/sell volume (taker side) and trade counts.
+
+A bar that has closed is never reopened. A trade or child bar that arrives
+after its period closed is folded into the earliest bar still open at that
+resolution, and counted in late_trades / late_bars, so every file stays
+strictly increasing in start time.
+
+Closed bars are appended to one compact binary file per symbol and
+resolution (fixed-size NumPy records), which loads back with
+np.fromfile / np.memmap:
+
+    bars = BarStore("bars").load("BTCUSDT", 60)
+"""
+
+import asyncio
+import os
+import time
+
+import numpy as np
+
+import loop_backend
+
+# Resolutions in seconds, each one has to divide the next
+RESOLUTIONS = [1, 60, 300, 3600, 14400]
+RESOLUTION_NAMES = {1: "1s", 60: "1m", 300: "5m", 3600: "1h", 14400: "4h"}
+
+# Store settings
+BARS_DIRECTORY = "bars"
+STORE_FLUSH_SIZE = 1000  # bars buffered per file before writing
+FLUSH_INTERVAL = 1  # seconds between idle-bar flushes
+FLUSH_GRACE_MS = 2000  # a bar is only flushed this long after its period ends, for trades still in flight
+
+BAR_DTYPE = np.dtype([
+    ("start", "<i8"),  # ms since epoch, UTC aligned
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+    ("buy_volume", "<f8"),
+    ("sell_volume", "<f8"),
+    ("quote_volume", "<f8"),
+    ("trades", "<i4"),
+])
+
+
+class Bar:
+    __slots__ = ("start", "open", "high", "low", "close", "volume",
+                 "buy_volume", "sell_volume", "quote_volume", "trades")
+
+    def __init__(self, start, open_, high, low, close, volume, buy_volume, sell_volume, quote_volume, trades):
+        self.start = start
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.buy_volume = buy_volume
+        self.sell_volume = sell_volume
+        self.quote_volume = quote_volume
+        self.trades = trades
+
+    def merge(self, other):
+        """Folds a later bar into this one"""
+        if other.high > self.high:
+            self.high = other.high
+        if other.low < self.low:
+            self.low = other.low
+        self.close = other.close
+        self.volume += other.volume
+        self.buy_volume += other.buy_volume
+        self.sell_volume += other.sell_volume
+        self.quote_volume += other.quote_volume
+        self.trades += other.trades
+
+    def as_record(self):
+        return (self.start, self.open, self.high, self.low, self.close, self.volume,
+                self.buy_volume, self.sell_volume, self.quote_volume, self.trades)
+
+
+class BarStore:
+    def __init__(self, directory=BARS_DIRECTORY, flush_size=STORE_FLUSH_SIZE):
+        self.directory = directory
+        self.flush_size = flush_size
+        self.buffers = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol, resolution):
+        return os.path.join(self.directory, f"{symbol}_{RESOLUTION_NAMES.get(resolution, resolution)}.bin")
+
+    def append(self, symbol, resolution, bar):
+        key = (symbol, resolution)
+        buffer = self.buffers.setdefault(key, [])
+        buffer.append(bar.as_record())
+        if len(buffer) >= self.flush_size:
+            self._write(key)
+
+    def _write(self, key):
+        buffer = self.buffers.get(key)
+        if not buffer:
+            return
+        with open(self.path(*key), "ab") as f:
+            np.array(buffer, dtype=BAR_DTYPE).tofile(f)
+        buffer.clear()
+
+    def flush(self):
+        for key in list(self.buffers):
+            self._write(key)
+
+    def load(self, symbol, resolution, start=None, end=None, mmap=False):
+        """Bars for symbol at resolution (seconds), optionally limited to [start, end) in ms"""
+        path = self.path(symbol, resolution)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            bars = np.empty(0, dtype=BAR_DTYPE)
+        elif mmap:
+            bars = np.memmap(path, dtype=BAR_DTYPE, mode="r")
+        else:
+            bars = np.fromfile(path, dtype=BAR_DTYPE)
+
+        if start is not None or end is not None:
+            lo = np.searchsorted(bars["start"], start) if start is not None else 0
+            hi = np.searchsorted(bars["start"], end) if end is not None else len(bars)
+            bars = bars[lo:hi]
+        return bars
+
+
+class BarBuilder:
+    def __init__(self, symbol, store=None, resolutions=RESOLUTIONS, listeners=None):
+        self.symbol = symbol
+        self.store = store
+        self.resolutions = resolutions
+        self.periods = [r * 1000 for r in resolutions]
+        self.live = [None] * len(resolutions)
+        self.closed = [None] * len(resolutions)  # start of the last closed bar per level
+        self.listeners = listeners or []
+        self.late_trades = 0
+        self.late_bars = 0
+
+    def _earliest_open(self, level):
+        """Start of the earliest bar that may still be open at level, None before the first bar"""
+        bar = self.live[level]
+        if bar is not None:
+            return bar.start
+        if self.closed[level] is not None:
+            return self.closed[level] + self.periods[level]
+        return None
+
+    def on_trade(self, trade_time, price, quantity, is_buyer_maker):
+        """One aggTrade, trade_time in ms"""
+        start = trade_time - trade_time % 1000
+        earliest = self._earliest_open(0)
+        if earliest is not None and start < earliest:
+            # arrived after its second closed, fold it into the first one still open
+            self.late_trades += 1
+            start = earliest
+
+        bar = self.live[0]
+        if bar is not None and start != bar.start:
+            self._close(0)
+            bar = None
+
+        buy_qty = 0.0 if is_buyer_maker else quantity
+        if bar is None:
+            self.live[0] = Bar(start, price, price, price, price, quantity,
+                               buy_qty, quantity - buy_qty, price * quantity, 1)
+            return
+
+        if price > bar.high:
+            bar.high = price
+        elif price < bar.low:
+            bar.low = price
+        bar.close = price
+        bar.volume += quantity
+        bar.buy_volume += buy_qty
+        bar.sell_volume += quantity - buy_qty
+        bar.quote_volume += price * quantity
+        bar.trades += 1
+
+    def on_bar(self, bar):
+        """A finished lowest-resolution bar built elsewhere (e.g. from an archive), in time order"""
+        earliest = self._earliest_open(0)
+        if earliest is not None and bar.start < earliest:
+            self.late_bars += 1
+            bar.start = earliest
+        live = self.live[0]
+        if live is not None:
+            if live.start == bar.start:
+                live.merge(bar)
+                return
+            self._close(0)
+        self.live[0] = bar
+
+    def _close(self, level):
+        bar = self.live[level]
+        self.live[level] = None
+        self.closed[level] = bar.start
+
+        resolution = self.resolutions[level]
+        if self.store is not None:
+            self.store.append(self.symbol, resolution, bar)
+        for listener in self.listeners:
+            listener(self.symbol, resolution, bar)
+
+        if level + 1 < len(self.resolutions):
+            self._absorb(level + 1, bar)
+
+    def _absorb(self, level, child):
+        start = child.start - child.start % self.periods[level]
+        earliest = self._earliest_open(level)
+        if earliest is not None and start < earliest:
+            self.late_bars += 1
+            start = earliest
+        bar = self.live[level]
+        if bar is not None and bar.start != start:
+            self._close(level)
+            bar = None
+
+        if bar is None:
+            self.live[level] = Bar(start, child.open, child.high, child.low, child.close, child.volume,
+                                   child.buy_volume, child.sell_volume, child.quote_volume, child.trades)
+        else:
+            bar.merge(child)
+
+    def flush(self, now_ms, grace_ms=FLUSH_GRACE_MS):
+        """Closes every bar whose period ended more than grace_ms ago, for symbols that have gone quiet"""
+        for level, period in enumerate(self.periods):
+            bar = self.live[level]
+            if bar is not None and bar.start + period + grace_ms <= now_ms:
+                self._close(level)
+
+    def current(self, resolution):
+        """The live bar at resolution including the still-open lower bars, or None"""
+        level = self.resolutions.index(resolution)
+        merged = None
+        for lower in range(level, -1, -1):
+            bar = self.live[lower]
+            if bar is None:
+                continue
+            if merged is None:
+                merged = Bar(*bar.as_record())
+            else:
+                merged.merge(bar)
+        if merged is not None:
+            merged.start -= merged.start % self.periods[level]
+        return merged
+
+
+class BarAggregator:
+    """Bar builders for many symbols sharing one store, plugs into the aggTrade listeners"""
+
+    def __init__(self, store=None, resolutions=RESOLUTIONS):
+        self.store = store
+        self.resolutions = resolutions
+        self.builders = {}
+        self.listeners = []
+
+    def builder(self, symbol):
+        builder = self.builders.get(symbol)
+        if builder is None:
+            builder = self.builders[symbol] = BarBuilder(symbol, self.store, self.resolutions, self.listeners)
+        return builder
+
+    def on_trade(self, symbol, trade_time, price, quantity, is_buyer_maker):
+        self.builder(symbol).on_trade(trade_time, price, quantity, is_buyer_maker)
+
+    def flush(self, now_ms=None, grace_ms=FLUSH_GRACE_MS):
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        for builder in self.builders.values():
+            builder.flush(now_ms, grace_ms)
+        if self.store is not None:
+            self.store.flush()
+
+    async def flush_loop(self, interval=FLUSH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing bars: {e}")
+
+
+async def main():
+    import huge_trades
+
+    store = BarStore()
+    bars = BarAggregator(store)
+    print(f"Building {', '.join(RESOLUTION_NAMES[r] for r in RESOLUTIONS)} bars into {store.directory}/")
+
+    managers = [
+        huge_trades.WebSocketManager(symbol, f"{huge_trades.websocket_url_base}{symbol.lower()}@aggTrade",
+                                     None, listeners=[bars.on_trade])
+        for symbol in huge_trades.symbols
+    ]
+    try:
+        await asyncio.gather(*(manager.run() for manager in managers), bars.flush_loop())
+    finally:
+        store.flush()
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
@@ -0,0 +1,317 @@
+"""
+Cross-venue basis and funding-spread monitor, Binance vs Hyperliquid.
+
+Keeps Binance mark price / funding (from the all-symbol !markPrice@arr@1s
+stream) next to Hyperliquid mid (allMids websocket) and funding
+(metaAndAssetCtxs, polled) for every coin both venues list. State lives in
+NumPy arrays indexed by coin, so each update is a handful of vectorized
+assignments and basis / annualized funding differential are recomputed for
+the whole universe at once.
+
+Binance funding intervals differ per symbol (8h, 4h, 1h). They come from
+/fapi/v1/fundingInfo, polled, and from the mark price stream itself: when
+a symbol's nextFundingTime moves on, the step is its interval. Symbols
+neither source has covered yet are annualized at 8h.
+
+Recorded JSONL fixtures can stand in for both venues:
+
+    python basis_monitor.py --fixture recorded_feeds.jsonl
+
+one line per message: {"venue": "binance" | "hyperliquid", "kind": "marks" | "funding_info" | "mids" | "ctxs", "data": ...}
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+import numpy as np
+from termcolor import cprint
+from websockets import connect
+
+import loop_backend
+
+BINANCE_MARKS_URL = "wss://fstream.binance.com/ws/!markPrice@arr@1s"
+BINANCE_FUNDING_INFO_URL = "https://fapi.binance.com/fapi/v1/fundingInfo"
+HYPERLIQUID_WS_URL = "wss://api.hyperliquid.xyz/ws"
+HYPERLIQUID_INFO_URL = "https://api.hyperliquid.xyz/info"
+
+# Funding settings
+BINANCE_DEFAULT_INTERVAL_HOURS = 8  # until fundingInfo or nextFundingTime says otherwise
+HYPERLIQUID_PERIODS_PER_YEAR = 24 * 365  # hourly funding
+HOURS_PER_YEAR = 24 * 365
+
+# Binance contract multiplier prefixes, longest first: (prefix, hyperliquid prefix, coins per contract).
+# 1000x contracts quote per 1000 coins like hyperliquid's k-coins, 1000000x ones are rescaled to one coin
+CONTRACT_PREFIXES = (("1000000", "", 1000000.0), ("1000", "k", 1.0))
+
+# Display settings
+DISPLAY_INTERVAL = 5  # seconds between rankings
+TOP_N = 15
+CTX_POLL_INTERVAL = 30  # seconds between hyperliquid funding polls
+FUNDING_INFO_POLL_INTERVAL = 3600  # seconds between binance funding interval polls
+INITIAL_CAPACITY = 256
+
+
+def binance_to_coin(symbol):
+    """
+    (hyperliquid coin, Binance price divisor): BTCUSDT -> (BTC, 1), 1000PEPEUSDT -> (kPEPE, 1),
+    1000000BOBUSDT -> (BOB, 1e6). (None, None) for non-USDT pairs
+    """
+    if not symbol.endswith("USDT"):
+        return None, None
+    base = symbol[:-4]
+    for prefix, coin_prefix, divisor in CONTRACT_PREFIXES:
+        if base.startswith(prefix) and len(base) > len(prefix) and not base[len(prefix)].isdigit():
+            return coin_prefix + base[len(prefix):], divisor
+    return base, 1.0
+
+
+class BasisMonitor:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.index = {}
+        self.coins = []
+        self.updates = 0
+        self.latest = None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, "bn_mark", None)
+        fields = ("bn_mark", "bn_funding", "bn_interval_h", "bn_next_funding", "hl_mid", "hl_funding", "hl_mark")
+        for name in fields:
+            array = np.full(capacity, BINANCE_DEFAULT_INTERVAL_HOURS if name == "bn_interval_h" else np.nan)
+            if old is not None:
+                previous = getattr(self, name)
+                array[:len(previous)] = previous
+            setattr(self, name, array)
+
+    def _indices(self, coins):
+        """Array slots for coins, adding new coins (and growing the arrays) as needed"""
+        idx = np.empty(len(coins), dtype=np.intp)
+        for i, coin in enumerate(coins):
+            slot = self.index.get(coin)
+            if slot is None:
+                slot = len(self.coins)
+                if slot >= len(self.bn_mark):
+                    self._allocate(len(self.bn_mark) * 2)
+                self.index[coin] = slot
+                self.coins.append(coin)
+            idx[i] = slot
+        return idx
+
+    # ---- venue updates ----
+
+    def on_binance_marks(self, updates):
+        """!markPrice@arr payload: list of {s, p, r, T, ...}"""
+        coins, marks, divisors, rates, next_funding = [], [], [], [], []
+        for update in updates:
+            coin, divisor = binance_to_coin(update["s"])
+            if coin is None or update.get("r") in (None, ""):
+                continue
+            coins.append(coin)
+            marks.append(update["p"])
+            divisors.append(divisor)
+            rates.append(update["r"])
+            next_funding.append(update.get("T", np.nan))
+        if not coins:
+            return
+
+        idx = self._indices(coins)
+        self.bn_mark[idx] = np.asarray(marks, dtype=np.float64) / np.asarray(divisors)
+        self.bn_funding[idx] = np.asarray(rates, dtype=np.float64)
+
+        # a funding payment went out since the last update: the step to the next one is the interval
+        next_funding = np.asarray(next_funding, dtype=np.float64)
+        previous = self.bn_next_funding[idx]
+        stepped = next_funding > previous  # False while either is nan
+        self.bn_interval_h[idx[stepped]] = np.round((next_funding[stepped] - previous[stepped]) / 3600000)
+        self.bn_next_funding[idx] = np.where(np.isnan(next_funding), previous, next_funding)
+        self._updated()
+
+    def on_binance_funding_info(self, infos):
+        """/fapi/v1/fundingInfo payload: list of {symbol, fundingIntervalHours, ...}, only symbols off the default"""
+        coins, hours = [], []
+        for info in infos:
+            coin, _ = binance_to_coin(info["symbol"])
+            if coin is not None and info.get("fundingIntervalHours"):
+                coins.append(coin)
+                hours.append(info["fundingIntervalHours"])
+        if not coins:
+            return
+        self.bn_interval_h[self._indices(coins)] = np.asarray(hours, dtype=np.float64)
+        self._updated()
+
+    def on_hyperliquid_mids(self, mids):
+        """allMids payload: {coin: mid}"""
+        coins = [c for c in mids if not c.startswith("@")]  # @N are spot pairs
+        if not coins:
+            return
+        idx = self._indices(coins)
+        self.hl_mid[idx] = np.asarray([mids[c] for c in coins], dtype=np.float64)
+        self._updated()
+
+    def on_hyperliquid_ctxs(self, meta, ctxs):
+        """metaAndAssetCtxs payload: meta universe and asset contexts in the same order"""
+        coins = [asset["name"] for asset in meta["universe"]]
+        idx = self._indices(coins)
+        self.hl_funding[idx] = np.asarray([ctx["funding"] for ctx in ctxs], dtype=np.float64)
+        self.hl_mark[idx] = np.asarray([ctx["markPx"] for ctx in ctxs], dtype=np.float64)
+        self._updated()
+
+    def _updated(self):
+        # a full recompute is a few array ops over a few hundred coins, cheaper than tracking what changed
+        self.updates += 1
+        self.latest = self.compute()
+
+    # ---- analytics ----
+
+    def compute(self):
+        """Basis and funding differential for every coin, vectorized over the whole universe"""
+        n = len(self.coins)
+        bn_mark = self.bn_mark[:n]
+        hl_px = np.where(np.isnan(self.hl_mid[:n]), self.hl_mark[:n], self.hl_mid[:n])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            basis_bps = (hl_px - bn_mark) / bn_mark * 10000
+        bn_yearly = self.bn_funding[:n] * (HOURS_PER_YEAR / self.bn_interval_h[:n]) * 100
+        hl_yearly = self.hl_funding[:n] * HYPERLIQUID_PERIODS_PER_YEAR * 100
+        funding_diff = hl_yearly - bn_yearly  # > 0: short hyperliquid / long binance collects
+        shared = ~(np.isnan(basis_bps) | np.isnan(funding_diff))
+
+        return {
+            "basis_bps": basis_bps,
+            "bn_yearly": bn_yearly,
+            "hl_yearly": hl_yearly,
+            "funding_diff": funding_diff,
+            "shared": shared,
+        }
+
+    def rank(self, top_n=TOP_N):
+        """Shared coins ordered by absolute annualized funding differential"""
+        result = self.latest
+        if result is None:
+            return []
+        shared = np.flatnonzero(result["shared"])
+        if not len(shared):
+            return []
+        order = shared[np.argsort(-np.abs(result["funding_diff"][shared]))][:top_n]
+        return [
+            {
+                "coin": self.coins[i],
+                "basis_bps": float(result["basis_bps"][i]),
+                "bn_yearly": float(result["bn_yearly"][i]),
+                "hl_yearly": float(result["hl_yearly"][i]),
+                "funding_diff": float(result["funding_diff"][i]),
+            }
+            for i in order
+        ]
+
+    def print_ranking(self, top_n=TOP_N):
+        ranking = self.rank(top_n)
+        cprint(f"{time.strftime('%H:%M:%S')} basis / funding spread ({len(ranking)} of {int(self.latest['shared'].sum()) if self.latest else 0} shared coins)",
+               "white", "on_black")
+        for row in ranking:
+            direction = "SHORT HL / LONG BN" if row["funding_diff"] > 0 else "LONG HL / SHORT BN"
+            back_color = "on_red" if abs(row["funding_diff"]) > 50 else "on_cyan" if abs(row["funding_diff"]) > 20 else "on_light_green"
+            cprint(f"{row['coin']:>8} basis {row['basis_bps']:7.1f}bps  bn {row['bn_yearly']:7.2f}%  "
+                   f"hl {row['hl_yearly']:7.2f}%  diff {row['funding_diff']:7.2f}%  {direction}", "black", back_color)
+
+
+# ---- live feeds ----
+
+async def binance_marks_feed(monitor):
+    while True:
+        try:
+            async with connect(BINANCE_MARKS_URL, ping_interval=20, ping_timeout=20, max_size=None) as websocket:
+                print("Connected to Binance mark price stream")
+                while True:
+                    monitor.on_binance_marks(json.loads(await websocket.recv()))
+        except Exception as e:
+            print(f"Binance mark price stream error: {e}")
+            await asyncio.sleep(5)
+
+
+async def binance_funding_info_feed(monitor):
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(BINANCE_FUNDING_INFO_URL) as response:
+                    monitor.on_binance_funding_info(await response.json())
+            except Exception as e:
+                print(f"Binance funding info poll error: {e}")
+            await asyncio.sleep(FUNDING_INFO_POLL_INTERVAL)
+
+
+async def hyperliquid_mids_feed(monitor):
+    while True:
+        try:
+            async with connect(HYPERLIQUID_WS_URL, ping_interval=20, ping_timeout=20, max_size=None) as websocket:
+                await websocket.send(json.dumps({"method": "subscribe", "subscription": {"type": "allMids"}}))
+                print("Connected to Hyperliquid mids stream")
+                while True:
+                    msg = json.loads(await websocket.recv())
+                    if msg.get("channel") == "allMids":
+                        monitor.on_hyperliquid_mids(msg["data"]["mids"])
+        except Exception as e:
+            print(f"Hyperliquid mids stream error: {e}")
+            await asyncio.sleep(5)
+
+
+async def hyperliquid_ctx_feed(monitor):
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.post(HYPERLIQUID_INFO_URL, json={"type": "metaAndAssetCtxs"}) as response:
+                    meta, ctxs = await response.json()
+                    monitor.on_hyperliquid_ctxs(meta, ctxs)
+            except Exception as e:
+                print(f"Hyperliquid funding poll error: {e}")
+            await asyncio.sleep(CTX_POLL_INTERVAL)
+
+
+async def replay_fixture(monitor, path, speed=0):
+    """Feeds a recorded JSONL file through the same handlers, speed=0 replays as fast as possible"""
+    handlers = {
+        ("binance", "marks"): monitor.on_binance_marks,
+        ("binance", "funding_info"): monitor.on_binance_funding_info,
+        ("hyperliquid", "mids"): monitor.on_hyperliquid_mids,
+        ("hyperliquid", "ctxs"): lambda data: monitor.on_hyperliquid_ctxs(*data),
+    }
+    with open(path) as f:
+        for line in f:
+            msg = json.loads(line)
+            handlers[(msg["venue"], msg["kind"])](msg["data"])
+            await asyncio.sleep(speed)
+
+
+async def display_loop(monitor):
+    while True:
+        await asyncio.sleep(DISPLAY_INTERVAL)
+        monitor.print_ranking()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Binance vs Hyperliquid basis and funding monitor")
+    parser.add_argument("--fixture", help="replay a recorded JSONL feed instead of connecting")
+    args = parser.parse_args()
+
+    monitor = BasisMonitor()
+    print("Starting cross-venue basis monitor...")
+
+    if args.fixture:
+        await replay_fixture(monitor, args.fixture)
+        monitor.print_ranking()
+        return
+
+    await asyncio.gather(
+        binance_marks_feed(monitor),
+        binance_funding_info_feed(monitor),
+        hyperliquid_mids_feed(monitor),
+        hyperliquid_ctx_feed(monitor),
+        display_loop(monitor),
+    )
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
@@ -0,0 +1,227 @@
+"""
+Ingest benchmark: the stream clients against a local mock Binance server, once per event loop backend.
+
+A mock server process speaks the Binance futures websocket paths
+(<symbol>@aggTrade, !forceOrder@arr, <symbol>@markPrice) on localhost, and
+the real clients connect to it: huge_trades.WebSocketManager with its
+aggregator, liqs.LiquidationMonitor and funding.binance_funding_stream.
+Every message carries its send time in the exchange time field, so latency
+is measured from the server's send to the moment the client hands the
+parsed record on.
+
+Each backend runs in its own process and does two phases. In the
+throughput phase the server sends as fast as it can and the benchmark
+reports msgs/sec. In the latency phase the server paces itself at --rate
+msgs/sec and the benchmark reports p50/p99 latency without queueing in
+the socket buffers. Liquidation times are whole milliseconds in the
+stream format, so their latency has 1 ms resolution.
+
+    python bench_ingest.py
+    python bench_ingest.py --messages 200000 --rate 5000 --backends asyncio uvloop
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import loop_backend
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Benchmark settings
+DEFAULT_MESSAGES = 50000  # per phase, split over all connections
+DEFAULT_RATE = 2000  # msgs/sec across all connections in the latency phase
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"]
+TRADE_SHARE = 0.80
+LIQUIDATION_SHARE = 0.10  # the rest are mark price updates
+PHASE_TIMEOUT = 300  # seconds
+
+BASE_PRICES = {"BTCUSDT": 60000, "ETHUSDT": 3000, "SOLUSDT": 150, "XRPUSDT": 0.6}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stream_counts(messages):
+    """Messages per websocket path"""
+    trades = int(messages * TRADE_SHARE) // len(SYMBOLS)
+    marks = int(messages * (1 - TRADE_SHARE - LIQUIDATION_SHARE)) // len(SYMBOLS)
+    counts = {"!forceOrder@arr": int(messages * LIQUIDATION_SHARE)}
+    for symbol in SYMBOLS:
+        counts[f"{symbol.lower()}@aggTrade"] = trades
+        counts[f"{symbol.lower()}@markPrice"] = marks
+    return counts
+
+
+def mock_message(stream, seq, rng):
+    """One Binance-shaped message stamped with the current time"""
+    now = time.time() * 1000
+    if stream == "!forceOrder@arr":
+        symbol = rng.choice(SYMBOLS)
+        price = BASE_PRICES[symbol] * (1 + rng.gauss(0, 0.01))
+        quantity = rng.lognormvariate(8, 1.5) / price
+        return json.dumps({"e": "forceOrder", "E": int(now), "o": {
+            "s": symbol, "S": rng.choice(("BUY", "SELL")), "o": "LIMIT", "f": "IOC", "q": f"{quantity:.6g}",
+            "p": f"{price:.6g}", "ap": f"{price:.6g}", "X": "FILLED", "l": f"{quantity:.6g}",
+            "z": f"{quantity:.6g}", "T": int(now),
+        }})
+    symbol = stream.split("@")[0].upper()
+    if stream.endswith("@markPrice"):
+        return json.dumps({"e": "markPriceUpdate", "E": now, "s": symbol, "p": f"{BASE_PRICES[symbol]:.6g}",
+                           "r": f"{rng.gauss(0.0001, 0.0001):.8f}", "T": now})
+    price = BASE_PRICES[symbol] * (1 + rng.gauss(0, 0.01))
+    return json.dumps({"e": "aggTrade", "E": now, "s": symbol, "a": seq, "p": f"{price:.6g}",
+                       "q": f"{rng.lognormvariate(8, 2) / price:.6g}", "f": seq * 3, "l": seq * 3 + 2,
+                       "T": now, "m": rng.random() < 0.5})
+
+
+async def serve_mock(port, counts, rate, ready):
+    from websockets import serve
+
+    total = sum(counts.values())
+
+    async def handler(websocket, path=None):
+        stream = (path or websocket.request.path).rsplit("/", 1)[-1]
+        count = counts.get(stream, 0)
+        interval = total / (rate * count) if rate and count else 0  # this stream's share of the rate
+        rng = random.Random(stream)
+        start = time.perf_counter()
+        for seq in range(count):
+            if interval:
+                delay = start + seq * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await websocket.send(mock_message(stream, seq + 1, rng))
+        await websocket.wait_closed()
+
+    async with serve(handler, "127.0.0.1", port, compression=None, max_size=None):
+        ready.set()
+        await asyncio.Future()
+
+
+def mock_server(port, counts, rate, ready):
+    asyncio.run(serve_mock(port, counts, rate, ready))
+
+
+class Recorder:
+    """Latency of every record a client hands on, duck-types EventBus.publish and trade listeners"""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.latencies = []
+        self.first = None
+        self.done = asyncio.Event()
+
+    def _record(self, sent_ms):
+        now = time.time() * 1000
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.latencies.append(now - sent_ms)
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+
+    def on_trade(self, symbol, trade_time, price, quantity, is_buyer_maker):
+        self._record(trade_time)
+
+    def publish(self, record):
+        self._record(record.time)
+
+
+async def drive(port, counts):
+    """Runs the clients against the mock server until every message has come through"""
+    directory = tempfile.mkdtemp(prefix="bench_ingest_")
+    os.chdir(directory)  # the monitors write relative CSV / log paths
+    sys.path.insert(0, HERE)
+    import funding
+    import huge_trades
+    import liqs
+
+    liqs.logger.setLevel(logging.WARNING)
+    recorder = Recorder(sum(counts.values()))
+    base = f"ws://127.0.0.1:{port}/ws/"
+    aggregator = huge_trades.TradeAggregator(os.path.join(directory, "huge_trades.csv"))
+    managers = [
+        huge_trades.WebSocketManager(symbol, f"{base}{symbol.lower()}@aggTrade", aggregator, listeners=[recorder.on_trade])
+        for symbol in SYMBOLS
+    ]
+    monitor = liqs.LiquidationMonitor(bus=recorder, url=f"{base}!forceOrder@arr")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tasks = [asyncio.create_task(manager.run()) for manager in managers]
+        tasks.append(asyncio.create_task(monitor.run()))
+        tasks += [asyncio.create_task(funding.binance_funding_stream(symbol, {"count": 0}, recorder, base))
+                  for symbol in SYMBOLS]
+        try:
+            await asyncio.wait_for(recorder.done.wait(), PHASE_TIMEOUT)
+            elapsed = time.perf_counter() - recorder.first
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = np.array(recorder.latencies)
+    return {
+        "messages": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def client_worker(backend, port, counts, results):
+    results.put(loop_backend.run(drive(port, counts), backend))
+
+
+def run_phase(backend, messages, rate):
+    """One server + client process pair, returns the client's measurements"""
+    context = multiprocessing.get_context("spawn")
+    port = free_port()
+    counts = stream_counts(messages)
+    ready = context.Event()
+    server = context.Process(target=mock_server, args=(port, counts, rate, ready), daemon=True)
+    server.start()
+    try:
+        if not ready.wait(30):
+            raise RuntimeError("Mock server did not start")
+        results = context.Queue()
+        client = context.Process(target=client_worker, args=(backend, port, counts, results))
+        client.start()
+        result = results.get(timeout=PHASE_TIMEOUT + 30)
+        client.join()
+        return result
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream client throughput and latency per event loop backend")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="messages per phase")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="msgs/sec in the latency phase")
+    parser.add_argument("--backends", nargs="+", default=loop_backend.available(), choices=loop_backend.BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10}{'msgs/sec':>12}{'p50 ms':>10}{'p99 ms':>10}   (p50/p99 at {args.rate:,.0f} msgs/sec)")
+    for backend in args.backends:
+        loop_backend.resolve(backend)
+        throughput = run_phase(backend, args.messages, 0)
+        latency = run_phase(backend, args.messages, args.rate)
+        print(f"{backend:<10}{throughput['throughput']:>12,.0f}{latency['p50_ms']:>10.2f}{latency['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Memory benchmark: replays 24h of synthetic Binance traffic through the monitors.
+
+aggTrade, forceOrder and markPrice messages with timestamps spread over the
+last 24 hours are fed through the same code the live streams run: the huge
+trade WebSocketManager/TradeAggregator (with bar and volume profile
+listeners), LiquidationMonitor._process_message and the event bus. Nothing
+touches the network and all output files go to a temporary directory.
+
+The bulk of the replay runs untraced to warm every structure up, then the
+last MEASURED_MESSAGES run under tracemalloc to get the memory each message
+leaves behind. Exits non-zero when retained bytes per message or peak RSS is
+over budget, so it can gate changes to the records and buffers:
+
+    python bench_memory.py
+    python bench_memory.py --messages 2000000 --budget-bytes 32 --budget-rss 300
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Benchmark settings
+DURATION_MS = 24 * 60 * 60 * 1000
+DEFAULT_MESSAGES = 500000
+MEASURED_MESSAGES = 50000
+TRADE_SHARE = 0.90
+LIQUIDATION_SHARE = 0.05  # the rest are mark price updates
+LIQUIDATION_SYMBOLS = 300  # !forceOrder@arr covers the whole universe
+FLUSH_EVERY = 1000  # messages between aggregator / bar flushes
+
+# Regression budgets
+BUDGET_BYTES_PER_MESSAGE = 64  # retained after warmup
+BUDGET_PEAK_RSS_MB = 400
+
+BASE_PRICES = {
+    "BTCUSDT": 60000, "ETHUSDT": 3000, "SOLUSDT": 150, "XRPUSDT": 0.6, "LINKUSDT": 15,
+    "SUIUSDT": 1.5, "HBARUSDT": 0.08, "AAVEUSDT": 100, "OPUSDT": 2,
+}
+
+
+def synthetic_messages(count, seed=0):
+    """(kind, symbol, raw JSON) tuples in time order over the last 24h"""
+    rng = random.Random(seed)
+    symbols = list(BASE_PRICES)
+    liq_symbols = symbols + [f"ALT{i}USDT" for i in range(LIQUIDATION_SYMBOLS - len(symbols))]
+    end = int(time.time() * 1000)
+    start = end - DURATION_MS
+    agg_id = 1
+
+    for i in range(count):
+        now = start + DURATION_MS * i // count
+        roll = rng.random()
+        if roll < TRADE_SHARE:
+            symbol = rng.choice(symbols)
+            price = BASE_PRICES[symbol] * (1 + rng.gauss(0, 0.01))
+            quantity = rng.lognormvariate(8, 2) / price
+            agg_id += 1
+            yield "trade", symbol, json.dumps({
+                "e": "aggTrade", "E": now, "s": symbol, "a": agg_id, "p": f"{price:.6g}",
+                "q": f"{quantity:.6g}", "f": agg_id * 3, "l": agg_id * 3 + 2, "T": now,
+                "m": rng.random() < 0.5,
+            })
+        elif roll < TRADE_SHARE + LIQUIDATION_SHARE:
+            symbol = rng.choice(liq_symbols)
+            price = BASE_PRICES.get(symbol, 1.0) * (1 + rng.gauss(0, 0.01))
+            quantity = rng.lognormvariate(8, 1.5) / price
+            yield "liquidation", symbol, json.dumps({"e": "forceOrder", "E": now, "o": {
+                "s": symbol, "S": rng.choice(("BUY", "SELL")), "o": "LIMIT", "f": "IOC",
+                "q": f"{quantity:.6g}", "p": f"{price:.6g}", "ap": f"{price:.6g}", "X": "FILLED",
+                "l": f"{quantity:.6g}", "z": f"{quantity:.6g}", "T": now,
+            }})
+        else:
+            symbol = rng.choice(symbols)
+            yield "mark", symbol, json.dumps({
+                "e": "markPriceUpdate", "E": now, "s": symbol, "p": f"{BASE_PRICES[symbol]:.6g}",
+                "r": f"{rng.gauss(0.0001, 0.0001):.8f}", "T": now,
+            })
+
+
+class Pipeline:
+    """The monitors wired the way the live scripts wire them, minus the sockets"""
+
+    def __init__(self, directory):
+        os.chdir(directory)  # the monitors write relative CSV / log paths
+        sys.path.insert(0, HERE)
+        import huge_trades
+        import liqs
+        from bars import BarAggregator, BarStore
+        from event_bus import EventBus
+        from records import MarkPrice
+        from volume_profile import ProfileBook
+
+        liqs.logger.setLevel(logging.WARNING)
+        self.mark_price = MarkPrice
+        self.bus = EventBus()
+        self.subscription = self.bus.subscribe()  # never drained, stays at its bound
+        self.bars = BarAggregator(BarStore(os.path.join(directory, "bars")))
+        self.profiles = ProfileBook()
+        self.aggregator = huge_trades.TradeAggregator(os.path.join(directory, "huge_trades.csv"), bus=self.bus)
+        self.managers = {
+            symbol: huge_trades.WebSocketManager(symbol, "", self.aggregator,
+                                                 listeners=[self.bars.on_trade, self.profiles.on_trade])
+            for symbol in BASE_PRICES
+        }
+        self.liquidations = liqs.LiquidationMonitor(bus=self.bus)
+        self.devnull = open(os.devnull, "w")
+
+    async def replay(self, messages):
+        count = 0
+        with contextlib.redirect_stdout(self.devnull):
+            for kind, symbol, raw in messages:
+                if kind == "trade":
+                    await self.managers[symbol].process_message(raw)
+                elif kind == "liquidation":
+                    self.liquidations.message_count += 1
+                    self.liquidations._process_message(raw)
+                else:
+                    self.bus.publish(self.mark_price.from_message(json.loads(raw)))
+
+                count += 1
+                if count % FLUSH_EVERY == 0:
+                    await self.aggregator.check_and_print_trades()
+                    self.liquidations.pipeline.flush()
+                    self.bars.flush(json.loads(raw).get("E"))
+        return count
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+async def run(messages, measured, seed):
+    directory = tempfile.mkdtemp(prefix="bench_memory_")
+    pipeline = Pipeline(directory)
+    stream = synthetic_messages(messages, seed)
+    warmup = max(messages - measured, 0)
+
+    start = time.perf_counter()
+    await pipeline.replay(next(stream) for _ in range(warmup))
+    warmup_seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks()
+    measured = await pipeline.replay(stream)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "directory": directory,
+        "messages": warmup + measured,
+        "throughput": warmup / warmup_seconds if warmup_seconds else 0.0,
+        "bytes_per_message": (current - baseline) / max(measured, 1),
+        "blocks_per_message": (sys.getallocatedblocks() - blocks) / max(measured, 1),
+        "transient_kb": (peak - baseline) / 1024,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="24h synthetic replay memory benchmark")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES)
+    parser.add_argument("--measured", type=int, default=MEASURED_MESSAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-bytes", type=float, default=BUDGET_BYTES_PER_MESSAGE,
+                        help="max bytes retained per message after warmup")
+    parser.add_argument("--budget-rss", type=float, default=BUDGET_PEAK_RSS_MB, help="max peak RSS in MB")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.messages, args.measured, args.seed))
+    print(f"Replayed {result['messages']:,} messages ({result['throughput']:,.0f} msg/s untraced), output in {result['directory']}")
+    print(f"Retained per message: {result['bytes_per_message']:.1f} bytes, {result['blocks_per_message']:.3f} blocks")
+    print(f"Transient peak while traced: {result['transient_kb']:,.0f} KB")
+    print(f"Peak RSS: {result['peak_rss_mb']:.1f} MB")
+
+    failures = []
+    if result["bytes_per_message"] > args.budget_bytes:
+        failures.append(f"retained {result['bytes_per_message']:.1f} bytes/message > {args.budget_bytes}")
+    if result["peak_rss_mb"] > args.budget_rss:
+        failures.append(f"peak RSS {result['peak_rss_mb']:.1f} MB > {args.budget_rss}")
+    if failures:
+        print("OVER BUDGET: " + "; ".join(failures))
+        sys.exit(1)
+    print("Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,17 +8,28 @@ import pytz
 from websockets import connect
 from termcolor import cprint
 import logging
+from records import Liquidation
+from quantiles import AdaptiveThreshold, SymbolQuantiles
+import loop_backend
 
 # Configuration
 WEBSOCKET_URL = "wss://fstream.binance.com/ws/!forceOrder@arr"
 FILENAME = "big_liqs.csv"
 TIMEZONE = "US/Central"
 
-# Display thresholds (specific to big liquidations)
+# Display thresholds (specific to big liquidations), used until a symbol has seen LIQ_WARMUP liquidations
 MIN_DISPLAY_SIZE = 100000  # $100K minimum (vs $3K in regular liqs)
 BOLD_THRESHOLD = 1000000   # $1M+ gets bold
 HUGE_THRESHOLD = 5000000   # $5M+ gets special treatment
 
+# Adaptive display tiers, percentiles of each symbol's liquidation sizes
+MIN_DISPLAY_PERCENTILE = 90
+BOLD_PERCENTILE = 99
+HUGE_PERCENTILE = 99.8
+MIN_DISPLAY_FLOOR = 25000
+LIQ_WARMUP = 200
+LIQ_DECAY_EVERY = 5000
+
 # Performance settings
 BATCH_SIZE = 50  # Write to file every N messages
 STATS_INTERVAL = 100  # Print stats every N messages
@@ -43,7 +54,9 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class BigLiquidationMonitor:
-    def __init__(self):
+    def __init__(self, bus=None, url=WEBSOCKET_URL):
+        self.bus = bus
+        self.url = url
         self.message_count = 0
         self.start_time = datetime.now()
         self.batch_buffer = []
@@ -51,6 +64,12 @@ class BigLiquidationMonitor:
         self.reconnect_attempts = 0
         self.last_ping_time = None
         
+        # Per-symbol liquidation sizes behind the display tiers
+        self.liq_sizes = SymbolQuantiles(warmup=LIQ_WARMUP, decay_every=LIQ_DECAY_EVERY)
+        self.min_display_size = AdaptiveThreshold(self.liq_sizes, MIN_DISPLAY_PERCENTILE, MIN_DISPLAY_SIZE, floor=MIN_DISPLAY_FLOOR)
+        self.bold_threshold = AdaptiveThreshold(self.liq_sizes, BOLD_PERCENTILE, BOLD_THRESHOLD)
+        self.huge_threshold = AdaptiveThreshold(self.liq_sizes, HUGE_PERCENTILE, HUGE_THRESHOLD)
+        
         # Initialize CSV file
         self._init_csv_file()
         
@@ -84,7 +103,7 @@ class BigLiquidationMonitor:
             logger.error(f"Error formatting time: {e}")
             return "00:00:00"
     
-    def _get_display_config(self, usd_size, side):
+    def _get_display_config(self, usd_size, side, symbol):
         """Get display configuration based on USD size and side"""
         # Base configuration (specific to big liquidations)
         liquidation_type = "L LIQ" if side == "SELL" else "S LIQ"
@@ -94,12 +113,12 @@ class BigLiquidationMonitor:
         repeat_count = 1
         
         # Enhanced display logic for BIG liquidations
-        if usd_size > HUGE_THRESHOLD:  # $5M+
+        if usd_size > self.huge_threshold.value(symbol):  # top 0.2% ($5M+ while warming up)
             stars = "*" * 5
             color = "yellow"  # Special color for massive liquidations
             attrs = ["bold", "blink"]
             repeat_count = 8  # More repeats for huge liquidations
-        elif usd_size > BOLD_THRESHOLD:  # $1M+
+        elif usd_size > self.bold_threshold.value(symbol):  # top 1% ($1M+ while warming up)
             stars = "*" * 3
             color = base_color
             attrs = ["bold", "blink"]
@@ -116,18 +135,18 @@ class BigLiquidationMonitor:
             'repeat_count': repeat_count
         }
     
-    def _display_liquidation(self, order_data, usd_size):
+    def _display_liquidation(self, liquidation, usd_size):
         """Display liquidation information with enhanced formatting for BIG liquidations"""
-        if usd_size < MIN_DISPLAY_SIZE:
+        if usd_size < self.min_display_size.value(liquidation.symbol):
             return
         
         try:
-            symbol = order_data["s"].replace("USDT", "")
-            side = order_data["S"]
-            timestamp = int(order_data["T"])
+            symbol = liquidation.symbol.replace("USDT", "")
+            side = liquidation.side
+            timestamp = liquidation.time
             
             # Get display configuration
-            config = self._get_display_config(usd_size, side)
+            config = self._get_display_config(usd_size, side, liquidation.symbol)
             
             # Format output (2 decimal places for big liquidations)
             symbol_short = symbol[:4]
@@ -151,22 +170,21 @@ class BigLiquidationMonitor:
     def _process_message(self, msg):
         """Process a single liquidation message"""
         try:
-            order_data = json.loads(msg)["o"]
+            liquidation = Liquidation.from_message(json.loads(msg)["o"])
             
             # Extract key data
-            filled_quantity = float(order_data["z"])
-            price = float(order_data["p"])
-            usd_size = filled_quantity * price
+            usd_size = liquidation.usd_size
+            self.liq_sizes.add(liquidation.symbol, usd_size)
             
-            # Display if meets threshold (only $100K+ for big liquidations)
-            self._display_liquidation(order_data, usd_size)
+            # Hand it to in-process subscribers first, they are the latency sensitive ones
+            if self.bus is not None:
+                self.bus.publish(liquidation)
             
-            # Prepare CSV data
-            msg_values = [str(order_data[key]) for key in ["s", "S", "o", "f", "q", "p", "ap", "X", "l", "z", "T"]]
-            msg_values.append(str(usd_size))
+            # Display if meets threshold (only $100K+ for big liquidations)
+            self._display_liquidation(liquidation, usd_size)
             
             # Add to batch buffer
-            self.batch_buffer.append(msg_values)
+            self.batch_buffer.append(liquidation)
             
             # Write batch if full
             if len(self.batch_buffer) >= BATCH_SIZE:
@@ -182,8 +200,8 @@ class BigLiquidationMonitor:
         
         try:
             with open(FILENAME, "a") as f:
-                for msg_values in self.batch_buffer:
-                    trade_info = ",".join(msg_values) + "\n"
+                for liquidation in self.batch_buffer:
+                    trade_info = liquidation.csv_line()
                     trade_info = trade_info.replace("USDT", "")
                     f.write(trade_info)
             
@@ -249,7 +267,7 @@ class BigLiquidationMonitor:
         
         while self.running:
             try:
-                logger.info(f"Attempting to connect to {WEBSOCKET_URL}...")
+                logger.info(f"Attempting to connect to {self.url}...")
                 
                 # Calculate backoff delay
                 if self.reconnect_attempts > 0:
@@ -258,7 +276,7 @@ class BigLiquidationMonitor:
                     await asyncio.sleep(delay)
                 
                 async with connect(
-                    WEBSOCKET_URL,
+                    self.url,
                     ping_interval=PING_INTERVAL,
                     ping_timeout=PING_TIMEOUT,
                     close_timeout=10,
@@ -299,7 +317,7 @@ def main():
     monitor = BigLiquidationMonitor()
     
     try:
-        asyncio.run(monitor.run())
+        loop_backend.run(monitor.run())
     except KeyboardInterrupt:
         logger.info("Shutdown requested by user")
     except Exception as e:
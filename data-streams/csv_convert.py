@@ -0,0 +1,254 @@
+"""
+Converts and validates the recorded CSVs into typed, sorted, deduplicated NumPy files.
+
+The CSVs written by the monitors have known quirks:
+
+    liqs.csv / big_liqs.csv     _write_batch stripped "USDT" from whole lines, so
+                                symbols are BTC, 1000PEPE, ETH_251226, ... (USDC
+                                pairs kept their suffix); usd_size is a
+                                full-precision float string
+    recent_trades.csv           the aggregate trade ID was written into the
+                                First Trade ID column
+    huge_trades.csv             rows from different symbols' streams interleave
+                                slightly out of time order (32 in the checked-in
+                                file), sorting fixes them
+
+Each file is cut into chunks on line boundaries, and the chunks are parsed
+in a process pool. Every column becomes a typed array. Symbols get their
+quote asset back, usd_size is recomputed from price x quantity where it
+disagrees, and First Trade IDs that just repeat the aggregate ID become -1
+(unknown). Checks run as array operations over the whole file:
+
+    liquidations  usd_size vs z*p, positive prices and sizes, last fill <= filled,
+                  filled <= original quantity, times within range, rows out of order
+    trades        usd_size vs p*q (to the cent), positive prices and sizes,
+                  times within range, rows out of order
+
+Rows that fail the hard checks are dropped and counted. The rest are
+sorted by time and deduplicated, then saved as a structured array:
+
+    python csv_convert.py liqs.csv big_liqs.csv huge_trades.csv --output-dir converted
+    liqs = np.load("converted/liqs.npy")      # or csv_convert.load("converted/liqs.npy")
+"""
+
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+# Conversion settings
+CHUNK_BYTES = 1024 * 1024
+DEFAULT_OUTPUT_DIR = "converted"
+USD_RELATIVE_TOLERANCE = 1e-6  # liquidation usd_size vs z*p
+USD_CENT_TOLERANCE = 0.006  # trade usd_size is rounded to cents
+MIN_TIME = 1546300800000  # 2019-01-01, before Binance futures
+QUOTE_SUFFIXES = ("USDT", "USDC", "BUSD")
+EXPIRY_DIGITS = 6  # delivery contracts end in _YYMMDD
+UNKNOWN_ID = -1
+
+LIQS_HEADER = ("symbol,side,order_type,time_in_force,original_quantity,price,average_price,order_status,"
+               "order_last_filled_quantity,order_last_accumulated_quantity,order_trade_time,usd_size")
+TRADES_HEADER = "Event Time,Symbol,Aggregate Trade ID,Price,Quantity,First Trade ID,Trade Time,Is Buyer Maker,USD Size"
+
+LIQ_DTYPE = np.dtype([
+    ("symbol", "S16"),
+    ("side", "S4"),
+    ("order_type", "S8"),
+    ("time_in_force", "S4"),
+    ("original_quantity", "<f8"),
+    ("price", "<f8"),
+    ("average_price", "<f8"),
+    ("status", "S16"),
+    ("last_filled_quantity", "<f8"),
+    ("filled_quantity", "<f8"),
+    ("time", "<i8"),
+    ("usd_size", "<f8"),
+])
+
+TRADE_DTYPE = np.dtype([
+    ("symbol", "S16"),
+    ("agg_id", "<i8"),
+    ("price", "<f8"),
+    ("quantity", "<f8"),
+    ("first_id", "<i8"),
+    ("time", "<i8"),
+    ("is_buyer_maker", "?"),
+    ("usd_size", "<f8"),
+])
+
+# kind -> (header, dtype, CSV column for each field)
+SCHEMAS = {
+    "liquidations": (LIQS_HEADER, LIQ_DTYPE, list(range(12))),
+    "trades": (TRADES_HEADER, TRADE_DTYPE, [1, 2, 3, 4, 5, 6, 7, 8]),
+}
+
+
+def detect_kind(path):
+    with open(path) as f:
+        header = f.readline().strip()
+    for kind, (expected, _, _) in SCHEMAS.items():
+        if header == expected:
+            return kind
+    raise ValueError(f"{path}: unrecognized header {header[:60]!r}")
+
+
+def file_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """Raw bytes of the file in chunks that end on a line boundary"""
+    with open(path, "rb") as f:
+        remainder = b""
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            data = remainder + data
+            cut = data.rfind(b"\n") + 1
+            if cut:
+                yield data[:cut]
+            remainder = data[cut:]
+        if remainder.strip():
+            yield remainder
+
+
+def restore_quote(symbols):
+    """
+    Puts back the USDT that _write_batch stripped, leaves symbols that still have a quote asset.
+    Delivery contracts get it back before their expiry: ETH_251226 -> ETHUSDT_251226.
+    """
+    symbols = np.asarray(symbols, dtype=str)
+    parts = np.char.partition(symbols, "_")
+    expiry = parts[:, 2]
+    delivery = (parts[:, 1] == "_") & (np.char.str_len(expiry) == EXPIRY_DIGITS) & np.char.isdigit(expiry)
+    base = np.where(delivery, parts[:, 0], symbols)
+
+    keep = np.zeros(len(symbols), dtype=bool)
+    for suffix in QUOTE_SUFFIXES:
+        keep |= np.char.endswith(base, suffix) & (np.char.str_len(base) > len(suffix))
+    base = np.where(keep, base, np.char.add(base, "USDT"))
+    return np.where(delivery, np.char.add(np.char.add(base, "_"), expiry), base)
+
+
+# ---- worker side ----
+
+def parse_chunk(kind, chunk):
+    """(typed rows, malformed line count) for one chunk"""
+    header, dtype, columns = SCHEMAS[kind]
+    header_bytes = header.encode()
+    commas = header.count(",")
+    lines = [line for line in chunk.split(b"\n") if line and line != header_bytes]
+    good = [line for line in lines if line.count(b",") == commas]
+    malformed = len(lines) - len(good)
+    rows = np.empty(len(good), dtype=dtype)
+    if not good:
+        return rows, malformed
+
+    text = np.loadtxt(io.BytesIO(b"\n".join(good)), delimiter=",", dtype=str, ndmin=2, comments=None)
+    for name, column in zip(dtype.names, columns):
+        values = text[:, column]
+        if name == "symbol":
+            values = restore_quote(values)
+        elif dtype[name] == np.bool_:
+            values = values == "True"
+        rows[name] = values
+    return rows, malformed
+
+
+# ---- checks ----
+
+def check_liquidations(rows):
+    """(rows to keep, report) with usd_size recomputed where it disagrees with z*p"""
+    expected = rows["filled_quantity"] * rows["price"]
+    mismatch = np.abs(rows["usd_size"] - expected) > USD_RELATIVE_TOLERANCE * np.maximum(np.abs(expected), 1.0)
+    rows["usd_size"] = np.where(mismatch, expected, rows["usd_size"])
+    invalid = (
+        (rows["price"] <= 0) | (rows["filled_quantity"] <= 0)
+        | (rows["last_filled_quantity"] > rows["filled_quantity"] * (1 + 1e-9))
+        | (rows["filled_quantity"] > rows["original_quantity"] * (1 + 1e-9))
+        | _bad_times(rows["time"])
+    )
+    report = {"usd_size_fixed": int(mismatch.sum()), "invalid": int(invalid.sum())}
+    return rows[~invalid], report
+
+
+def check_trades(rows):
+    expected = rows["price"] * rows["quantity"]
+    mismatch = np.abs(rows["usd_size"] - expected) > USD_CENT_TOLERANCE
+    rows["usd_size"] = np.where(mismatch, expected, rows["usd_size"])
+    echoed = rows["first_id"] == rows["agg_id"]  # recent_trades.py wrote the aggregate ID there
+    rows["first_id"] = np.where(echoed, UNKNOWN_ID, rows["first_id"])
+    invalid = (rows["price"] <= 0) | (rows["quantity"] <= 0) | _bad_times(rows["time"])
+    report = {"usd_size_fixed": int(mismatch.sum()), "first_id_unknown": int(echoed.sum()), "invalid": int(invalid.sum())}
+    return rows[~invalid], report
+
+
+def _bad_times(times):
+    return (times < MIN_TIME) | (times > (time.time() + 86400) * 1000)
+
+
+def sort_and_dedupe(kind, rows):
+    """Sorted by time, exact repeats removed (liquidations) or one row per symbol + aggregate ID (trades)"""
+    if kind == "trades":
+        order = np.lexsort((rows["time"], rows["agg_id"], rows["symbol"]))
+        rows = rows[order]
+        same = (rows["symbol"][1:] == rows["symbol"][:-1]) & (rows["agg_id"][1:] == rows["agg_id"][:-1])
+    else:
+        keys = ("time", "symbol", "side", "price", "filled_quantity")
+        order = np.lexsort(tuple(rows[key] for key in reversed(keys)))
+        rows = rows[order]
+        same = np.ones(max(len(rows) - 1, 0), dtype=bool)
+        for key in keys:
+            same &= rows[key][1:] == rows[key][:-1]
+    keep = np.concatenate(([True], ~same)) if len(rows) else np.zeros(0, dtype=bool)
+    unique = rows[keep]
+    return unique[np.argsort(unique["time"], kind="stable")], int((~keep).sum())
+
+
+def convert(path, output_dir=DEFAULT_OUTPUT_DIR, chunk_bytes=CHUNK_BYTES, executor=None):
+    """Converts one CSV, chunks parsed on the executor when given, returns its report"""
+    start = time.time()
+    kind = detect_kind(path)
+    chunks = file_chunks(path, chunk_bytes)
+    parsed = list(executor.map(parse_chunk, repeat(kind), chunks) if executor is not None else map(parse_chunk, repeat(kind), chunks))
+    rows = np.concatenate([chunk_rows for chunk_rows, _ in parsed]) if parsed else np.empty(0, SCHEMAS[kind][1])
+    report = {"file": path, "kind": kind, "rows": len(rows), "malformed": sum(bad for _, bad in parsed),
+              "out_of_order": int((np.diff(rows["time"]) < 0).sum())}
+
+    rows, checks = check_liquidations(rows) if kind == "liquidations" else check_trades(rows)
+    report.update(checks)
+    rows, report["duplicates"] = sort_and_dedupe(kind, rows)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".npy")
+    np.save(output, rows)
+    report.update({"written": len(rows), "output": output, "seconds": round(time.time() - start, 2)})
+    return report
+
+
+def load(path, mmap=True):
+    """A converted file as a structured array, memory-mapped by default"""
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and validate the recorded liquidation / trade CSVs")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(args.workers) as executor:
+        for path in args.files:
+            report = convert(path, args.output_dir, chunk_bytes=args.chunk_bytes, executor=executor)
+            fixes = ", ".join(f"{key} {report[key]}" for key in
+                              ("malformed", "out_of_order", "usd_size_fixed", "first_id_unknown", "invalid", "duplicates")
+                              if key in report)
+            print(f"{path}: {report['rows']:,} rows -> {report['written']:,} in {report['output']} "
+                  f"({report['seconds']}s; {fixes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+In-process publish/subscribe bus between the Binance monitors and strategies.
+
+Monitors publish typed events as they parse them; strategies subscribe with
+filters on event type, symbol and USD size and consume from their own bounded
+queue. Publishing never blocks: a subscriber that falls behind loses its
+oldest events (counted in `dropped`) instead of slowing the monitors down.
+
+    bus = EventBus()
+    monitor = BigLiquidationMonitor(bus=bus)
+    sub = bus.subscribe(topics=["liquidation"], min_usd=5_000_000)
+    async for event in sub:
+        ...
+"""
+
+import asyncio
+
+from records import FUNDING, HUGE_TRADE, LIQUIDATION, Liquidation, MarkPrice, Trade, to_coin
+
+# Queue settings
+DEFAULT_QUEUE_SIZE = 1000
+
+# Events are the pipeline's own records, published as parsed
+LiquidationEvent = Liquidation
+HugeTradeEvent = Trade
+FundingEvent = MarkPrice
+
+
+class Subscription:
+    def __init__(self, bus, topics=None, symbols=None, min_usd=None, maxsize=DEFAULT_QUEUE_SIZE):
+        self.bus = bus
+        self.topics = set(topics) if topics else None
+        self.coins = {to_coin(s) for s in symbols} if symbols else None
+        self.min_usd = min_usd
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+
+    def matches(self, event):
+        if self.topics is not None and event.topic not in self.topics:
+            return False
+        if self.coins is not None and event.coin not in self.coins:
+            return False
+        if self.min_usd is not None:
+            usd_size = event.usd_size
+            if usd_size is not None and usd_size < self.min_usd:
+                return False
+        return True
+
+    def deliver(self, event):
+        if self.queue.full():
+            # drop the oldest, the newest event is the one a strategy wants to act on
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+        self.delivered += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self):
+        self.subscriptions = []
+        self.published = 0
+
+    def subscribe(self, topics=None, symbols=None, min_usd=None, maxsize=DEFAULT_QUEUE_SIZE):
+        subscription = Subscription(self, topics, symbols, min_usd, maxsize)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def publish(self, event):
+        """Hands event to every matching subscriber, never blocks"""
+        self.published += 1
+        for subscription in self.subscriptions:
+            if subscription.matches(event):
+                subscription.deliver(event)
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "subscribers": [
+                {"topics": sorted(s.topics) if s.topics else None, "delivered": s.delivered,
+                 "dropped": s.dropped, "queued": s.queue.qsize()}
+                for s in self.subscriptions
+            ],
+        }
@@ -0,0 +1,155 @@
+"""
+Watermark-based k-way merge of per-source event streams into one time-ordered feed.
+
+Each websocket (one per symbol for aggTrades, one for all liquidations, ...)
+delivers its own events in exchange-time order, but the streams interleave
+arbitrarily. EventMerger keeps a queue per source and a heap of the queue
+heads, and releases the smallest head once it is older than the watermark:
+the newest exchange time seen minus `lateness_ms`, advanced by local elapsed
+time while the streams are quiet. Everything downstream of the merger sees
+one global order by (exchange time, arrival). An event that shows up older
+than what has already been released is late; it is counted and, unless
+drop_late is set, passed on with the next release.
+
+    merger = EventMerger(lateness_ms=100, listeners=[handle])
+    merger.push("BTCUSDT", trade)       # anything with a .time in ms
+    await merger.run()                  # releases events as the watermark moves
+
+publish() duck-types EventBus.publish, so a merger can stand in front of the
+bus for the huge trade aggregator and the funding streams: their records go
+in keyed by (topic, symbol) and reach the bus in one exchange-time order.
+Liquidations are risk signals and go to the bus directly; !forceOrder@arr
+arrives about a second late anyway, so most would only be counted as late.
+
+    merger = EventMerger(listeners=[bus.publish])
+    aggregator = TradeAggregator(filename, bus=merger)
+"""
+
+import asyncio
+import heapq
+import time
+from bisect import insort
+from collections import deque
+
+# Merge settings
+LATENESS_MS = 100  # how long an event may trail the newest one and still be ordered
+IDLE_INTERVAL = 0.05  # seconds between watermark checks when nothing arrives
+
+
+class EventMerger:
+    def __init__(self, lateness_ms=LATENESS_MS, listeners=None, drop_late=False):
+        self.lateness_ms = lateness_ms
+        self.listeners = listeners or []
+        self.drop_late = drop_late
+        self.queues = {}  # source -> deque of (time, seq, event)
+        self.heads = []  # heap of (time, seq, source), one per non-empty queue
+        self.seq = 0
+        self.max_time = None
+        self.max_seen_at = 0.0  # monotonic clock when max_time was seen
+        self.released_time = None  # time of the last released event
+        self.late = 0
+        self.late_ready = deque()  # late events waiting to be passed on
+        self.out_of_order = 0  # events older than their own source's previous event
+        self.released = 0
+        self._wakeup = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def watermark(self):
+        """Events at or before this exchange time are released"""
+        if self.max_time is None:
+            return None
+        idle_ms = (time.monotonic() - self.max_seen_at) * 1000
+        return self.max_time + idle_ms - self.lateness_ms
+
+    def push(self, source, event):
+        event_time = event.time
+        if self.released_time is not None and event_time < self.released_time:
+            self.late += 1
+            if not self.drop_late:
+                self.late_ready.append(event)
+                if self._wakeup is not None:
+                    self._wakeup.set()
+            return
+
+        if self.max_time is None or event_time > self.max_time:
+            self.max_time = event_time
+            self.max_seen_at = time.monotonic()
+
+        self.seq += 1
+        entry = (event_time, self.seq, event)
+        queue = self.queues.get(source)
+        if queue is None:
+            queue = self.queues[source] = deque()
+        if not queue:
+            queue.append(entry)
+            heapq.heappush(self.heads, (event_time, self.seq, source))
+        elif event_time >= queue[-1][0]:
+            queue.append(entry)
+        else:
+            # a source out of its own order, rare enough to re-sort its queue
+            self.out_of_order += 1
+            items = list(queue)
+            insort(items, entry)
+            queue.clear()
+            queue.extend(items)
+            self._reset_head(source)
+
+        if self._wakeup is not None and self.heads[0][0] <= self.watermark():
+            self._wakeup.set()
+
+    def publish(self, event):
+        """Pushes a pipeline record, one source per (topic, symbol)"""
+        self.push((event.topic, event.symbol), event)
+
+    def _reset_head(self, source):
+        self.heads = [head for head in self.heads if head[2] != source]
+        queue = self.queues[source]
+        first_time, first_seq, _ = queue[0]
+        self.heads.append((first_time, first_seq, source))
+        heapq.heapify(self.heads)
+
+    def pop_ready(self, watermark=None):
+        """Late events, then every queued event at or before the watermark in order"""
+        watermark = self.watermark() if watermark is None else watermark
+        ready = list(self.late_ready)
+        self.late_ready.clear()
+        heads = self.heads
+        while heads and watermark is not None and heads[0][0] <= watermark:
+            _, _, source = heapq.heappop(heads)
+            queue = self.queues[source]
+            event_time, _, event = queue.popleft()
+            ready.append(event)
+            self.released_time = event_time
+            if queue:
+                next_time, next_seq, _ = queue[0]
+                heapq.heappush(heads, (next_time, next_seq, source))
+        self.released += len(ready)
+        return ready
+
+    def flush(self):
+        """Everything still queued, in order, e.g. on shutdown"""
+        return self.pop_ready(float("inf"))
+
+    def pending(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def stats(self):
+        return {"released": self.released, "pending": self.pending(), "late": self.late,
+                "out_of_order": self.out_of_order, "sources": len(self.queues)}
+
+    async def run(self, idle_interval=IDLE_INTERVAL):
+        """Releases events as the watermark passes them, awaiting listeners that return coroutines"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=idle_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            for event in self.pop_ready():
+                for listener in self.listeners:
+                    result = listener(event)
+                    if asyncio.iscoroutine(result):
+                        await result
@@ -0,0 +1,100 @@
+"""
+Example strategy wired to the monitors through the event bus.
+
+Runs the big liquidation monitor, the huge trade aggregator and the funding
+streams on one event loop and reacts to what they publish without touching
+the CSVs. A $5M+ liquidation is treated as a cascade signal: with TRADE set
+the hyperliquid-bots kill switch flattens the account on that coin, otherwise
+the reaction is only printed.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from termcolor import cprint
+
+import funding
+import huge_trades
+import loop_backend
+from big_liqs import BigLiquidationMonitor
+from event_merge import EventMerger
+from event_bus import FUNDING, HUGE_TRADE, LIQUIDATION, EventBus
+
+# Strategy settings
+CASCADE_THRESHOLD = 5000000  # $5M liquidation
+WHALE_THRESHOLD = 5000000  # $5M single trade
+FUNDING_ALERT = 50  # % per year
+TRADE = False  # set True to actually act on hyperliquid
+
+
+async def load_hyperliquid():
+    """Async Hyperliquid client and kill switch from hyperliquid-bots, only when TRADE is on"""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hyperliquid-bots"))
+    import eth_account
+    from dotenv import load_dotenv
+    from async_funcs import AsyncHyperliquid
+    from kill_switch import KillSwitch
+
+    load_dotenv()
+    client = AsyncHyperliquid(eth_account.Account.from_key(os.getenv("PH_SECRET_KEY")))
+    await client.start()
+    return client, KillSwitch(client)
+
+
+async def cascade_strategy(bus):
+    subscription = bus.subscribe(topics=[LIQUIDATION], min_usd=CASCADE_THRESHOLD)
+    kill = None
+    if TRADE:
+        _, kill = await load_hyperliquid()
+
+    async for event in subscription:
+        lag_ms = time.time() * 1000 - event.time
+        cprint(f"CASCADE {event.coin} ${event.usd_size:,.0f} liquidated ({lag_ms:.0f}ms after the exchange)",
+               "white", "on_red", attrs=["bold"])
+        if kill is not None:
+            await kill.flatten_all([event.coin])
+
+
+async def whale_strategy(bus):
+    subscription = bus.subscribe(topics=[HUGE_TRADE], min_usd=WHALE_THRESHOLD)
+    async for event in subscription:
+        side = "SELL" if event.is_buyer_maker else "BUY"
+        cprint(f"WHALE {side} {event.coin} ${event.usd_size:,.0f}", "white", "on_blue")
+
+
+async def funding_strategy(bus):
+    subscription = bus.subscribe(topics=[FUNDING], maxsize=100)
+    async for event in subscription:
+        if abs(event.yearly_funding_rate) > FUNDING_ALERT:
+            cprint(f"FUNDING {event.coin} {event.yearly_funding_rate:.2f}%/yr", "black", "on_yellow")
+
+
+async def main():
+    bus = EventBus()
+    # huge trades and funding reach the bus in one exchange-time order, liquidations
+    # skip the merge lateness and go straight to the cascade strategy
+    merger = EventMerger(huge_trades.MERGE_LATENESS_MS, listeners=[bus.publish])
+
+    liq_monitor = BigLiquidationMonitor(bus=bus)
+    aggregator = huge_trades.TradeAggregator(huge_trades.trades_filename, bus=merger)
+    managers = [
+        huge_trades.WebSocketManager(symbol, f"{huge_trades.websocket_url_base}{symbol.lower()}@aggTrade", aggregator)
+        for symbol in huge_trades.symbols
+    ]
+
+    await asyncio.gather(
+        merger.run(),
+        liq_monitor.run(),
+        *(manager.run() for manager in managers),
+        huge_trades.print_aggregated_trades_every_seconds(aggregator),
+        *(funding.binance_funding_stream(symbol, funding.shared_symbol_counter, merger) for symbol in funding.symbols),
+        cascade_strategy(bus),
+        whale_strategy(bus),
+        funding_strategy(bus),
+    )
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
@@ -0,0 +1,290 @@
+"""
+One ingest process, any number of local consumers: records fanned out over a Unix socket.
+
+The ingest side opens the upstream Binance websockets once (aggTrade per
+symbol, !forceOrder@arr, markPrice per symbol) and republishes every
+decoded Trade, Liquidation and MarkPrice on a Unix domain socket. Each record
+is packed once into a fixed binary layout and the same bytes are written to
+every subscriber.
+
+Frame: payload length (u32), record type (u8), sequence number (u64), then
+the packed record. Floats travel as doubles and symbols as 16 padded bytes,
+so a trade frame is 78 bytes (13-byte header, 65-byte payload) instead
+of ~200 of JSON. A record whose symbol (or other text) doesn't fit its
+field is not published and is counted in `rejected`, rather than cut short
+into a name another symbol may have.
+
+A subscriber connects and sends the last sequence number it has (0 for
+none). It first gets everything newer from a bounded in-memory backlog, then
+the live feed. The publisher never waits on a socket: a subscriber whose
+unsent data passes MAX_BUFFERED is disconnected and can reconnect from its
+last sequence number.
+
+    python fanout.py                       # ingest + publish on /tmp/algo-trading.sock
+
+    async for seq, record in FanoutClient(SOCKET_PATH):
+        ...
+"""
+
+import asyncio
+import os
+import struct
+import sys
+from collections import deque
+
+import loop_backend
+from records import Liquidation, MarkPrice, Trade
+
+# Fan-out settings
+SOCKET_PATH = "/tmp/algo-trading.sock"
+BACKLOG = 50000  # frames kept for late joiners
+MAX_BUFFERED = 4 * 1024 * 1024  # bytes a subscriber may have unsent before it is dropped
+HELLO_TIMEOUT = 5  # seconds a new connection has to send its sequence number
+RECONNECT_DELAY = 1  # seconds
+
+HEADER = struct.Struct("<IBQ")  # payload length, record type, sequence
+HELLO = struct.Struct("<Q")  # last sequence the subscriber has
+
+TRADE, LIQUIDATION, MARK_PRICE = 1, 2, 3
+LAYOUTS = {
+    # symbol, agg id, price, quantity, first id, time, buyer maker, event time
+    TRADE: struct.Struct("<16sqddqq?q"),
+    # symbol, side, order type, time in force, original qty, price, avg price, status, last filled, filled, time
+    LIQUIDATION: struct.Struct("<16s4s8s4sddd16sddq"),
+    # symbol, mark price, funding rate, time
+    MARK_PRICE: struct.Struct("<16sddq"),
+}
+
+
+def _text(raw):
+    return sys.intern(raw.rstrip(b"\0").decode())
+
+
+def _field(text, size):
+    """text as bytes for a fixed-size field, struct would silently cut it to size"""
+    raw = text.encode()
+    if len(raw) > size:
+        raise ValueError(f"{text!r} is longer than its {size}-byte field")
+    return raw
+
+
+def pack(record):
+    """(record type, payload bytes)"""
+    if isinstance(record, Trade):
+        return TRADE, LAYOUTS[TRADE].pack(
+            _field(record.symbol, 16), record.agg_id, record.price, record.quantity, record.first_id,
+            record.time, record.is_buyer_maker, record.event_time)
+    if isinstance(record, Liquidation):
+        return LIQUIDATION, LAYOUTS[LIQUIDATION].pack(
+            _field(record.symbol, 16), _field(record.side, 4), _field(record.order_type, 8),
+            _field(record.time_in_force, 4), record.original_quantity, record.price, record.average_price,
+            _field(record.status, 16), record.last_filled_quantity, record.filled_quantity, record.time)
+    if isinstance(record, MarkPrice):
+        return MARK_PRICE, LAYOUTS[MARK_PRICE].pack(
+            _field(record.symbol, 16), record.mark_price, record.funding_rate, record.time)
+    raise TypeError(f"Can't fan out {type(record).__name__}")
+
+
+def unpack(record_type, payload):
+    fields = LAYOUTS[record_type].unpack(payload)
+    if record_type == TRADE:
+        symbol, agg_id, price, quantity, first_id, trade_time, is_buyer_maker, event_time = fields
+        return Trade(_text(symbol), agg_id, price, quantity, first_id, trade_time, is_buyer_maker, event_time)
+    if record_type == LIQUIDATION:
+        (symbol, side, order_type, time_in_force, original_quantity, price, average_price, status,
+         last_filled_quantity, filled_quantity, liq_time) = fields
+        return Liquidation(_text(symbol), _text(side), _text(order_type), _text(time_in_force), original_quantity,
+                           price, average_price, _text(status), last_filled_quantity, filled_quantity, liq_time)
+    symbol, mark_price, funding_rate, mark_time = fields
+    return MarkPrice(_text(symbol), mark_price, funding_rate, mark_time)
+
+
+async def read_frame(reader):
+    """(sequence, record) from a stream, raises asyncio.IncompleteReadError at EOF"""
+    length, record_type, seq = HEADER.unpack(await reader.readexactly(HEADER.size))
+    payload = await reader.readexactly(length)
+    return seq, unpack(record_type, payload)
+
+
+class Subscriber:
+    def __init__(self, writer, limit):
+        self.writer = writer
+        self.transport = writer.transport
+        self.limit = limit  # MAX_BUFFERED plus whatever the replay queued
+        self.sent = 0
+
+
+class FanoutServer:
+    """Publishes records to every connected subscriber, duck-types EventBus.publish"""
+
+    def __init__(self, path=SOCKET_PATH, backlog=BACKLOG, max_buffered=MAX_BUFFERED):
+        self.path = path
+        self.max_buffered = max_buffered
+        self.backlog = deque(maxlen=backlog)  # (seq, frame)
+        self.subscribers = []
+        self.seq = 0
+        self.published = 0
+        self.rejected = 0  # records with a field too long for the layout
+        self.rejected_symbols = set()
+        self.dropped_subscribers = 0
+        self.server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from a previous run
+        self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+        print(f"Fanning out records on {self.path}")
+
+    async def close(self):
+        for subscriber in list(self.subscribers):
+            subscriber.transport.abort()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def publish(self, record):
+        """Packs the record once and writes it to every subscriber, never blocks"""
+        try:
+            record_type, payload = pack(record)
+        except ValueError as e:
+            self.rejected += 1
+            if record.symbol not in self.rejected_symbols:
+                self.rejected_symbols.add(record.symbol)
+                print(f"Not fanning out {record.symbol}: {e}")
+            return
+        self.seq += 1
+        frame = HEADER.pack(len(payload), record_type, self.seq) + payload
+        self.backlog.append((self.seq, frame))
+        self.published += 1
+
+        for subscriber in list(self.subscribers):
+            if subscriber.transport.get_write_buffer_size() > subscriber.limit:
+                self._drop(subscriber)
+                continue
+            subscriber.transport.write(frame)
+            subscriber.sent += 1
+
+    def _drop(self, subscriber):
+        self.subscribers.remove(subscriber)
+        self.dropped_subscribers += 1
+        print(f"Dropped slow subscriber after {subscriber.sent} frames")
+        subscriber.transport.abort()
+
+    def _replay(self, since):
+        if not self.backlog or since >= self.seq:
+            return b""
+        first = self.backlog[0][0]
+        start = max(0, since - first + 1)
+        return b"".join(frame for _, frame in list(self.backlog)[start:])
+
+    async def _handle(self, reader, writer):
+        try:
+            (since,) = HELLO.unpack(await asyncio.wait_for(reader.readexactly(HELLO.size), HELLO_TIMEOUT))
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+
+        # replay and registration happen without yielding, so no frame falls in between
+        replay = self._replay(since)
+        writer.write(replay)
+        subscriber = Subscriber(writer, self.max_buffered + len(replay))
+        self.subscribers.append(subscriber)
+        try:
+            while await reader.read(1024):
+                pass  # subscribers only listen, anything they send is ignored
+        except ConnectionError:
+            pass
+        finally:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+            writer.close()
+
+    def stats(self):
+        return {"published": self.published, "rejected": self.rejected, "seq": self.seq, "backlog": len(self.backlog),
+                "subscribers": len(self.subscribers), "dropped_subscribers": self.dropped_subscribers}
+
+
+class FanoutClient:
+    """Async iterator of (sequence, record), reconnecting from the last sequence it saw"""
+
+    def __init__(self, path=SOCKET_PATH, since=0, reconnect=True):
+        self.path = path
+        self.last_seq = since
+        self.reconnect = reconnect
+        self.gaps = 0  # records missed because the backlog had moved on, before the first frame too
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.writer.write(HELLO.pack(self.last_seq))
+        await self.writer.drain()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            try:
+                if self.reader is None:
+                    await self.connect()
+                seq, record = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError, FileNotFoundError) as e:
+                self.close()
+                if not self.reconnect:
+                    raise StopAsyncIteration
+                print(f"Fan-out connection lost ({e!r}), reconnecting from {self.last_seq}")
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            # last_seq is 0 before a fresh client's first frame, so a rolled backlog counts too
+            if seq > self.last_seq + 1:
+                self.gaps += seq - self.last_seq - 1
+            self.last_seq = seq
+            return seq, record
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def main():
+    import funding
+    import huge_trades
+    from event_merge import EventMerger
+    from liqs import LiquidationMonitor
+    from price_board import PriceBoard
+
+    fanout = FanoutServer()
+    await fanout.start()
+    board = PriceBoard.create(bus=fanout)  # latest prices for local readers, then on to the socket
+
+    # every aggTrade is fanned out in merged exchange-time order, huge trades still aggregate locally
+    aggregator = huge_trades.TradeAggregator(huge_trades.trades_filename)
+    merger = EventMerger(huge_trades.MERGE_LATENESS_MS)
+    managers = {
+        symbol: huge_trades.WebSocketManager(symbol, f"{huge_trades.websocket_url_base}{symbol.lower()}@aggTrade",
+                                             aggregator, merger=merger)
+        for symbol in huge_trades.symbols
+    }
+    merger.add_listener(board.publish)
+    merger.add_listener(lambda trade: managers[trade.symbol].handle_trade(trade))
+    liq_monitor = LiquidationMonitor(bus=fanout)
+
+    try:
+        await asyncio.gather(
+            merger.run(),
+            *(manager.run() for manager in managers.values()),
+            huge_trades.print_aggregated_trades_every_seconds(aggregator),
+            liq_monitor.run(),
+            *(funding.binance_funding_stream(symbol, funding.shared_symbol_counter, board) for symbol in funding.symbols),
+        )
+    finally:
+        await fanout.close()
+        board.close()
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
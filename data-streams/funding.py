@@ -3,6 +3,9 @@ import json
 from datetime import datetime
 from websockets import connect
 from termcolor import cprint
+from records import MarkPrice
+from sqlite_sink import SqliteSink
+import loop_backend
 
 # list of symbols to track
 symbols = [
@@ -18,27 +21,33 @@ symbols = [
 ]
 
 websocket_url_base = "wss://fstream.binance.com/ws/"
+sqlite_filename = None  # e.g. "market.db" to also insert funding samples into SQLite
 
 # Shared counter for synchronization
 shared_symbol_counter = {'count': 0}
 print_lock = asyncio.Lock()
 
-async def binance_funding_stream(symbol, shared_counter):
+async def binance_funding_stream(symbol, shared_counter, bus=None, url_base=websocket_url_base, sink=None):
     global print_lock
-    websocket_url = f'{websocket_url_base}{symbol.lower()}@markPrice'
+    websocket_url = f'{url_base}{symbol.lower()}@markPrice'
     
     while True:
         try:
             async with connect(websocket_url) as websocket:
                 while True:
                     try:
+                        # receive outside the lock, holding it across recv stalls every other symbol's stream
+                        message = await websocket.recv()
                         async with print_lock:
-                            message = await websocket.recv()
-                            data = json.loads(message)
-                            event_time = datetime.fromtimestamp(data['E'] / 1000).strftime("%H:%M:%S")
-                            symbol_display = data['s'].replace('USDT', '')
-                            funding_rate = float(data['r'])  # Get funding rate directly from stream
-                            yearly_funding_rate = (funding_rate * 3 * 365) * 100
+                            mark = MarkPrice.from_message(json.loads(message))
+                            event_time = datetime.fromtimestamp(mark.time / 1000).strftime("%H:%M:%S")
+                            symbol_display = mark.symbol.replace('USDT', '')
+                            yearly_funding_rate = mark.yearly_funding_rate
+
+                            if bus is not None:
+                                bus.publish(mark)
+                            if sink is not None:
+                                sink.add(mark)
 
                             # Color coding based on funding rate
                             if yearly_funding_rate > 50:
@@ -71,12 +80,17 @@ async def main():
     print("Starting Binance funding rate monitor...")
     print(f"Tracking symbols: {symbols}")
     
-    tasks = [binance_funding_stream(symbol, shared_symbol_counter) for symbol in symbols]
+    sink = SqliteSink(sqlite_filename) if sqlite_filename else None
+    tasks = [binance_funding_stream(symbol, shared_symbol_counter, sink=sink) for symbol in symbols]
     
     try:
         await asyncio.gather(*tasks)
     except KeyboardInterrupt:
         print("\nShutting down gracefully...")
+    finally:
+        if sink is not None:
+            sink.close()
 
-asyncio.run(main())
+if __name__ == "__main__":
+    loop_backend.run(main())
                     
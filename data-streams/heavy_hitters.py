@@ -0,0 +1,133 @@
+"""
+Top-K heavy hitters by notional over sliding windows, in fixed memory.
+
+`!forceOrder@arr` carries every listed symbol, so keeping an exact running
+total per symbol grows with the listing count. Instead each window is split
+into a ring of intervals and every interval holds a Space-Saving summary
+(the K symbols most likely to be heavy, with their error bound) and a
+Count-Min sketch (a fixed table that never underestimates any symbol's
+total). The leaderboard takes the union of the Space-Saving candidates over
+the live intervals and ranks them by their summed Count-Min estimates.
+Memory is intervals x (K counters + depth x width floats) regardless of how
+many symbols trade.
+
+    top = WindowedHeavyHitters(window=300)
+    top.add("BTCUSDT", usd_size, event_time_ms)
+    top.leaderboard(10)
+"""
+
+import random
+import zlib
+
+import numpy as np
+
+# Sketch settings
+TOP_K = 32  # Space-Saving counters per interval
+CMS_WIDTH = 1024
+CMS_DEPTH = 4
+HASH_PRIME = (1 << 61) - 1
+HASH_SEED = 20240101
+WINDOW = 300  # seconds
+SLOTS = 30  # intervals per window
+
+
+class SpaceSaving:
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.counters = {}  # key -> [count, error]
+
+    def add(self, key, weight=1.0):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += weight
+            return
+        if len(self.counters) < self.k:
+            self.counters[key] = [weight, 0.0]
+            return
+        # replace the smallest counter, the newcomer inherits its count as error
+        victim = min(self.counters, key=lambda k: self.counters[k][0])
+        floor = self.counters.pop(victim)[0]
+        self.counters[key] = [floor + weight, floor]
+
+    def top(self, n=None):
+        ranked = sorted(self.counters.items(), key=lambda item: -item[1][0])
+        return ranked[:n] if n else ranked
+
+    def clear(self):
+        self.counters.clear()
+
+
+class CountMinSketch:
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.width = width
+        self.table = np.zeros((depth, width))
+        self.rows = np.arange(depth)
+        # seeded per-row hash parameters (not Python's salted hash) so a checkpointed table stays valid
+        rng = random.Random(HASH_SEED)
+        self.hashes = [(rng.randrange(1, HASH_PRIME), rng.randrange(HASH_PRIME)) for _ in range(depth)]
+
+    def _columns(self, key):
+        x = zlib.crc32(key.encode())
+        return [(a * x + b) % HASH_PRIME % self.width for a, b in self.hashes]
+
+    def add(self, key, weight=1.0):
+        self.table[self.rows, self._columns(key)] += weight
+
+    def estimate(self, key):
+        return float(self.table[self.rows, self._columns(key)].min())
+
+    def clear(self):
+        self.table.fill(0)
+
+
+class WindowedHeavyHitters:
+    def __init__(self, window=WINDOW, slots=SLOTS, k=TOP_K, width=CMS_WIDTH, depth=CMS_DEPTH):
+        self.window = window
+        self.interval_ms = window * 1000 // slots
+        self.summaries = [SpaceSaving(k) for _ in range(slots)]
+        self.sketches = [CountMinSketch(width, depth) for _ in range(slots)]
+        self.intervals = [-1] * slots  # interval number each slot currently holds
+        self.latest_ms = 0
+        self.late = 0  # events older than the window when they arrived
+
+    def add(self, key, weight, time_ms):
+        interval = time_ms // self.interval_ms
+        slot = interval % len(self.intervals)
+        held = self.intervals[slot]
+        if held != interval:
+            if held > interval:
+                self.late += 1
+                return
+            self.summaries[slot].clear()
+            self.sketches[slot].clear()
+            self.intervals[slot] = interval
+
+        self.summaries[slot].add(key, weight)
+        self.sketches[slot].add(key, weight)
+        if time_ms > self.latest_ms:
+            self.latest_ms = time_ms
+
+    def _live_slots(self, now_ms):
+        current = now_ms // self.interval_ms
+        oldest = current - len(self.intervals) + 1
+        return [slot for slot, interval in enumerate(self.intervals) if oldest <= interval <= current]
+
+    def top(self, n=10, now_ms=None):
+        """[(key, estimated notional)] for the n heaviest keys in the window ending at now_ms"""
+        live = self._live_slots(now_ms if now_ms is not None else self.latest_ms)
+        candidates = set()
+        for slot in live:
+            candidates.update(self.summaries[slot].counters)
+        totals = [(key, sum(self.sketches[slot].estimate(key) for slot in live)) for key in candidates]
+        totals.sort(key=lambda item: -item[1])
+        return totals[:n]
+
+    def leaderboard(self, n=10, now_ms=None):
+        return [{"symbol": key, "notional": notional} for key, notional in self.top(n, now_ms)]
+
+    def format(self, n=10, now_ms=None):
+        """One-line leaderboard for log output"""
+        entries = self.top(n, now_ms)
+        if not entries:
+            return "-"
+        return "  ".join(f"{key.replace('USDT', '')} ${notional / 1e6:,.2f}M" for key, notional in entries)
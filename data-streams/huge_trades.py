@@ -8,6 +8,13 @@ from termcolor import cprint
 import signal
 import sys
 import random
+from records import Trade
+from quantiles import AdaptiveThreshold, SymbolQuantiles
+from heavy_hitters import WindowedHeavyHitters
+from event_merge import EventMerger
+from checkpoint import Checkpointer, read_log_after
+from sqlite_sink import SqliteSink
+import loop_backend
 
 # list of symbols to track
 symbols = [
@@ -24,15 +31,30 @@ symbols = [
 
 websocket_url_base = "wss://fstream.binance.com/ws/"
 trades_filename = "huge_trades.csv"
+checkpoint_filename = "huge_trades.ckpt"
+sqlite_filename = None  # e.g. "market.db" to also insert large trades into SQLite
+LOG_TIME_COLUMN = 6  # Trade Time in the CSV
 
-# Minimum trade size to track (in USD)
+# Minimum trade size to track (in USD), a percentile of each symbol's trade sizes
+# once it has warmed up, MIN_TRADE_SIZE before that
+MIN_TRADE_PERCENTILE = 99.9
 MIN_TRADE_SIZE = 500000  # $500k minimum
+MIN_TRADE_FLOOR = 25000  # never track anything smaller
 
 # Display formatting thresholds
 BLINK_THRESHOLD = 10000000  # $10M - trades ≥ this will blink
 MILLION_THRESHOLD = 1000000  # $1M - trades ≥ this shown as millions
 BILLION_THRESHOLD = 1000000000  # $1B - trades ≥ this shown as billions
 
+# Leaderboard settings, top symbols by large-trade notional
+LEADERBOARD_WINDOW = 300  # seconds
+LEADERBOARD_SIZE = 10
+LEADERBOARD_INTERVAL = 60  # seconds between printing it
+
+# Merge settings, trades from all symbols are handled in exchange-time order
+MERGE_STREAMS = True
+MERGE_LATENESS_MS = 100
+
 # Connection settings
 MAX_RECONNECT_ATTEMPTS = 10
 BASE_RECONNECT_DELAY = 5  # seconds
@@ -47,31 +69,49 @@ if not os.path.exists(trades_filename):
     with open(trades_filename, "w") as f:
         f.write("Event Time,Symbol,Aggregate Trade ID,Price,Quantity,First Trade ID,Trade Time,Is Buyer Maker,USD Size\n")
 
+trade_sizes = SymbolQuantiles()
+min_trade_size = AdaptiveThreshold(trade_sizes, MIN_TRADE_PERCENTILE, MIN_TRADE_SIZE, floor=MIN_TRADE_FLOOR)
+
 class TradeAggregator:
-    def __init__(self, filename):
+    def __init__(self, filename, bus=None, sink=None):
         self.filename = filename
+        self.bus = bus
+        self.sink = sink
         self.trade_buckets = {}
         self.last_cleanup = datetime.now()
+        self.top_trades = WindowedHeavyHitters(LEADERBOARD_WINDOW)
+        self.last_leaderboard = datetime.now()
+        self.last_event_time = 0
 
-    async def add_trade(self, symbol, second, usd_size, is_buyer_maker, trade_data):
+    async def add_trade(self, trade, second):
         # Only process trades that meet the minimum size requirement
-        if usd_size >= MIN_TRADE_SIZE:
-            trade_key = (symbol, second, is_buyer_maker)
+        usd_size = trade.usd_size
+        if min_trade_size.passes(trade.symbol, usd_size):
+            trade_key = (trade.symbol.upper().replace("USDT", ""), second, trade.is_buyer_maker)
             self.trade_buckets[trade_key] = self.trade_buckets.get(trade_key, 0) + usd_size
+            self.top_trades.add(trade.symbol, usd_size, trade.time)
+            if trade.time > self.last_event_time:
+                self.last_event_time = trade.time
+            
+            if self.bus is not None:
+                self.bus.publish(trade)
             
             # Save individual large trade to CSV
-            await self.save_trade_to_csv(trade_data, usd_size)
+            await self.save_trade_to_csv(trade)
 
-    async def save_trade_to_csv(self, trade_data, usd_size):
+    async def save_trade_to_csv(self, trade):
         """Save individual large trade to CSV file"""
         try:
-            trade_time = datetime.fromtimestamp(trade_data["T"] / 1000, pytz.timezone("US/Central"))
+            trade_time = datetime.fromtimestamp(trade.time / 1000, pytz.timezone("US/Central"))
             readable_trade_time = trade_time.strftime("%Y-%m-%d %H:%M:%S")
             
-            csv_line = f"{readable_trade_time},{trade_data['s']},{trade_data['a']},{trade_data['p']},{trade_data['q']},{trade_data['f']},{trade_data['T']},{trade_data['m']},{usd_size:.2f}\n"
+            price, quantity = trade.csv_price_quantity()
+            csv_line = f"{readable_trade_time},{trade.symbol},{trade.agg_id},{price},{quantity},{trade.first_id},{trade.time},{trade.is_buyer_maker},{trade.usd_size:.2f}\n"
             
             with open(self.filename, "a") as f:
                 f.write(csv_line)
+            if self.sink is not None:
+                self.sink.add(trade)
         except Exception as e:
             print(f"Error saving trade to CSV: {e}")
 
@@ -82,12 +122,16 @@ class TradeAggregator:
             self._cleanup_old_entries()
             self.last_cleanup = current_time
         
+        if (current_time - self.last_leaderboard).seconds >= LEADERBOARD_INTERVAL:
+            cprint(f"Top large-trade notional ({LEADERBOARD_WINDOW // 60}m): {self.top_trades.format(LEADERBOARD_SIZE)}", "white", "on_black")
+            self.last_leaderboard = current_time
+        
         deletions = []
         current_time_str = current_time.strftime("%H:%M:%S")
         for trade_key, usd_size in self.trade_buckets.items():
             symbol, second, is_buyer_maker = trade_key
-            # Check if trade is from a previous second and meets size threshold
-            if second < current_time_str and usd_size >= MIN_TRADE_SIZE:
+            # Check if trade is from a previous second, buckets only hold trades that met the threshold
+            if second < current_time_str:
                 attrs = ["bold"]
                 back_color = "on_blue" if not is_buyer_maker else "on_magenta"
                 trad_type = "BUY" if not is_buyer_maker else "SELL"
@@ -116,6 +160,37 @@ class TradeAggregator:
         for trade_key in deletions:
             del self.trade_buckets[trade_key]
 
+    def snapshot_state(self):
+        """Everything a restart would otherwise lose, for checkpoint.Checkpointer"""
+        return {
+            "trade_buckets": self.trade_buckets,
+            "top_trades": self.top_trades,
+            "trade_sizes": trade_sizes.snapshot_state(),
+            "last_event_time": self.last_event_time,
+        }
+
+    def restore_state(self, state):
+        self.trade_buckets = state["trade_buckets"]
+        self.top_trades = state["top_trades"]
+        trade_sizes.restore_state(state["trade_sizes"])
+        self.last_event_time = state["last_event_time"]
+
+    def catch_up(self):
+        """Replays large trades the CSV recorded after the checkpoint into the leaderboard"""
+        if not os.path.exists(self.filename):
+            return 0
+        replayed = 0
+        for row in read_log_after(self.filename, self.last_event_time, LOG_TIME_COLUMN):
+            trade_time = int(row[LOG_TIME_COLUMN])
+            self.top_trades.add(row[1], float(row[8]), trade_time)
+            self.last_event_time = max(self.last_event_time, trade_time)
+            replayed += 1
+        return replayed
+
+    def leaderboard(self, n=LEADERBOARD_SIZE):
+        """Top symbols by large-trade notional over the leaderboard window"""
+        return self.top_trades.leaderboard(n)
+
     def _cleanup_old_entries(self):
         """Remove entries older than 10 minutes to prevent memory leaks"""
         current_time = datetime.now()
@@ -151,10 +226,14 @@ class TradeAggregator:
 trade_aggregator = TradeAggregator(trades_filename)
 
 class WebSocketManager:
-    def __init__(self, symbol, uri, aggregator):
+    def __init__(self, symbol, uri, aggregator, listeners=None, merger=None):
         self.symbol = symbol
         self.uri = uri
         self.aggregator = aggregator
+        # called with (symbol, trade_time, price, quantity, is_buyer_maker) for every trade
+        self.listeners = listeners or []
+        # when set, trades go through the merger and come back to handle_trade in global time order
+        self.merger = merger
         self.reconnect_attempts = 0
         self.last_reconnect = None
         self.websocket = None
@@ -226,21 +305,11 @@ class WebSocketManager:
     async def process_message(self, message):
         """Process a single message"""
         try:
-            data = json.loads(message)
-            usd_size = float(data["p"]) * float(data["q"])
-            
-            # Only process trades that meet the minimum size requirement
-            if usd_size >= MIN_TRADE_SIZE:
-                trade_time = datetime.fromtimestamp(data["T"] / 1000, pytz.timezone("US/Central"))
-                readable_trade_time = trade_time.strftime("%H:%M:%S")
-
-                await self.aggregator.add_trade(
-                    self.symbol.upper().replace("USDT", ""), 
-                    readable_trade_time, 
-                    usd_size, 
-                    data["m"], 
-                    data
-                )
+            trade = Trade.from_message(json.loads(message))
+            if self.merger is not None:
+                self.merger.push(self.symbol, trade)
+                return
+            await self.handle_trade(trade)
         except json.JSONDecodeError as e:
             print(f"JSON decode error for {self.symbol}: {e}")
         except KeyError as e:
@@ -250,6 +319,27 @@ class WebSocketManager:
         except Exception as e:
             print(f"Error processing {self.symbol} message: {e}")
 
+    async def handle_trade(self, trade):
+        """Hands a parsed trade to the listeners and the aggregator"""
+        try:
+            usd_size = trade.usd_size
+            
+            for listener in self.listeners:
+                listener(self.symbol, trade.time, trade.price, trade.quantity, trade.is_buyer_maker)
+            
+            if self.aggregator is None:
+                return
+
+            # Only process trades that meet the symbol's minimum size
+            trade_sizes.add(self.symbol, usd_size)
+            if min_trade_size.passes(self.symbol, usd_size):
+                trade_time = datetime.fromtimestamp(trade.time / 1000, pytz.timezone("US/Central"))
+                readable_trade_time = trade_time.strftime("%H:%M:%S")
+
+                await self.aggregator.add_trade(trade, readable_trade_time)
+        except Exception as e:
+            print(f"Error processing {self.symbol} trade: {e}")
+
     async def run(self):
         """Main connection loop with automatic reconnection"""
         while not self.should_stop:
@@ -303,18 +393,30 @@ async def main():
     filename = "huge_trades.csv"
     print("Starting Binance trade aggregator...")
     print(f"Tracking symbols: {symbols}")
-    print(f"Minimum trade size: ${MIN_TRADE_SIZE:,}")
+    print(f"Minimum trade size: {MIN_TRADE_PERCENTILE}th percentile per symbol (${MIN_TRADE_SIZE:,} while warming up)")
+    
+    # Pick up where the last run left off
+    checkpointer = Checkpointer(checkpoint_filename, {"huge_trades": trade_aggregator})
+    checkpointer.restore()
+    if sqlite_filename:
+        trade_aggregator.sink = SqliteSink(sqlite_filename)
     
     # Create WebSocket managers for each symbol
+    merger = EventMerger(MERGE_LATENESS_MS) if MERGE_STREAMS else None
     managers = []
     for symbol in symbols:
         uri = f"{websocket_url_base}{symbol.lower()}@aggTrade"
-        manager = WebSocketManager(symbol, uri, trade_aggregator)
+        manager = WebSocketManager(symbol, uri, trade_aggregator, merger=merger)
         managers.append(manager)
     
     # Create tasks for each manager
     manager_tasks = [asyncio.create_task(manager.run()) for manager in managers]
+    if merger is not None:
+        by_symbol = {manager.symbol: manager for manager in managers}
+        merger.add_listener(lambda trade: by_symbol[trade.symbol].handle_trade(trade))
+        manager_tasks.append(asyncio.create_task(merger.run()))
     print_task = asyncio.create_task(print_aggregated_trades_every_seconds(trade_aggregator))
+    manager_tasks.append(asyncio.create_task(checkpointer.run()))
     
     print("Connecting to Binance WebSocket streams...")
     
@@ -330,6 +432,10 @@ async def main():
         
         # Wait for tasks to complete
         await asyncio.gather(*manager_tasks, print_task, return_exceptions=True)
+    finally:
+        checkpointer.save_now()
+        if trade_aggregator.sink is not None:
+            trade_aggregator.sink.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    loop_backend.run(main())
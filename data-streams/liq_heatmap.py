@@ -0,0 +1,479 @@
+"""
+Liquidation heatmaps: notional binned by symbol, price level and time into decaying 2-D NumPy grids.
+
+Price levels are log-spaced, BIN_BPS apart, so one bin is the same relative
+width for BTC and for a 0.001 alt. Level k covers prices from
+(1 + BIN_BPS/1e4)^k up to level k + 1.
+
+Streaming. Every symbol has a grid[side, time bucket, price bin] of PRICE_BINS
+levels centred on where it trades. A print outside the window is held back.
+The window only moves when the current price is out there too, or when
+RECENTER_PRINTS prints in a row land in the same place, and then the held
+prints are replayed. Held prints that never get confirmed are dropped as
+outliers, so one bad price can't wipe the levels around the market. The time axis is a ring of TIME_BUCKETS buckets of BUCKET_SECONDS each, and
+a bucket is cleared when the ring comes back to it. Decay is applied when a
+query runs: bucket weights of 0.5 ** (age / HALF_LIFE) turn the grid into a
+price profile with one vector-matrix product, so adding a liquidation stays
+O(1). The heatmap duck-types EventBus.publish. Liquidations go into the grid,
+and mark prices and trades keep the current price that clusters() measures
+from.
+
+    heatmap = LiquidationHeatmap()
+    monitor = LiquidationMonitor(bus=heatmap)
+    heatmap.clusters("BTCUSDT", within_pct=3)   # strongest levels near the current price
+
+Offline. heatmap_from_rows() bins whole converted liqs / big_liqs files
+(csv_convert.py output) for every symbol at once. Both files record the same
+stream, so load_liquidations() deduplicates them first. np.unique finds the
+occupied (symbol, time bucket, price level) cells and one bincount sums
+them. The result is sparse, so a symbol that traded across a wide range or
+a long gap costs only the cells it filled. to_dense() turns one symbol's
+cells into a time x price grid:
+
+    python liq_heatmap.py converted/liqs.npy converted/big_liqs.npy --bucket-minutes 60 --output heatmaps.npz
+    python liq_heatmap.py --live
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+import csv_convert
+import loop_backend
+from records import Liquidation, MarkPrice, Trade
+
+# Grid settings
+BIN_BPS = 10  # width of a price level
+PRICE_BINS = 512  # levels per symbol in the streaming grid, +-29% around the centre at 10 bps
+BUCKET_SECONDS = 60
+TIME_BUCKETS = 240  # 4 hours of one-minute buckets
+HALF_LIFE = 1800  # seconds for a bucket's weight to halve
+RECENTER_PRINTS = 3  # out-of-window prints in a row that move the window without a current price there
+
+# Cluster settings
+CLUSTER_RADIUS = 2  # neighbouring levels summed into a cluster on each side
+DEFAULT_WITHIN_PCT = 5.0
+DEFAULT_CLUSTERS = 5
+
+# Offline settings
+OFFLINE_BUCKET_SECONDS = 3600
+OFFLINE_BIN_BPS = 25
+MAX_DENSE_CELLS = 10000000
+
+CELL_DTYPE = np.dtype([
+    ("time", "<i8"),  # bucket start, ms
+    ("level", "<i8"),
+    ("price", "<f8"),  # lower edge of the level
+    ("usd", "<f8"),
+])
+
+# Live display settings
+PRINT_INTERVAL = 30  # seconds
+PRINT_SYMBOLS = 5
+
+SIDES = ("SELL", "BUY")  # SELL: longs liquidated, BUY: shorts liquidated
+
+
+def log_step(bin_bps):
+    return math.log1p(bin_bps / 10000)
+
+
+def level_of(price, step):
+    return int(math.floor(math.log(price) / step))
+
+
+def level_price(level, step):
+    """Lower edge of a price level"""
+    return math.exp(level * step)
+
+
+class SymbolGrid:
+    """One symbol's ring of time buckets by price levels, per side"""
+
+    def __init__(self, center_level, price_bins=PRICE_BINS, time_buckets=TIME_BUCKETS):
+        self.lo = center_level - price_bins // 2
+        self.grid = np.zeros((2, time_buckets, price_bins))
+        self.bucket_ids = np.full(time_buckets, -1, dtype=np.int64)  # absolute bucket each ring slot holds
+        self.latest_bucket = -1
+        self.price = None  # current price, from mark prices / trades / the latest accepted liquidation
+        self.held = deque()  # (side, level, usd, bucket) of out-of-window prints waiting for confirmation
+        self.added = 0
+        self.too_old = 0
+        self.outliers = 0
+
+    def recenter(self, level):
+        """Moves the price window to centre on level, keeping what still fits"""
+        bins = self.grid.shape[2]
+        new_lo = level - bins // 2
+        shift = new_lo - self.lo
+        shifted = np.zeros_like(self.grid)
+        if abs(shift) < bins:
+            if shift > 0:
+                shifted[:, :, :bins - shift] = self.grid[:, :, shift:]
+            else:
+                shifted[:, :, -shift:] = self.grid[:, :, :bins + shift]
+        self.grid = shifted
+        self.lo = new_lo
+
+    def _confirms_move(self, level, price_level):
+        """Whether the held out-of-window prints are where the market went, rather than bad prices"""
+        near = self.grid.shape[2] // 4
+        if price_level is not None and abs(level - price_level) <= near:
+            return True
+        return len(self.held) >= RECENTER_PRINTS and all(abs(held[1] - level) <= near for held in self.held)
+
+    def _put(self, side, level, usd, bucket):
+        time_buckets = self.grid.shape[1]
+        slot = bucket % time_buckets
+        if self.bucket_ids[slot] != bucket:
+            if bucket < self.bucket_ids[slot]:
+                self.too_old += 1  # the ring moved on while it was held
+                return
+            self.grid[:, slot, :] = 0.0
+            self.bucket_ids[slot] = bucket
+        self.grid[side, slot, level - self.lo] += usd
+        if bucket > self.latest_bucket:
+            self.latest_bucket = bucket
+        self.added += 1
+
+    def add(self, side, level, usd, bucket, price_level=None):
+        """price_level is the level of the current price, if there is one"""
+        if bucket <= self.latest_bucket - self.grid.shape[1]:
+            self.too_old += 1
+            return
+        bins = self.grid.shape[2]
+        if 0 <= level - self.lo < bins:
+            # back inside, whatever was held out there didn't follow through
+            self.outliers += len(self.held)
+            self.held.clear()
+            self._put(side, level, usd, bucket)
+            return
+
+        self.held.append((side, level, usd, bucket))
+        if not self._confirms_move(level, price_level):
+            if len(self.held) > RECENTER_PRINTS:
+                self.held.popleft()
+                self.outliers += 1
+            return
+        self.recenter(level)
+        for held in self.held:
+            if 0 <= held[1] - self.lo < bins:
+                self._put(*held)
+            else:
+                self.outliers += 1
+        self.held.clear()
+
+    def weights(self, now_bucket, bucket_seconds, half_life):
+        """Decay weight of every ring slot, 0 for slots that have aged out"""
+        age = now_bucket - self.bucket_ids
+        live = (self.bucket_ids >= 0) & (age >= 0) & (age < len(self.bucket_ids))
+        return np.where(live, 0.5 ** (age * bucket_seconds / half_life), 0.0)
+
+    def decayed(self, now_bucket, bucket_seconds, half_life):
+        """grid[side, slot, bin] with the decay applied"""
+        return self.grid * self.weights(now_bucket, bucket_seconds, half_life)[None, :, None]
+
+    def profile(self, now_bucket, bucket_seconds, half_life):
+        """Decayed notional per side and price level, shape (2, bins)"""
+        return self.weights(now_bucket, bucket_seconds, half_life) @ self.grid
+
+
+class LiquidationHeatmap:
+    def __init__(self, bin_bps=BIN_BPS, price_bins=PRICE_BINS, bucket_seconds=BUCKET_SECONDS,
+                 time_buckets=TIME_BUCKETS, half_life=HALF_LIFE):
+        self.step = log_step(bin_bps)
+        self.price_bins = price_bins
+        self.bucket_seconds = bucket_seconds
+        self.bucket_ms = bucket_seconds * 1000
+        self.time_buckets = time_buckets
+        self.half_life = half_life
+        self.grids = {}  # symbol -> SymbolGrid
+
+    def _grid(self, symbol, level):
+        grid = self.grids.get(symbol)
+        if grid is None:
+            grid = self.grids[symbol] = SymbolGrid(level, self.price_bins, self.time_buckets)
+        return grid
+
+    def add(self, symbol, side, price, usd_size, time_ms):
+        """True when the liquidation went into the grid, False when it was too old or is held out of the window"""
+        if price <= 0 or usd_size <= 0:
+            return False
+        level = level_of(price, self.step)
+        grid = self._grid(symbol, level)
+        price_level = level_of(grid.price, self.step) if grid.price else None
+        added = grid.added
+        grid.add(0 if side == "SELL" else 1, level, usd_size, int(time_ms // self.bucket_ms), price_level)
+        if grid.added == added:
+            return False
+        if grid.price is None:
+            grid.price = price
+        return True
+
+    def add_rows(self, rows):
+        """Warms the grids from a converted liquidation array (csv_convert.LIQ_DTYPE), vectorized per symbol"""
+        rows = rows[(rows["price"] > 0) & (rows["usd_size"] > 0)]
+        if not len(rows):
+            return
+        symbols, inverse = np.unique(rows["symbol"], return_inverse=True)
+        levels = np.floor(np.log(rows["price"]) / self.step).astype(np.int64)
+        buckets = rows["time"] // self.bucket_ms
+        sides = (rows["side"] == b"BUY").astype(np.int64)
+        for index, raw in enumerate(symbols):
+            symbol = raw.decode()
+            mine = np.flatnonzero(inverse == index)
+            known = self.grids.get(symbol)
+            latest_bucket = max(int(buckets[mine].max()), known.latest_bucket if known is not None else -1)
+            recent = mine[buckets[mine] > latest_bucket - self.time_buckets]
+            if not len(recent):
+                continue
+            # centred on the median level, a few bad prints don't move it
+            center = int(np.median(levels[recent]))
+            grid = self._grid(symbol, center)
+            grid.too_old += len(mine) - len(recent)
+            grid.latest_bucket = max(grid.latest_bucket, latest_bucket)
+            if not grid.lo <= center < grid.lo + self.price_bins:
+                grid.recenter(center)
+            bins = levels[recent] - grid.lo
+            inside = (bins >= 0) & (bins < self.price_bins)
+            grid.outliers += int((~inside).sum())
+            mine, bins = recent[inside], bins[inside]
+            if not len(mine):
+                continue
+            grid.price = float(rows["price"][mine[np.argmax(rows["time"][mine])]])
+            slots = buckets[mine] % self.time_buckets
+            for slot, bucket in zip(*np.unique(np.stack([slots, buckets[mine]]), axis=1)):
+                if grid.bucket_ids[slot] != bucket:
+                    grid.grid[:, slot, :] = 0.0
+                    grid.bucket_ids[slot] = bucket
+            np.add.at(grid.grid, (sides[mine], slots, bins), rows["usd_size"][mine])
+            grid.added += len(mine)
+
+    def stats(self):
+        return {
+            "symbols": len(self.grids),
+            "added": sum(grid.added for grid in self.grids.values()),
+            "too_old": sum(grid.too_old for grid in self.grids.values()),
+            "outliers": sum(grid.outliers for grid in self.grids.values()),
+            "held": sum(len(grid.held) for grid in self.grids.values()),
+        }
+
+    def set_price(self, symbol, price):
+        grid = self.grids.get(symbol)
+        if grid is not None and price > 0:
+            grid.price = price
+
+    def publish(self, record):
+        """Duck-types EventBus.publish"""
+        if isinstance(record, Liquidation):
+            if self.add(record.symbol, record.side, record.price, record.usd_size, record.time):
+                self.set_price(record.symbol, record.price)
+        elif isinstance(record, MarkPrice):
+            self.set_price(record.symbol, record.mark_price)
+        elif isinstance(record, Trade):
+            self.set_price(record.symbol, record.price)
+
+    def _now_bucket(self, now):
+        return int((now if now is not None else time.time() * 1000) // self.bucket_ms)
+
+    def heatmap(self, symbol, now=None):
+        """(decayed grid[side, time bucket oldest first, price bin], lower price edge of every bin)"""
+        grid = self.grids[symbol]
+        now_bucket = self._now_bucket(now)
+        decayed = grid.decayed(now_bucket, self.bucket_seconds, self.half_life)
+        order = np.argsort(np.where(grid.bucket_ids >= 0, grid.bucket_ids, np.iinfo(np.int64).max))
+        prices = np.exp((grid.lo + np.arange(self.price_bins)) * self.step)
+        return decayed[:, order, :], prices
+
+    def total(self, symbol, now=None):
+        """Decayed notional currently in a symbol's grid"""
+        grid = self.grids.get(symbol)
+        if grid is None:
+            return 0.0
+        return float(grid.profile(self._now_bucket(now), self.bucket_seconds, self.half_life).sum())
+
+    def clusters(self, symbol, price=None, within_pct=DEFAULT_WITHIN_PCT, n=DEFAULT_CLUSTERS, now=None):
+        """
+        Strongest liquidation clusters within within_pct of price (default the current price), strongest first.
+        A cluster is a local maximum of the decayed profile summed over CLUSTER_RADIUS levels on each side.
+        """
+        grid = self.grids.get(symbol)
+        if grid is None:
+            return []
+        price = price if price is not None else grid.price
+        if price is None or price <= 0:
+            return []  # no price yet, e.g. every warm-up row fell outside the window
+        profile = grid.profile(self._now_bucket(now), self.bucket_seconds, self.half_life)
+        kernel = np.ones(2 * CLUSTER_RADIUS + 1)
+        by_side = np.stack([np.convolve(profile[side], kernel, mode="same") for side in range(2)])
+        smoothed = by_side.sum(axis=0)
+
+        levels = grid.lo + np.arange(self.price_bins)
+        centre = level_of(price, self.step)
+        reach = int(math.ceil(math.log1p(within_pct / 100) / self.step))
+        padded = np.concatenate(([-1.0], smoothed, [-1.0]))
+        peaks = (smoothed > padded[:-2]) & (smoothed >= padded[2:]) & (smoothed > 0)
+        peaks &= np.abs(levels - centre) <= reach
+        candidates = np.flatnonzero(peaks)
+        strongest = candidates[np.argsort(smoothed[candidates])[::-1][:n]]
+
+        result = []
+        for index in strongest:
+            low = level_price(int(levels[index]) - CLUSTER_RADIUS, self.step)
+            high = level_price(int(levels[index]) + CLUSTER_RADIUS + 1, self.step)
+            level = math.sqrt(level_price(int(levels[index]), self.step) * level_price(int(levels[index]) + 1, self.step))
+            result.append({
+                "price": level,
+                "low": low,
+                "high": high,
+                "usd": float(smoothed[index]),
+                "longs_usd": float(by_side[0, index]),
+                "shorts_usd": float(by_side[1, index]),
+                "distance_pct": (level / price - 1) * 100,
+            })
+        return result
+
+    def hottest(self, n=PRINT_SYMBOLS, now=None):
+        """Symbols with the most decayed notional"""
+        totals = [(symbol, self.total(symbol, now)) for symbol in self.grids]
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:n]
+
+
+def heatmap_from_rows(rows, bin_bps=OFFLINE_BIN_BPS, bucket_seconds=OFFLINE_BUCKET_SECONDS):
+    """
+    Full-history heatmap of every symbol in a converted liquidation array, in one pass, no decay.
+    Returns symbol -> occupied cells (CELL_DTYPE) sorted by time, then price level.
+    """
+    rows = rows[(rows["price"] > 0) & (rows["usd_size"] > 0)]
+    if not len(rows):
+        return {}
+    step = log_step(bin_bps)
+    bucket_ms = bucket_seconds * 1000
+    symbols, inverse = np.unique(rows["symbol"], return_inverse=True)
+
+    keys = np.empty(len(rows), dtype=[("symbol", "<i8"), ("bucket", "<i8"), ("level", "<i8")])
+    keys["symbol"] = inverse
+    keys["bucket"] = rows["time"] // bucket_ms
+    keys["level"] = np.floor(np.log(rows["price"]) / step).astype(np.int64)
+    occupied, cell_of = np.unique(keys, return_inverse=True)
+    usd = np.bincount(cell_of.ravel(), weights=rows["usd_size"], minlength=len(occupied))
+
+    cells = np.empty(len(occupied), dtype=CELL_DTYPE)
+    cells["time"] = occupied["bucket"] * bucket_ms
+    cells["level"] = occupied["level"]
+    cells["price"] = np.exp(occupied["level"] * step)
+    cells["usd"] = usd
+    bounds = np.searchsorted(occupied["symbol"], np.arange(len(symbols) + 1))
+    return {raw.decode(): cells[bounds[i]:bounds[i + 1]] for i, raw in enumerate(symbols)}
+
+
+def to_dense(cells, bin_bps=OFFLINE_BIN_BPS, bucket_seconds=OFFLINE_BUCKET_SECONDS, max_cells=MAX_DENSE_CELLS):
+    """
+    One symbol's cells as (grid[time bucket, price level], first bucket start ms, lower edge of the first level).
+    Raises ValueError past max_cells, e.g. for a whole year of a symbol that moved 10x.
+    """
+    if not len(cells):
+        return np.zeros((0, 0)), None, None
+    bucket_ms = bucket_seconds * 1000
+    buckets = cells["time"] // bucket_ms
+    first_bucket, first_level = int(buckets.min()), int(cells["level"].min())
+    shape = (int(buckets.max()) - first_bucket + 1, int(cells["level"].max()) - first_level + 1)
+    if shape[0] * shape[1] > max_cells:
+        raise ValueError(f"Dense heatmap would be {shape[0]} x {shape[1]} cells, narrow the time range or widen the bins")
+    grid = np.zeros(shape)
+    grid[buckets - first_bucket, cells["level"] - first_level] = cells["usd"]
+    return grid, first_bucket * bucket_ms, level_price(first_level, log_step(bin_bps))
+
+
+def strongest_levels(cells, n=3):
+    """(price, usd) of the levels with the most notional across a symbol's offline cells"""
+    levels, level_of_cell = np.unique(cells["level"], return_inverse=True)
+    profile = np.bincount(level_of_cell.ravel(), weights=cells["usd"], minlength=len(levels))
+    prices = np.bincount(level_of_cell.ravel(), weights=cells["price"], minlength=len(levels)) / np.bincount(level_of_cell.ravel())
+    top = np.argsort(profile)[::-1][:n]
+    return [(float(prices[index]), float(profile[index])) for index in top if profile[index] > 0]
+
+
+def load_liquidations(paths):
+    """
+    Converted liquidation arrays, .csv paths are converted first. liqs and big_liqs record the same
+    stream, so the combined rows are deduplicated like csv_convert does within one file
+    """
+    arrays = []
+    for path in paths:
+        if path.endswith(".csv"):
+            path = csv_convert.convert(path)["output"]
+        rows = csv_convert.load(path, mmap=False)
+        if rows.dtype != csv_convert.LIQ_DTYPE:
+            raise ValueError(f"{path} is not a converted liquidation file")
+        arrays.append(rows)
+    rows, duplicates = csv_convert.sort_and_dedupe("liquidations", np.concatenate(arrays))
+    return rows, duplicates
+
+
+def format_clusters(symbol, clusters):
+    parts = [f"{c['price']:.6g} ({c['distance_pct']:+.1f}%) ${c['usd'] / 1e3:,.0f}k" for c in clusters]
+    return f"{symbol:<14}" + ("  ".join(parts) if parts else "no clusters nearby")
+
+
+async def print_clusters_every(heatmap, seconds=PRINT_INTERVAL):
+    while True:
+        await asyncio.sleep(seconds)
+        print(f"--- liquidation clusters within {DEFAULT_WITHIN_PCT}% ---")
+        for symbol, _ in heatmap.hottest():
+            print(format_clusters(symbol, heatmap.clusters(symbol, n=3)))
+
+
+async def run_live():
+    import funding
+    from liqs import LiquidationMonitor
+
+    heatmap = LiquidationHeatmap()
+    monitor = LiquidationMonitor(bus=heatmap)
+    await asyncio.gather(
+        monitor.run(),
+        print_clusters_every(heatmap),
+        *(funding.binance_funding_stream(symbol, funding.shared_symbol_counter, heatmap) for symbol in funding.symbols),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Liquidation heatmaps over converted files, or live")
+    parser.add_argument("files", nargs="*", help="converted .npy (or .csv) liquidation files")
+    parser.add_argument("--bin-bps", type=float, default=OFFLINE_BIN_BPS)
+    parser.add_argument("--bucket-minutes", type=float, default=OFFLINE_BUCKET_SECONDS / 60)
+    parser.add_argument("--output", default=None, help="save every symbol's cells to this .npz")
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        loop_backend.run(run_live())
+        return
+    if not args.files:
+        parser.error("give converted liquidation files or --live")
+
+    start = time.time()
+    rows, duplicates = load_liquidations(args.files)
+    heatmaps = heatmap_from_rows(rows, args.bin_bps, int(args.bucket_minutes * 60))
+    elapsed = time.time() - start
+    cells = sum(len(symbol_cells) for symbol_cells in heatmaps.values())
+    print(f"{len(rows):,} liquidations ({duplicates:,} duplicates dropped) -> {len(heatmaps)} symbol heatmaps "
+          f"({cells:,} occupied cells) in {elapsed:.2f}s")
+
+    totals = sorted(((symbol_cells["usd"].sum(), symbol) for symbol, symbol_cells in heatmaps.items()), reverse=True)
+    for total, symbol in totals[:10]:
+        levels = "  ".join(f"{price:.6g} ${usd / 1e3:,.0f}k" for price, usd in strongest_levels(heatmaps[symbol]))
+        print(f"{symbol:<14}${total / 1e6:>8,.2f}M  {levels}")
+
+    if args.output:
+        np.savez_compressed(args.output, **heatmaps)
+        print(f"Saved to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
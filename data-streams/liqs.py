@@ -8,23 +8,53 @@ import pytz
 from websockets import connect
 from termcolor import cprint
 import logging
+from records import Liquidation
+from quantiles import AdaptiveThreshold, SymbolQuantiles
+from heavy_hitters import WindowedHeavyHitters
+from checkpoint import Checkpointer, read_log_after
+from pipeline import COALESCE, KEEP, SHED, Lane, Pipeline
+from sqlite_sink import SqliteSink
+import loop_backend
 
 # Configuration
 WEBSOCKET_URL = "wss://fstream.binance.com/ws/!forceOrder@arr"
 FILENAME = "liqs.csv"
+CHECKPOINT_FILE = "liqs.ckpt"
+SQLITE_FILE = None  # e.g. "market.db" to also insert liquidations into SQLite
+LOG_TIME_COLUMN = 10  # order_trade_time in the CSV
 TIMEZONE = "US/Central"
 
-# Display thresholds
+# Display thresholds, used until a symbol has seen LIQ_WARMUP liquidations
 MIN_DISPLAY_SIZE = 3000
 BOLD_THRESHOLD = 10000
 BLINK_THRESHOLD_1 = 100000
 BLINK_THRESHOLD_2 = 250000
 HUGE_THRESHOLD = 1000000  # New: $1M+ liquidations
 
+# Adaptive display tiers, percentiles of each symbol's liquidation sizes
+MIN_DISPLAY_PERCENTILE = 25
+BOLD_PERCENTILE = 75
+BLINK_PERCENTILE_1 = 95
+BLINK_PERCENTILE_2 = 98
+HUGE_PERCENTILE = 99.5
+MIN_DISPLAY_FLOOR = 1000
+LIQ_WARMUP = 200
+LIQ_DECAY_EVERY = 5000
+
+# Leaderboard settings, top symbols by liquidated notional per window
+LEADERBOARD_WINDOWS = {"5m": 300, "1h": 3600}
+LEADERBOARD_SIZE = 10
+
 # Performance settings
 BATCH_SIZE = 50  # Write to file every N messages
 STATS_INTERVAL = 100  # Print stats every N messages
 
+# Pipeline settings, persistence is never dropped, analytics coalesce, display is shed first
+PERSIST_QUEUE_SIZE = 10000  # liquidations queued for the CSV before the receive loop waits
+ANALYTICS_QUEUE_SIZE = 1000  # symbols with a pending leaderboard update
+DISPLAY_QUEUE_SIZE = 500
+DISPLAY_LAG_BUDGET_MS = 250  # older liquidations are skipped instead of printed
+
 # Connection settings
 PING_INTERVAL = 20
 PING_TIMEOUT = 10
@@ -45,12 +75,37 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class LiquidationMonitor:
-    def __init__(self):
+    def __init__(self, bus=None, url=WEBSOCKET_URL, sink=None):
+        self.bus = bus
+        self.url = url
+        self.sink = sink
         self.message_count = 0
         self.start_time = datetime.now()
         self.batch_buffer = []
         self.running = True
         self.reconnect_attempts = 0
+        self.last_event_time = 0
+        
+        # Per-symbol liquidation sizes behind the display tiers
+        self.liq_sizes = SymbolQuantiles(warmup=LIQ_WARMUP, decay_every=LIQ_DECAY_EVERY)
+        self.min_display_size = AdaptiveThreshold(self.liq_sizes, MIN_DISPLAY_PERCENTILE, MIN_DISPLAY_SIZE, floor=MIN_DISPLAY_FLOOR)
+        self.bold_threshold = AdaptiveThreshold(self.liq_sizes, BOLD_PERCENTILE, BOLD_THRESHOLD)
+        self.blink_threshold_1 = AdaptiveThreshold(self.liq_sizes, BLINK_PERCENTILE_1, BLINK_THRESHOLD_1)
+        self.blink_threshold_2 = AdaptiveThreshold(self.liq_sizes, BLINK_PERCENTILE_2, BLINK_THRESHOLD_2)
+        self.huge_threshold = AdaptiveThreshold(self.liq_sizes, HUGE_PERCENTILE, HUGE_THRESHOLD)
+        
+        # Heaviest symbols by liquidated notional across the whole stream
+        self.top_liquidations = {name: WindowedHeavyHitters(seconds) for name, seconds in LEADERBOARD_WINDOWS.items()}
+        
+        # Everything after parsing runs from the pipeline, in priority order
+        self.pipeline = Pipeline([
+            Lane("persist", self._persist, KEEP, maxsize=PERSIST_QUEUE_SIZE),
+            Lane("analytics", self._update_leaderboards, COALESCE, maxsize=ANALYTICS_QUEUE_SIZE,
+                 prepare=lambda liquidation: (liquidation.symbol, liquidation.usd_size, liquidation.time),
+                 key=lambda update: update[0],
+                 merge=lambda waiting, update: (update[0], waiting[1] + update[1], max(waiting[2], update[2]))),
+            Lane("display", self._display, SHED, maxsize=DISPLAY_QUEUE_SIZE, lag_budget_ms=DISPLAY_LAG_BUDGET_MS),
+        ])
         
         # Initialize CSV file
         self._init_csv_file()
@@ -85,7 +140,7 @@ class LiquidationMonitor:
             logger.error(f"Error formatting time: {e}")
             return "00:00:00"
     
-    def _get_display_config(self, usd_size, side):
+    def _get_display_config(self, usd_size, side, symbol):
         """Get display configuration based on USD size and side"""
         # Base configuration
         liquidation_type = "L LIQ" if side == "SELL" else "S LIQ"
@@ -95,22 +150,22 @@ class LiquidationMonitor:
         repeat_count = 1
         
         # Enhanced display logic based on size
-        if usd_size > HUGE_THRESHOLD:  # $1M+
+        if usd_size > self.huge_threshold.value(symbol):  # top 0.5% ($1M+ while warming up)
             stars = "*" * 5
             color = "yellow"  # Special color for huge liquidations
             attrs = ["bold", "blink"]
             repeat_count = 6
-        elif usd_size > BLINK_THRESHOLD_2:  # $250K+
+        elif usd_size > self.blink_threshold_2.value(symbol):  # top 2% ($250K+ while warming up)
             stars = "*" * 3
             color = base_color
             attrs = ["bold", "blink"]
             repeat_count = 4
-        elif usd_size > BLINK_THRESHOLD_1:  # $100K+
+        elif usd_size > self.blink_threshold_1.value(symbol):  # top 5% ($100K+ while warming up)
             stars = "*" * 1
             color = base_color
             attrs = ["bold", "blink"]
             repeat_count = 2
-        elif usd_size > BOLD_THRESHOLD:  # $10K+
+        elif usd_size > self.bold_threshold.value(symbol):  # top 25% ($10K+ while warming up)
             color = base_color
             attrs = ["bold"]
         else:  # $3K+
@@ -124,18 +179,18 @@ class LiquidationMonitor:
             'repeat_count': repeat_count
         }
     
-    def _display_liquidation(self, order_data, usd_size):
+    def _display_liquidation(self, liquidation, usd_size):
         """Display liquidation information with enhanced formatting"""
-        if usd_size < MIN_DISPLAY_SIZE:
+        if usd_size < self.min_display_size.value(liquidation.symbol):
             return
         
         try:
-            symbol = order_data["s"].replace("USDT", "")
-            side = order_data["S"]
-            timestamp = int(order_data["T"])
+            symbol = liquidation.symbol.replace("USDT", "")
+            side = liquidation.side
+            timestamp = liquidation.time
             
             # Get display configuration
-            config = self._get_display_config(usd_size, side)
+            config = self._get_display_config(usd_size, side, liquidation.symbol)
             
             # Format output
             symbol_short = symbol[:4]
@@ -159,30 +214,40 @@ class LiquidationMonitor:
     def _process_message(self, msg):
         """Process a single liquidation message"""
         try:
-            order_data = json.loads(msg)["o"]
+            liquidation = Liquidation.from_message(json.loads(msg)["o"])
             
             # Extract key data
-            filled_quantity = float(order_data["z"])
-            price = float(order_data["p"])
-            usd_size = filled_quantity * price
-            
-            # Display if meets threshold
-            self._display_liquidation(order_data, usd_size)
+            usd_size = liquidation.usd_size
+            if liquidation.time > self.last_event_time:
+                self.last_event_time = liquidation.time
+            self.liq_sizes.add(liquidation.symbol, usd_size)
             
-            # Prepare CSV data
-            msg_values = [str(order_data[key]) for key in ["s", "S", "o", "f", "q", "p", "ap", "X", "l", "z", "T"]]
-            msg_values.append(str(usd_size))
+            # Hand it to in-process subscribers first, they are the latency sensitive ones (risk signals)
+            if self.bus is not None:
+                self.bus.publish(liquidation)
             
-            # Add to batch buffer
-            self.batch_buffer.append(msg_values)
-            
-            # Write batch if full
-            if len(self.batch_buffer) >= BATCH_SIZE:
-                self._write_batch()
+            # Persistence, leaderboards and display run from the pipeline lanes
+            self.pipeline.submit(liquidation)
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
     
+    def _persist(self, liquidation):
+        """Persist lane: batch the liquidation for the CSV"""
+        self.batch_buffer.append(liquidation)
+        if len(self.batch_buffer) >= BATCH_SIZE:
+            self._write_batch()
+    
+    def _update_leaderboards(self, update):
+        """Analytics lane: (symbol, usd size, time), summed per symbol while it waited"""
+        symbol, usd_size, liq_time = update
+        for top in self.top_liquidations.values():
+            top.add(symbol, usd_size, liq_time)
+    
+    def _display(self, liquidation):
+        """Display lane"""
+        self._display_liquidation(liquidation, liquidation.usd_size)
+    
     def _write_batch(self):
         """Write batch of messages to CSV file"""
         if not self.batch_buffer:
@@ -190,16 +255,66 @@ class LiquidationMonitor:
         
         try:
             with open(FILENAME, "a") as f:
-                for msg_values in self.batch_buffer:
-                    trade_info = ",".join(msg_values) + "\n"
+                for liquidation in self.batch_buffer:
+                    trade_info = liquidation.csv_line()
                     trade_info = trade_info.replace("USDT", "")
                     f.write(trade_info)
             
+            if self.sink is not None:
+                self.sink.add_many(self.batch_buffer)
             self.batch_buffer.clear()
             
         except Exception as e:
             logger.error(f"Error writing batch: {e}")
     
+    def snapshot_state(self):
+        """Everything a restart would otherwise lose, for checkpoint.Checkpointer"""
+        self.pipeline.flush(["analytics"])
+        return {
+            "message_count": self.message_count,
+            "start_time": self.start_time,
+            "batch_buffer": self.batch_buffer + self.pipeline.pending("persist"),
+            "liq_sizes": self.liq_sizes.snapshot_state(),
+            "top_liquidations": self.top_liquidations,
+            "last_event_time": self.last_event_time,
+        }
+    
+    def restore_state(self, state):
+        self.message_count = state["message_count"]
+        self.start_time = state["start_time"]
+        self.batch_buffer = state["batch_buffer"]
+        self.liq_sizes.restore_state(state["liq_sizes"])
+        self.top_liquidations.update(state["top_liquidations"])
+        self.last_event_time = state["last_event_time"]
+    
+    def catch_up(self):
+        """Replays liquidations the CSV recorded after the checkpoint, drops restored buffer rows already written"""
+        if not os.path.exists(FILENAME):
+            return 0
+        checkpoint_time = self.last_event_time
+        since = min((liquidation.time for liquidation in self.batch_buffer), default=checkpoint_time)
+        written = set()
+        replayed = 0
+        for row in read_log_after(FILENAME, since - 1, LOG_TIME_COLUMN):
+            trade_time = int(row[LOG_TIME_COLUMN])
+            written.add((trade_time, row[1], float(row[5]), float(row[9])))
+            # against the checkpoint, not the rows replayed so far, the log is only roughly in order
+            if trade_time <= checkpoint_time:
+                continue
+            symbol = row[0] if row[0].endswith("USDT") else row[0] + "USDT"
+            usd_size = float(row[11])
+            self.liq_sizes.add(symbol, usd_size)
+            for top in self.top_liquidations.values():
+                top.add(symbol, usd_size, trade_time)
+            self.last_event_time = max(self.last_event_time, trade_time)
+            self.message_count += 1
+            replayed += 1
+        self.batch_buffer = [
+            liquidation for liquidation in self.batch_buffer
+            if (liquidation.time, liquidation.side, liquidation.price, liquidation.filled_quantity) not in written
+        ]
+        return replayed
+    
     def _print_stats(self):
         """Print connection statistics"""
         if self.message_count % STATS_INTERVAL == 0:
@@ -209,6 +324,13 @@ class LiquidationMonitor:
             logger.info(f"Stats: {self.message_count} messages, "
                        f"Rate: {rate:.1f} msg/min, "
                        f"Uptime: {uptime}")
+            for name, top in self.top_liquidations.items():
+                logger.info(f"Top liquidations {name}: {top.format(LEADERBOARD_SIZE)}")
+            logger.info(f"Pipeline: {self.pipeline.format()}")
+    
+    def leaderboard(self, n=LEADERBOARD_SIZE):
+        """Top symbols by liquidated notional for every window"""
+        return {name: top.leaderboard(n) for name, top in self.top_liquidations.items()}
     
     async def _handle_websocket_connection(self, websocket):
         """Handle WebSocket connection with improved ping/pong management"""
@@ -240,6 +362,10 @@ class LiquidationMonitor:
                 self._process_message(msg)
                 self._print_stats()
                 
+                # Persistence never drops, so a full persist lane holds the stream back instead
+                if self.pipeline.saturated():
+                    await self.pipeline.wait_for_space()
+                
             except asyncio.TimeoutError:
                 time_since_last = (datetime.now() - last_message_time).total_seconds()
                 logger.warning(f"No messages received for {time_since_last:.1f} seconds. Reconnecting...")
@@ -253,12 +379,22 @@ class LiquidationMonitor:
                 break
     
     async def run(self):
-        """Main monitoring loop with improved reconnection logic"""
+        """Main monitoring loop, with the pipeline lanes draining alongside it"""
         logger.info("Starting Binance liquidation monitor...")
         
+        pipeline_task = asyncio.create_task(self.pipeline.run())
+        try:
+            await self._connection_loop()
+        finally:
+            pipeline_task.cancel()
+            self.pipeline.flush(["persist", "analytics"])
+            self._write_batch()
+    
+    async def _connection_loop(self):
+        """Connection loop with improved reconnection logic"""
         while self.running:
             try:
-                logger.info(f"Attempting to connect to {WEBSOCKET_URL}...")
+                logger.info(f"Attempting to connect to {self.url}...")
                 
                 # Calculate backoff delay
                 if self.reconnect_attempts > 0:
@@ -267,7 +403,7 @@ class LiquidationMonitor:
                     await asyncio.sleep(delay)
                 
                 async with connect(
-                    WEBSOCKET_URL,
+                    self.url,
                     ping_interval=PING_INTERVAL,
                     ping_timeout=PING_TIMEOUT,
                     close_timeout=10,
@@ -301,19 +437,36 @@ class LiquidationMonitor:
                     break
             
             # Write any remaining batch data before reconnecting
+            self.pipeline.flush(["persist"])
             self._write_batch()
 
+async def run_with_checkpoints(monitor):
+    """Runs the monitor from its last checkpoint, saving one periodically and on the way out"""
+    checkpointer = Checkpointer(CHECKPOINT_FILE, {"liqs": monitor})
+    checkpointer.restore()
+    checkpoint_task = asyncio.create_task(checkpointer.run())
+    try:
+        await monitor.run()
+    finally:
+        checkpoint_task.cancel()
+        monitor.pipeline.flush(["persist", "analytics"])
+        monitor._write_batch()
+        checkpointer.save_now()
+
 def main():
     """Main entry point"""
-    monitor = LiquidationMonitor()
+    sink = SqliteSink(SQLITE_FILE) if SQLITE_FILE else None
+    monitor = LiquidationMonitor(sink=sink)
     
     try:
-        asyncio.run(monitor.run())
+        loop_backend.run(run_with_checkpoints(monitor))
     except KeyboardInterrupt:
         logger.info("Shutdown requested by user")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
+        if sink is not None:
+            sink.close()
         logger.info("Liquidation monitor stopped")
 
 if __name__ == "__main__":
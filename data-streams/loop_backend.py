@@ -0,0 +1,67 @@
+"""
+Selectable event loop for the stream scripts: uvloop when installed, stdlib asyncio otherwise.
+
+    import loop_backend
+    loop_backend.run(main())                  # LOOP_BACKEND env var, "auto" by default
+    loop_backend.run(main(), "asyncio")       # force the stdlib loop
+
+"auto" picks uvloop if it imports and falls back to asyncio. Asking for
+uvloop explicitly when it isn't installed is an error rather than a silent
+fallback, so a benchmark never measures the wrong loop.
+"""
+
+import asyncio
+import os
+import sys
+
+# Loop settings
+BACKENDS = ("uvloop", "asyncio")
+DEFAULT_BACKEND = os.getenv("LOOP_BACKEND", "auto")
+
+
+def available():
+    """Backends that can run here, preferred first"""
+    names = []
+    try:
+        import uvloop  # noqa: F401
+        names.append("uvloop")
+    except ImportError:
+        pass
+    names.append("asyncio")
+    return names
+
+
+def resolve(backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend == "auto":
+        return available()[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown loop backend {backend!r}, expected one of {('auto',) + BACKENDS}")
+    if backend not in available():
+        raise RuntimeError(f"Loop backend {backend!r} is not installed (pip install {backend})")
+    return backend
+
+
+def loop_factory(backend=None):
+    if resolve(backend) == "uvloop":
+        import uvloop
+        return uvloop.new_event_loop
+    return asyncio.new_event_loop
+
+
+def run(main, backend=None):
+    """asyncio.run(main) on the selected loop"""
+    factory = loop_factory(backend)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=factory) as runner:
+            return runner.run(main)
+
+    if factory is asyncio.new_event_loop:
+        return asyncio.run(main)
+    import uvloop
+    policy = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        return asyncio.run(main)
+    finally:
+        asyncio.set_event_loop_policy(policy)
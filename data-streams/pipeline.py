@@ -0,0 +1,214 @@
+"""
+Priority lanes between a monitor's parse step and its slower consumers.
+
+Instead of running persistence, analytics and display inline in the receive
+loop, a monitor submits each record to a Pipeline. Every lane holds its own
+bounded queue, and one worker drains the lanes strictly in priority order,
+yielding to the loop between items. Display therefore only runs when
+persistence and analytics are caught up. What a lane does when it falls
+behind depends on its policy:
+
+    KEEP      never drops; past maxsize the pipeline reports saturated() and
+              the producer should await wait_for_space() (persistence)
+    COALESCE  merges items with the same key while they wait, so a burst
+              becomes one update per key (analytics)
+    SHED      drops the oldest item when full, and at dequeue skips items
+              older than the lane's lag budget (display)
+
+Every drop and merge is counted, and stats() reports the age of the oldest
+queued item per lane as its lag.
+
+    pipeline = Pipeline([
+        Lane("persist", self._persist, KEEP, maxsize=10000),
+        Lane("analytics", self._analyze, COALESCE, key=..., merge=...),
+        Lane("display", self._display, SHED, maxsize=500, lag_budget_ms=250),
+    ])
+    pipeline.submit(record)
+    await pipeline.run()
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+# Lane policies
+KEEP = "keep"
+COALESCE = "coalesce"
+SHED = "shed"
+
+# Pipeline settings
+DEFAULT_MAXSIZE = 1000
+IDLE_INTERVAL = 0.5  # seconds the worker sleeps when every lane is empty
+
+
+class Lane:
+    """One consumer, in priority order of construction, with its queue and drop policy"""
+
+    def __init__(self, name, handler, policy=KEEP, maxsize=DEFAULT_MAXSIZE, lag_budget_ms=None,
+                 prepare=None, key=None, merge=None):
+        if policy == COALESCE and (key is None or merge is None):
+            raise ValueError(f"Coalescing lane {name} needs key and merge")
+        self.name = name
+        self.handler = handler
+        self.policy = policy
+        self.maxsize = maxsize
+        self.lag_budget_ms = lag_budget_ms
+        self.prepare = prepare  # record -> lane item, None skips the record
+        self.key = key
+        self.merge = merge
+        self.queue = OrderedDict() if policy == COALESCE else deque()  # key -> (enqueued, item), or (enqueued, item)s
+        self.processed = 0
+        self.dropped = 0  # shed for size or lag, or evicted from a full coalescing lane
+        self.coalesced = 0
+        self.errors = 0
+        self.max_lag_ms = 0.0
+
+    def __len__(self):
+        return len(self.queue)
+
+    def offer(self, record, now):
+        item = self.prepare(record) if self.prepare is not None else record
+        if item is None:
+            return
+        if self.policy == COALESCE:
+            key = self.key(item)
+            waiting = self.queue.get(key)
+            if waiting is not None:
+                # keep the original enqueue time, the lag is that of the oldest part
+                self.queue[key] = (waiting[0], self.merge(waiting[1], item))
+                self.coalesced += 1
+                return
+            if len(self.queue) >= self.maxsize:
+                self.queue.popitem(last=False)
+                self.dropped += 1
+            self.queue[key] = (now, item)
+            return
+        if self.policy == SHED and len(self.queue) >= self.maxsize:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append((now, item))
+
+    def pop(self, now):
+        """Next item to handle, None once the lane is empty"""
+        while self.queue:
+            if self.policy == COALESCE:
+                enqueued, item = self.queue.popitem(last=False)[1]
+            else:
+                enqueued, item = self.queue.popleft()
+            lag_ms = (now - enqueued) * 1000
+            if self.policy == SHED and self.lag_budget_ms is not None and lag_ms > self.lag_budget_ms:
+                self.dropped += 1
+                continue
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            return item
+        return None
+
+    def handle(self, item):
+        try:
+            self.handler(item)
+            self.processed += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Error in {self.name} lane: {e}")
+
+    def pending(self):
+        return [item for _, item in self.queue.values()] if self.policy == COALESCE else [item for _, item in self.queue]
+
+    def lag_ms(self, now):
+        """Age of the oldest waiting item"""
+        if not self.queue:
+            return 0.0
+        oldest = next(iter(self.queue.values()))[0] if self.policy == COALESCE else self.queue[0][0]
+        return (now - oldest) * 1000
+
+    def full(self):
+        return self.policy == KEEP and len(self.queue) >= self.maxsize
+
+
+class Pipeline:
+    def __init__(self, lanes):
+        self.lanes = lanes  # highest priority first
+        self.by_name = {lane.name: lane for lane in lanes}
+        self.submitted = 0
+        self.backpressure_waits = 0
+        self._wakeup = None
+        self._space = None
+
+    def submit(self, record):
+        """Offers a record to every lane, never blocks"""
+        now = time.monotonic()
+        for lane in self.lanes:
+            lane.offer(record, now)
+        self.submitted += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def saturated(self):
+        """A KEEP lane is at its bound, the producer should wait_for_space() before reading more"""
+        return any(lane.full() for lane in self.lanes)
+
+    async def wait_for_space(self):
+        self.backpressure_waits += 1
+        if self._space is None:
+            self._space = asyncio.Event()
+        while self.saturated():
+            self._space.clear()
+            await self._space.wait()
+
+    def _step(self, now):
+        """Handles one item from the highest-priority non-empty lane, False if all are empty"""
+        for lane in self.lanes:
+            item = lane.pop(now)
+            if item is not None:
+                lane.handle(item)
+                if self._space is not None and not lane.full():
+                    self._space.set()
+                return True
+        return False
+
+    def flush(self, names=None):
+        """Handles everything queued right now, e.g. before a checkpoint or on shutdown"""
+        lanes = [self.by_name[name] for name in names] if names else self.lanes
+        now = time.monotonic()
+        for lane in lanes:
+            while True:
+                item = lane.pop(now)
+                if item is None:
+                    break
+                lane.handle(item)
+        if self._space is not None:
+            self._space.set()
+
+    def pending(self, name):
+        return self.by_name[name].pending()
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            if self._step(time.monotonic()):
+                await asyncio.sleep(0)  # let the receive loop in between items
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=IDLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            lane.name: {"queued": len(lane), "lag_ms": round(lane.lag_ms(now), 1), "max_lag_ms": round(lane.max_lag_ms, 1),
+                        "processed": lane.processed, "dropped": lane.dropped, "coalesced": lane.coalesced,
+                        "errors": lane.errors}
+            for lane in self.lanes
+        }
+
+    def format(self):
+        """One-line lane summary for log output"""
+        now = time.monotonic()
+        return "  ".join(
+            f"{lane.name} q={len(lane)} lag={lane.lag_ms(now):.0f}ms dropped={lane.dropped}"
+            + (f" merged={lane.coalesced}" if lane.policy == COALESCE else "")
+            for lane in self.lanes
+        ) + (f"  backpressure={self.backpressure_waits}" if self.backpressure_waits else "")
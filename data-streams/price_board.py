@@ -0,0 +1,220 @@
+"""
+Shared-memory board of the latest Binance mark price, funding rate and last trade per coin.
+
+The ingest process writes the board as records arrive, and any number of
+local processes (the risk bot, strategies, dashboards) read it without a
+stream or a REST call. The layout is fixed: a header, a directory of coin
+names, then one 64-byte slot per coin:
+
+    seq | mark price | funding rate | mark time | last price | last qty | last trade time | buyer maker
+
+Each slot is a seqlock. The writer bumps seq to odd, writes the fields and
+bumps it back to even. A reader reads seq, the fields, then seq again, and
+retries if seq was odd or moved. Readers take no lock and never block the
+writer, and a lookup is a dict hit plus one struct.unpack_from on the
+mapping. This relies on the writer's stores landing in program order, which
+x86 guarantees. There is only ever one writer.
+
+    board = PriceBoard.create(bus=fanout)     # ingest side, duck-types EventBus.publish
+    board.publish(mark_price_record)
+
+    board = PriceBoard.attach()               # any other process
+    board.mark_price("BTC"), board.funding_rate("ETHUSDT"), board.get("SOL")
+"""
+
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from records import MarkPrice, Trade, to_coin
+
+# Board settings
+BOARD_NAME = "algo_price_board"
+CAPACITY = 512  # coins
+SPINS_BEFORE_YIELD = 100  # reads of a slot mid-write before giving the writer the CPU
+READ_TIMEOUT = 1.0  # seconds a slot may stay mid-write before a reader gives up
+
+MAGIC = b"ALGOBRD1"
+HEADER = struct.Struct("<8sIIq")  # magic, capacity, slot size, coins in use
+HEADER_SIZE = 64
+NAME_SIZE = 16
+SLOT_SIZE = 64
+FIELDS = struct.Struct("<ddqddqq")  # everything after seq
+MARK_FIELDS = struct.Struct("<ddq")
+TRADE_FIELDS = struct.Struct("<ddqq")
+MARK_OFFSET = 8
+TRADE_OFFSET = 32
+COUNT_INDEX = 2  # header count as an int64 index
+
+
+def _open(name, create=False, size=0):
+    try:
+        return shared_memory.SharedMemory(name, create=create, size=size, track=create)
+    except TypeError:
+        # before 3.13 every attach registers with the resource tracker, which would unlink the board on exit
+        shm = shared_memory.SharedMemory(name, create=create, size=size)
+        if not create:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class PriceBoard:
+    def __init__(self, shm, owner=False, bus=None):
+        self.shm = shm
+        self.owner = owner
+        self.bus = bus
+        self.buf = shm.buf
+        self.words = shm.buf.cast("q")  # int64 view for the header count and slot sequence numbers
+        magic, self.capacity, slot_size, _ = HEADER.unpack_from(self.buf)
+        if magic != MAGIC or slot_size != SLOT_SIZE:
+            raise ValueError(f"{shm.name} is not a price board")
+        self.slots_start = HEADER_SIZE + self.capacity * NAME_SIZE
+        self.index = {}  # coin -> slot
+        self.lookup = {}  # symbol as callers spell it (BTC, BTCUSDT, btc) -> slot
+        self._refresh_index()
+
+    @classmethod
+    def create(cls, name=BOARD_NAME, capacity=CAPACITY, bus=None):
+        """Writer side, replaces any board left behind under the same name"""
+        try:
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = _open(name, create=True, size=HEADER_SIZE + capacity * (NAME_SIZE + SLOT_SIZE))
+        shm.buf[:] = bytes(shm.size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, SLOT_SIZE, 0)
+        return cls(shm, owner=True, bus=bus)
+
+    @classmethod
+    def attach(cls, name=BOARD_NAME):
+        """Reader side, raises FileNotFoundError until the ingest process has created the board"""
+        return cls(_open(name))
+
+    def close(self):
+        self.words.release()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # Directory
+    def _refresh_index(self):
+        count = self.words[COUNT_INDEX]
+        for slot in range(len(self.index), count):
+            start = HEADER_SIZE + slot * NAME_SIZE
+            self.index[bytes(self.buf[start:start + NAME_SIZE]).rstrip(b"\0").decode()] = slot
+
+    def _slot(self, coin):
+        slot = self.index.get(coin)
+        if slot is None and self.words[COUNT_INDEX] != len(self.index):
+            self._refresh_index()
+            slot = self.index.get(coin)
+        return slot
+
+    def _add_coin(self, coin):
+        slot = len(self.index)
+        if slot >= self.capacity:
+            raise ValueError(f"Price board is full ({self.capacity} coins)")
+        start = HEADER_SIZE + slot * NAME_SIZE
+        self.buf[start:start + NAME_SIZE] = coin.encode().ljust(NAME_SIZE, b"\0")
+        self.index[coin] = slot
+        self.words[COUNT_INDEX] = slot + 1  # published only once the name is in place
+        return slot
+
+    # Writer
+    def _write(self, coin, fields, offset, *values):
+        slot = self.index.get(coin)
+        if slot is None:
+            slot = self._add_coin(coin)
+        base = self.slots_start + slot * SLOT_SIZE
+        seq_index = base // 8
+        seq = self.words[seq_index]
+        self.words[seq_index] = seq + 1
+        fields.pack_into(self.buf, base + offset, *values)
+        self.words[seq_index] = seq + 2
+
+    def update_mark(self, symbol, mark_price, funding_rate, mark_time):
+        self._write(to_coin(symbol), MARK_FIELDS, MARK_OFFSET, mark_price, funding_rate, mark_time)
+
+    def update_trade(self, symbol, price, quantity, trade_time, is_buyer_maker):
+        self._write(to_coin(symbol), TRADE_FIELDS, TRADE_OFFSET, price, quantity, trade_time, int(is_buyer_maker))
+
+    def publish(self, record):
+        """Updates the board from a record, then passes it on to the bus"""
+        if isinstance(record, MarkPrice):
+            self.update_mark(record.symbol, record.mark_price, record.funding_rate, record.time)
+        elif isinstance(record, Trade):
+            self.update_trade(record.symbol, record.price, record.quantity, record.time, record.is_buyer_maker)
+        if self.bus is not None:
+            self.bus.publish(record)
+
+    # Readers
+    def get(self, symbol):
+        """(mark price, funding rate, mark time, last price, last qty, last trade time, buyer maker), None if unknown"""
+        slot = self.lookup.get(symbol)
+        if slot is None:
+            slot = self._slot(to_coin(symbol))
+            if slot is None:
+                return None
+            self.lookup[symbol] = slot
+        base = self.slots_start + slot * SLOT_SIZE
+        seq_index = base // 8
+        words, buf = self.words, self.buf
+        spins = 0
+        deadline = None
+        while True:
+            seq = words[seq_index]
+            if not seq & 1:
+                fields = FIELDS.unpack_from(buf, base + 8)
+                if words[seq_index] == seq:
+                    return fields
+            # write in progress, the writer may have been descheduled mid-update
+            spins += 1
+            if spins % SPINS_BEFORE_YIELD == 0:
+                if deadline is None:
+                    deadline = time.monotonic() + READ_TIMEOUT
+                elif time.monotonic() > deadline:
+                    raise TimeoutError(f"Price board slot for {symbol} stayed mid-write")
+                time.sleep(0)
+
+    def mark_price(self, symbol):
+        fields = self.get(symbol)
+        return fields[0] if fields and fields[2] else None
+
+    def funding_rate(self, symbol):
+        fields = self.get(symbol)
+        return fields[1] if fields and fields[2] else None
+
+    def last_trade(self, symbol):
+        """(price, quantity, time, is_buyer_maker), None before the first trade"""
+        fields = self.get(symbol)
+        if not fields or not fields[5]:
+            return None
+        return fields[3], fields[4], fields[5], bool(fields[6])
+
+    def snapshot(self):
+        self._refresh_index()
+        return {coin: self.get(coin) for coin in self.index}
+
+
+def main():
+    """Prints the board from another process, e.g. next to `python fanout.py`"""
+    board = PriceBoard.attach()
+    try:
+        while True:
+            now = time.time() * 1000
+            for coin, (mark, funding, mark_time, last, _, trade_time, _) in sorted(board.snapshot().items()):
+                age = (now - max(mark_time, trade_time)) / 1000
+                print(f"{coin:>8} mark {mark:>12.6g} last {last:>12.6g} funding {funding * 3 * 365 * 100:7.2f}%/yr  {age:5.1f}s ago")
+            print()
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
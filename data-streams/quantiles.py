@@ -0,0 +1,155 @@
+"""
+Streaming quantile sketches and percentile-based size thresholds.
+
+A $500k print is noise on BTC and a headline on HBAR, so fixed USD cut-offs
+are either too loose for the majors or too strict for the small caps. Each
+symbol gets a log-bucketed quantile sketch (DDSketch style): a value lands in
+bucket ceil(log_gamma(value)), so an update is one log and one dict
+increment, memory is bounded by the bucket cap, and every quantile comes
+back within the sketch's relative accuracy. Counts decay periodically so
+the thresholds follow the current regime instead of the whole history.
+
+    sizes = SymbolQuantiles()
+    display = AdaptiveThreshold(sizes, percentile=99, default=15000)
+    sizes.add("BTCUSDT", usd_size)
+    if usd_size >= display.value("BTCUSDT"):
+        ...
+
+Until a symbol has seen `warmup` values its thresholds fall back to the
+fixed defaults.
+"""
+
+import math
+
+# Sketch settings
+RELATIVE_ACCURACY = 0.01  # quantiles within 1%
+MAX_BUCKETS = 2048
+WARMUP = 500  # values per symbol before the sketch is trusted
+REFRESH_EVERY = 100  # values between recomputing cached quantiles
+DECAY_EVERY = 20000  # values between decays
+DECAY_FACTOR = 0.5
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_buckets=MAX_BUCKETS):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets = {}  # bucket index -> (decayed) count
+        self.zero_count = 0.0
+        self.count = 0.0
+
+    def add(self, value, weight=1.0):
+        self.count += weight
+        if value <= 0:
+            self.zero_count += weight
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        buckets = self.buckets
+        buckets[key] = buckets.get(key, 0.0) + weight
+        if len(buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        """Folds the lowest bucket into the next one, accuracy is only lost at the bottom"""
+        lowest = sorted(self.buckets)[:2]
+        self.buckets[lowest[1]] += self.buckets.pop(lowest[0])
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), None while empty"""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        key = None
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                break
+        if key is None:
+            return 0.0
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def decay(self, factor=DECAY_FACTOR):
+        """Scales every count down so recent values weigh more than old ones"""
+        self.count *= factor
+        self.zero_count *= factor
+        for key in self.buckets:
+            self.buckets[key] *= factor
+
+    def merge(self, other):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0.0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+
+class SymbolQuantiles:
+    """One sketch per symbol, quantile lookups cached between refreshes"""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, warmup=WARMUP, refresh_every=REFRESH_EVERY,
+                 decay_every=DECAY_EVERY, decay_factor=DECAY_FACTOR):
+        self.relative_accuracy = relative_accuracy
+        self.warmup = warmup
+        self.refresh_every = refresh_every
+        self.decay_every = decay_every
+        self.decay_factor = decay_factor
+        self.sketches = {}
+        self.added = {}  # symbol -> values seen, never decayed
+        self._cache = {}  # (symbol, q) -> quantile
+
+    def add(self, symbol, value):
+        sketch = self.sketches.get(symbol)
+        if sketch is None:
+            sketch = self.sketches[symbol] = QuantileSketch(self.relative_accuracy)
+        sketch.add(value)
+
+        added = self.added.get(symbol, 0) + 1
+        self.added[symbol] = added
+        if self.decay_every and added % self.decay_every == 0:
+            sketch.decay(self.decay_factor)
+        if added % self.refresh_every == 0:
+            for key in [k for k in self._cache if k[0] == symbol]:
+                del self._cache[key]
+
+    def snapshot_state(self):
+        return {"sketches": self.sketches, "added": self.added}
+
+    def restore_state(self, state):
+        self.sketches = state["sketches"]
+        self.added = state["added"]
+        self._cache = {}
+
+    def warmed_up(self, symbol):
+        return self.added.get(symbol, 0) >= self.warmup
+
+    def quantile(self, symbol, q):
+        """Cached quantile for symbol, None while the symbol is still warming up"""
+        if not self.warmed_up(symbol):
+            return None
+        key = (symbol, q)
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = self.sketches[symbol].quantile(q)
+        return value
+
+
+class AdaptiveThreshold:
+    def __init__(self, quantiles, percentile, default, floor=0):
+        self.quantiles = quantiles
+        self.q = percentile / 100
+        self.default = default  # used until the symbol has warmed up
+        self.floor = floor
+
+    def value(self, symbol):
+        estimate = self.quantiles.quantile(symbol, self.q)
+        if estimate is None:
+            return self.default
+        return max(self.floor, estimate)
+
+    def passes(self, symbol, value):
+        return value >= self.value(symbol)
@@ -5,6 +5,9 @@ from datetime import datetime
 import pytz
 from websockets import connect
 from termcolor import cprint
+from quantiles import AdaptiveThreshold, SymbolQuantiles
+from records import Trade
+import loop_backend
 
 # list of symbols to track
 symbols = [
@@ -22,13 +25,22 @@ symbols = [
 websocket_url_base = "wss://fstream.binance.com/ws/"
 trades_filename = "recent_trades.csv"
 
+# Trades at or above this percentile of the symbol's trade sizes are shown and logged,
+# MIN_USD_SIZE until the symbol has warmed up
+DISPLAY_PERCENTILE = 99
+MIN_USD_SIZE = 15000
+USD_SIZE_FLOOR = 1000
+
+trade_sizes = SymbolQuantiles()
+display_threshold = AdaptiveThreshold(trade_sizes, DISPLAY_PERCENTILE, MIN_USD_SIZE, floor=USD_SIZE_FLOOR)
+
 # check if the csv files exists
 if not os.path.exists(trades_filename):
     with open(trades_filename, "w") as f:
         f.write("Event Time,Symbol,Aggregate Trade ID,Price,Quantity,First Trade ID,Trade Time,Is Buyer Maker,USD Size\n")
 
 
-async def binance_trade_stream(uri, symbol, filename):
+async def binance_trade_stream(uri, symbol, filename, listeners=()):
     print(f"Connecting to {symbol} stream...")
     while True:
         try:
@@ -37,19 +49,22 @@ async def binance_trade_stream(uri, symbol, filename):
                 while True:
                     try:
                         message = await websocket.recv()
-                        data = json.loads(message)
-                        event_time = int(data["E"])
-                        agg_trade_id = data["a"]
-                        price = float(data["p"])
-                        quantity = float(data["q"])
-                        trade_time = int(data["T"])
-                        is_buyer_maker = data["m"]
+                        trade = Trade.from_message(json.loads(message))
+                        event_time = trade.event_time
+                        agg_trade_id = trade.agg_id
+                        price = trade.price
+                        quantity = trade.quantity
+                        trade_time = trade.time
+                        is_buyer_maker = trade.is_buyer_maker
                         est = pytz.timezone("US/Central")
                         readable_trade_time = datetime.fromtimestamp(trade_time / 1000, est).strftime("%H:%M:%S")
                         usd_size = price * quantity
+                        trade_sizes.add(symbol, usd_size)
+                        for listener in listeners:
+                            listener(symbol, trade_time, price, quantity, is_buyer_maker)
                         display_symbol = symbol.upper().replace("USDT", "")
 
-                        if usd_size > 14999:
+                        if usd_size >= display_threshold.value(symbol):
                             trade_type = "SELL" if is_buyer_maker else "BUY"
                             color = "red" if trade_type == "SELL" else "green"
 
@@ -86,7 +101,7 @@ async def binance_trade_stream(uri, symbol, filename):
                             # log to csv
                             with open(filename, "a") as f:
                                 f.write(f"{event_time},{symbol.upper()},{agg_trade_id},{price},{quantity},"
-                                       f"{agg_trade_id},{trade_time},{is_buyer_maker},{usd_size:.2f}\n")
+                                       f"{trade.first_id},{trade_time},{is_buyer_maker},{usd_size:.2f}\n")
                      
                     except Exception as e:
                         print(f"Error processing {symbol} message: {e}")
@@ -117,7 +132,8 @@ async def main():
             task.cancel()
 
 
-asyncio.run(main())
+if __name__ == "__main__":
+    loop_backend.run(main())
 
 
 
@@ -0,0 +1,155 @@
+"""
+Compact records for the three event kinds the monitors handle.
+
+Websocket messages are parsed once into these slotted records at the edge
+and the records, not the decoded JSON dicts or lists of strings, are what
+flows through the aggregators, batch buffers, sinks and the event bus.
+A slotted record carries no per-instance __dict__, numbers are stored as
+floats/ints instead of the exchange's strings, and the repeated enum-like
+strings (side, order type, status) are interned so every record shares
+them. Records parsed from a message also hold on to the exchange's own
+strings for the columns the CSVs store (a trade's price and quantity, a
+liquidation's whole row), so huge_trades.csv and liqs.csv / big_liqs.csv
+rows are unchanged (184.920, 0.4196200, not 184.92, 0.41962). They live
+as long as the record does.
+"""
+
+import sys
+
+# Event bus topics
+LIQUIDATION = "liquidation"
+HUGE_TRADE = "huge_trade"
+FUNDING = "funding"
+
+# forceOrder fields in the liqs.csv / big_liqs.csv column order, usd_size follows
+LIQUIDATION_CSV_KEYS = ("s", "S", "o", "f", "q", "p", "ap", "X", "l", "z", "T")
+
+_intern = sys.intern
+
+
+def to_coin(symbol):
+    """BTCUSDT / BTC -> BTC, the name Hyperliquid uses"""
+    symbol = symbol.upper()
+    return symbol[:-4] if symbol.endswith("USDT") else symbol
+
+
+class Trade:
+    topic = HUGE_TRADE  # trades only reach the bus once they pass the huge-trade threshold
+    __slots__ = ("symbol", "agg_id", "price", "quantity", "first_id", "time", "is_buyer_maker", "event_time", "raw")
+
+    def __init__(self, symbol, agg_id, price, quantity, first_id, time, is_buyer_maker, event_time=None, raw=None):
+        self.symbol = symbol
+        self.agg_id = agg_id
+        self.price = price
+        self.quantity = quantity
+        self.first_id = first_id
+        self.time = time
+        self.is_buyer_maker = is_buyer_maker
+        self.event_time = event_time if event_time is not None else time
+        self.raw = raw  # (price, quantity) as the exchange sent them, when parsed from a message
+
+    @classmethod
+    def from_message(cls, data):
+        """aggTrade stream payload"""
+        price, quantity = data["p"], data["q"]
+        return cls(_intern(data["s"]), data["a"], float(price), float(quantity), data["f"],
+                   data["T"], data["m"], data["E"], (price, quantity))
+
+    def csv_price_quantity(self):
+        """(price, quantity) for a CSV row, the exchange's strings when known"""
+        return self.raw if self.raw is not None else (self.price, self.quantity)
+
+    @property
+    def usd_size(self):
+        return self.price * self.quantity
+
+    @property
+    def coin(self):
+        return to_coin(self.symbol)
+
+    def __repr__(self):
+        side = "SELL" if self.is_buyer_maker else "BUY"
+        return f"Trade({self.symbol} {side} ${self.usd_size:,.0f} @ {self.price})"
+
+
+class Liquidation:
+    topic = LIQUIDATION
+    __slots__ = ("symbol", "side", "order_type", "time_in_force", "original_quantity", "price",
+                 "average_price", "status", "last_filled_quantity", "filled_quantity", "time", "raw")
+
+    def __init__(self, symbol, side, order_type, time_in_force, original_quantity, price,
+                 average_price, status, last_filled_quantity, filled_quantity, time, raw=None):
+        self.symbol = symbol
+        self.side = side  # SELL = long liquidated, BUY = short liquidated
+        self.order_type = order_type
+        self.time_in_force = time_in_force
+        self.original_quantity = original_quantity
+        self.price = price
+        self.average_price = average_price
+        self.status = status
+        self.last_filled_quantity = last_filled_quantity
+        self.filled_quantity = filled_quantity
+        self.time = time
+        self.raw = raw  # the exchange's own column strings joined, when parsed from a message
+
+    @classmethod
+    def from_message(cls, order):
+        """forceOrder payload's "o" object"""
+        raw = ",".join([str(order[key]) for key in LIQUIDATION_CSV_KEYS])
+        return cls(_intern(order["s"]), _intern(order["S"]), _intern(order["o"]), _intern(order["f"]),
+                   float(order["q"]), float(order["p"]), float(order["ap"]), _intern(order["X"]),
+                   float(order["l"]), float(order["z"]), int(order["T"]), raw)
+
+    @property
+    def quantity(self):
+        return self.filled_quantity
+
+    @property
+    def usd_size(self):
+        return self.filled_quantity * self.price
+
+    @property
+    def coin(self):
+        return to_coin(self.symbol)
+
+    def csv_line(self):
+        """Row in the liqs.csv / big_liqs.csv column order, numbers as the exchange sent them when known"""
+        if self.raw is not None:
+            return f"{self.raw},{self.usd_size}\n"
+        return (f"{self.symbol},{self.side},{self.order_type},{self.time_in_force},{self.original_quantity},"
+                f"{self.price},{self.average_price},{self.status},{self.last_filled_quantity},"
+                f"{self.filled_quantity},{self.time},{self.usd_size}\n")
+
+    def __repr__(self):
+        return f"Liquidation({self.symbol} {self.side} ${self.usd_size:,.0f} @ {self.price})"
+
+
+class MarkPrice:
+    topic = FUNDING
+    __slots__ = ("symbol", "mark_price", "funding_rate", "time")
+
+    def __init__(self, symbol, mark_price, funding_rate, time):
+        self.symbol = symbol
+        self.mark_price = mark_price
+        self.funding_rate = funding_rate
+        self.time = time
+
+    @classmethod
+    def from_message(cls, data):
+        """markPrice stream payload"""
+        return cls(_intern(data["s"]), float(data["p"]), float(data["r"]), data["E"])
+
+    @property
+    def coin(self):
+        return to_coin(self.symbol)
+
+    @property
+    def usd_size(self):
+        return None
+
+    @property
+    def yearly_funding_rate(self):
+        return self.funding_rate * 3 * 365 * 100
+
+    def __repr__(self):
+        return f"MarkPrice({self.symbol} {self.yearly_funding_rate:.2f}%/yr)"
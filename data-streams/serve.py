@@ -0,0 +1,281 @@
+"""
+Local HTTP and websocket API over the monitors' live in-memory state.
+
+Runs inside the monitor process next to the event bus, so dashboards can
+query the current funding table, the recent large trades and liquidations
+and rolling stats instead of tailing and re-parsing the CSVs. Every event is
+serialized to JSON once, when it comes off the bus: HTTP responses are joins
+of those fragments, unfiltered responses are cached until the next event of
+their kind, and websocket clients get the same fragments pushed through
+their own bounded queue. A new client costs a queue, not a json.dumps.
+
+    GET /funding?symbols=BTC,ETH
+    GET /trades?symbols=BTC&min_usd=1000000&limit=20
+    GET /liquidations?min_usd=250000
+    GET /stats
+    GET /ws?topics=liquidation,huge_trade&symbols=SOL&min_usd=100000   (websocket push)
+
+Websocket frames are JSON arrays of one or more events, batched when a
+client is behind. A client that falls further behind than its queue loses
+its oldest events, like any other bus subscriber.
+
+    python serve.py    # liquidations, huge trades and funding on one loop, API on port 8765
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+from aiohttp import web
+
+import funding
+import huge_trades
+import loop_backend
+from event_bus import EventBus, Subscription
+from event_merge import EventMerger
+from heavy_hitters import WindowedHeavyHitters
+from liqs import LiquidationMonitor
+from records import FUNDING, HUGE_TRADE, LIQUIDATION, to_coin
+
+# Server settings
+HOST = "127.0.0.1"
+PORT = 8765
+RECENT_EVENTS = 500  # trades / liquidations kept per topic
+DEFAULT_LIMIT = 100
+BUS_QUEUE_SIZE = 10000
+CLIENT_QUEUE_SIZE = 1000
+MAX_FRAME_EVENTS = 200  # events batched into one websocket frame
+STATS_INTERVAL = 1.0  # seconds a /stats snapshot is reused
+STATS_WINDOW = 300  # seconds of rolling notional in /stats
+LEADERBOARD_SIZE = 10
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def serialize(event):
+    """One event as a JSON object string, computed once per event"""
+    if event.topic == FUNDING:
+        return _dumps({"topic": FUNDING, "symbol": event.symbol, "coin": event.coin, "time": event.time,
+                       "mark_price": event.mark_price, "funding_rate": event.funding_rate,
+                       "yearly_funding_rate": round(event.yearly_funding_rate, 4)})
+    if event.topic == LIQUIDATION:
+        return _dumps({"topic": LIQUIDATION, "symbol": event.symbol, "coin": event.coin, "time": event.time,
+                       "side": event.side, "price": event.price, "quantity": event.quantity,
+                       "usd_size": round(event.usd_size, 2)})
+    return _dumps({"topic": HUGE_TRADE, "symbol": event.symbol, "coin": event.coin, "time": event.time,
+                   "side": "SELL" if event.is_buyer_maker else "BUY", "price": event.price,
+                   "quantity": event.quantity, "usd_size": round(event.usd_size, 2)})
+
+
+def join(fragments):
+    return ("[" + ",".join(fragments) + "]").encode()
+
+
+def parse_filters(query):
+    """(topics, symbols, min_usd, limit) from query parameters, HTTP 400 on bad values"""
+    try:
+        topics = [t for t in query.get("topics", "").split(",") if t] or None
+        symbols = [s.upper() for s in query.get("symbols", query.get("symbol", "")).split(",") if s] or None
+        min_usd = float(query["min_usd"]) if "min_usd" in query else None
+        limit = int(query.get("limit", DEFAULT_LIMIT))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=f"bad query parameter: {e}")
+    if topics and not set(topics) <= {FUNDING, LIQUIDATION, HUGE_TRADE}:
+        raise web.HTTPBadRequest(text=f"unknown topic in {topics}")
+    return topics, symbols, min_usd, max(0, limit)
+
+
+class LiveState:
+    """Bus subscriber holding what the API serves, plus the websocket clients' subscriptions"""
+
+    def __init__(self, bus, liquidation_monitor=None, trade_aggregator=None, recent=RECENT_EVENTS):
+        self.bus = bus
+        self.subscription = bus.subscribe(maxsize=BUS_QUEUE_SIZE)
+        self.liquidation_monitor = liquidation_monitor
+        self.trade_aggregator = trade_aggregator
+        self.funding = {}  # coin -> serialized mark price
+        self.recent = {LIQUIDATION: deque(maxlen=recent), HUGE_TRADE: deque(maxlen=recent)}  # (event, json)
+        self.notional = {LIQUIDATION: WindowedHeavyHitters(STATS_WINDOW), HUGE_TRADE: WindowedHeavyHitters(STATS_WINDOW)}
+        self.counts = {FUNDING: 0, LIQUIDATION: 0, HUGE_TRADE: 0}
+        self.versions = {FUNDING: 0, LIQUIDATION: 0, HUGE_TRADE: 0}
+        self.cache = {}  # topic -> (version, body) for unfiltered responses
+        self.stats_body = None
+        self.stats_built = 0.0
+        self.clients = []  # websocket subscriptions, fed serialized events
+        self.start_time = time.time()
+
+    # subscriptions created with LiveState as their bus close through this
+    def unsubscribe(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+
+    def subscribe(self, topics=None, symbols=None, min_usd=None, maxsize=CLIENT_QUEUE_SIZE):
+        client = Subscription(self, topics, symbols, min_usd, maxsize)
+        self.clients.append(client)
+        return client
+
+    def on_event(self, event):
+        payload = serialize(event)
+        topic = event.topic
+        self.counts[topic] += 1
+        self.versions[topic] += 1
+        if topic == FUNDING:
+            self.funding[event.coin] = payload
+        else:
+            self.recent[topic].append((event, payload))
+            self.notional[topic].add(event.coin, event.usd_size, event.time)
+        for client in self.clients:
+            if client.matches(event):
+                client.deliver(payload)
+
+    async def run(self):
+        async for event in self.subscription:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error serving event {event!r}: {e}")
+
+    def funding_body(self, symbols=None):
+        if symbols is None:
+            cached = self.cache.get(FUNDING)
+            if cached is None or cached[0] != self.versions[FUNDING]:
+                cached = self.cache[FUNDING] = (self.versions[FUNDING], join(self.funding[c] for c in sorted(self.funding)))
+            return cached[1]
+        coins = sorted({to_coin(s) for s in symbols})
+        return join(self.funding[c] for c in coins if c in self.funding)
+
+    def recent_body(self, topic, symbols=None, min_usd=None, limit=DEFAULT_LIMIT):
+        """Newest first"""
+        if symbols is None and min_usd is None and limit == DEFAULT_LIMIT:
+            cached = self.cache.get(topic)
+            if cached is None or cached[0] != self.versions[topic]:
+                cached = self.cache[topic] = (self.versions[topic], self._recent_body(topic, None, None, limit))
+            return cached[1]
+        return self._recent_body(topic, symbols, min_usd, limit)
+
+    def _recent_body(self, topic, symbols, min_usd, limit):
+        coins = {to_coin(s) for s in symbols} if symbols else None
+        fragments = []
+        for event, payload in reversed(self.recent[topic]):
+            if len(fragments) >= limit:
+                break
+            if coins is not None and event.coin not in coins:
+                continue
+            if min_usd is not None and event.usd_size < min_usd:
+                continue
+            fragments.append(payload)
+        return join(fragments)
+
+    def stats_body_snapshot(self):
+        now = time.monotonic()
+        if self.stats_body is None or now - self.stats_built >= STATS_INTERVAL:
+            stats = {
+                "uptime": round(time.time() - self.start_time, 1),
+                "events": self.counts,
+                "window_seconds": STATS_WINDOW,
+                "top_liquidations": self.notional[LIQUIDATION].leaderboard(LEADERBOARD_SIZE),
+                "top_trades": self.notional[HUGE_TRADE].leaderboard(LEADERBOARD_SIZE),
+                "clients": len(self.clients),
+                "client_dropped": sum(client.dropped for client in self.clients),
+                "bus_dropped": self.subscription.dropped,
+            }
+            if self.liquidation_monitor is not None:
+                stats["liquidation_monitor"] = {"messages": self.liquidation_monitor.message_count,
+                                                "leaderboard": self.liquidation_monitor.leaderboard(),
+                                                "pipeline": self.liquidation_monitor.pipeline.stats()}
+            if self.trade_aggregator is not None:
+                stats["trade_leaderboard"] = self.trade_aggregator.leaderboard()
+            self.stats_body = _dumps(stats).encode()
+            self.stats_built = now
+        return self.stats_body
+
+
+def create_app(state):
+    async def get_funding(request):
+        _, symbols, _, _ = parse_filters(request.query)
+        return web.Response(body=state.funding_body(symbols), headers=JSON_HEADERS)
+
+    def recent_handler(topic):
+        async def handler(request):
+            _, symbols, min_usd, limit = parse_filters(request.query)
+            return web.Response(body=state.recent_body(topic, symbols, min_usd, limit), headers=JSON_HEADERS)
+        return handler
+
+    async def get_stats(request):
+        return web.Response(body=state.stats_body_snapshot(), headers=JSON_HEADERS)
+
+    async def websocket(request):
+        topics, symbols, min_usd, _ = parse_filters(request.query)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        client = state.subscribe(topics, symbols, min_usd)
+
+        async def push():
+            queue = client.queue
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < MAX_FRAME_EVENTS and not queue.empty():
+                    batch.append(queue.get_nowait())
+                await ws.send_str("[" + ",".join(batch) + "]")
+
+        sender = asyncio.create_task(push())
+        try:
+            async for _ in ws:
+                pass  # clients only listen, anything they send is ignored
+        finally:
+            sender.cancel()
+            client.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/funding", get_funding)
+    app.router.add_get("/trades", recent_handler(HUGE_TRADE))
+    app.router.add_get("/liquidations", recent_handler(LIQUIDATION))
+    app.router.add_get("/stats", get_stats)
+    app.router.add_get("/ws", websocket)
+    return app
+
+
+async def start_server(state, host=HOST, port=PORT):
+    """Starts the API on the running loop, returns the runner to clean up with"""
+    runner = web.AppRunner(create_app(state))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Serving live state on http://{host}:{port}")
+    return runner
+
+
+async def main():
+    bus = EventBus()
+    # huge trades and funding reach the bus in one exchange-time order, liquidations
+    # skip the merge lateness and go straight to risk subscribers
+    merger = EventMerger(huge_trades.MERGE_LATENESS_MS, listeners=[bus.publish])
+    liq_monitor = LiquidationMonitor(bus=bus)
+    aggregator = huge_trades.TradeAggregator(huge_trades.trades_filename, bus=merger)
+    managers = [
+        huge_trades.WebSocketManager(symbol, f"{huge_trades.websocket_url_base}{symbol.lower()}@aggTrade", aggregator)
+        for symbol in huge_trades.symbols
+    ]
+    state = LiveState(bus, liq_monitor, aggregator)
+    runner = await start_server(state)
+
+    try:
+        await asyncio.gather(
+            state.run(),
+            merger.run(),
+            liq_monitor.run(),
+            *(manager.run() for manager in managers),
+            huge_trades.print_aggregated_trades_every_seconds(aggregator),
+            *(funding.binance_funding_stream(symbol, funding.shared_symbol_counter, merger) for symbol in funding.symbols),
+        )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
@@ -0,0 +1,244 @@
+"""
+Optional SQLite sink for liquidations, large trades and funding samples, next to the CSV writers.
+
+The monitors hand records to add() / add_many(), which only put them on a
+queue. A writer thread owns the connection. It takes whatever has queued up,
+up to BATCH_MAX records, and inserts it in one transaction with one
+executemany per table, so batches grow with the backlog. sqlite3 caches the
+prepared INSERT statements. The database runs in WAL mode with
+synchronous=NORMAL, so readers query while the writer commits and a commit
+doesn't wait for a full fsync. Every table has a composite (symbol, time)
+index.
+
+    sink = SqliteSink("market.db")
+    monitor = LiquidationMonitor(sink=sink)
+    ...
+    sink.close()
+
+    SELECT symbol, SUM(usd_size) FROM liquidations WHERE time > ? GROUP BY symbol
+
+`python sqlite_sink.py --bench` inserts synthetic liquidations as fast as it
+can while another thread runs that query in a loop. It reports inserts/sec
+and query latency, and exits non-zero below PEAK_CASCADE_RATE.
+"""
+
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from records import Liquidation, MarkPrice, Trade
+
+# Sink settings
+BATCH_MAX = 5000  # records per transaction
+QUEUE_SIZE = 200000  # records waiting for the writer before new ones are dropped
+BUSY_TIMEOUT_MS = 5000  # several monitor processes may share one database
+PEAK_CASCADE_RATE = 2000  # liquidations/sec the sink has to sustain, well above a cascade on !forceOrder@arr
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS liquidations (
+    symbol TEXT NOT NULL, side TEXT, order_type TEXT, time_in_force TEXT, original_quantity REAL,
+    price REAL, average_price REAL, status TEXT, last_filled_quantity REAL, filled_quantity REAL,
+    time INTEGER NOT NULL, usd_size REAL
+);
+CREATE INDEX IF NOT EXISTS liquidations_symbol_time ON liquidations (symbol, time);
+CREATE TABLE IF NOT EXISTS trades (
+    symbol TEXT NOT NULL, agg_id INTEGER, price REAL, quantity REAL, first_id INTEGER,
+    time INTEGER NOT NULL, is_buyer_maker INTEGER, usd_size REAL
+);
+CREATE INDEX IF NOT EXISTS trades_symbol_time ON trades (symbol, time);
+CREATE TABLE IF NOT EXISTS funding (
+    symbol TEXT NOT NULL, mark_price REAL, funding_rate REAL, time INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS funding_symbol_time ON funding (symbol, time);
+"""
+
+INSERTS = {
+    "liquidations": "INSERT INTO liquidations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "trades": "INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "funding": "INSERT INTO funding VALUES (?, ?, ?, ?)",
+}
+
+_STOP = object()
+
+
+def to_row(record):
+    """(table, row) for a record"""
+    if isinstance(record, Liquidation):
+        return "liquidations", (record.symbol, record.side, record.order_type, record.time_in_force,
+                                record.original_quantity, record.price, record.average_price, record.status,
+                                record.last_filled_quantity, record.filled_quantity, record.time, record.usd_size)
+    if isinstance(record, Trade):
+        return "trades", (record.symbol, record.agg_id, record.price, record.quantity, record.first_id,
+                          record.time, int(record.is_buyer_maker), record.usd_size)
+    if isinstance(record, MarkPrice):
+        return "funding", (record.symbol, record.mark_price, record.funding_rate, record.time)
+    raise TypeError(f"No table for {type(record).__name__}")
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqliteSink:
+    def __init__(self, path, batch_max=BATCH_MAX, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.batch_max = batch_max
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.inserted = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+
+        conn = connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self.thread = threading.Thread(target=self._write_loop, name="sqlite-sink", daemon=True)
+        self.thread.start()
+
+    def add(self, record):
+        """Queues a record for insertion, never blocks"""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def add_many(self, records):
+        for record in records:
+            self.add(record)
+
+    def publish(self, record):
+        """Duck-types EventBus.publish, so the sink can stand in for a bus"""
+        self.add(record)
+
+    def _write_loop(self):
+        conn = connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                rows = {}
+                for record in batch:
+                    if record is _STOP:
+                        stopping = True
+                        continue
+                    try:
+                        table, row = to_row(record)
+                    except TypeError as e:
+                        # skip it, a dead writer would leave flush() and close() blocked forever
+                        self.errors += 1
+                        print(f"Skipping record for {self.path}: {e}")
+                        continue
+                    rows.setdefault(table, []).append(row)
+                with conn:  # one transaction per batch
+                    for table, table_rows in rows.items():
+                        conn.executemany(INSERTS[table], table_rows)
+                self.inserted += sum(len(table_rows) for table_rows in rows.values())
+                self.batches += 1
+            except Exception as e:  # the writer must outlive any bad batch
+                self.errors += 1
+                print(f"Error inserting {len(batch)} records into {self.path}: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        conn.close()
+
+    def flush(self):
+        """Blocks until everything queued so far is committed"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def query(self, sql, params=()):
+        """Rows from a read-only query on a connection of its own, safe from any thread"""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def stats(self):
+        return {"inserted": self.inserted, "batches": self.batches, "queued": self.queue.qsize(),
+                "dropped": self.dropped, "errors": self.errors}
+
+
+def bench(records, seconds_window=300):
+    """(inserts/sec, queries run, median / max query ms) with a reader querying throughout"""
+    directory = tempfile.mkdtemp(prefix="bench_sqlite_")
+    sink = SqliteSink(os.path.join(directory, "market.db"))
+    rng = random.Random(0)
+    symbols = [f"ALT{i}USDT" for i in range(300)]
+    now = int(time.time() * 1000)
+
+    stop = threading.Event()
+    query_ms = []
+
+    def reader():
+        sql = "SELECT symbol, SUM(usd_size) FROM liquidations WHERE symbol = ? AND time > ?"
+        while not stop.is_set():
+            start = time.perf_counter()
+            sink.query(sql, (rng.choice(symbols), now - seconds_window * 1000))
+            query_ms.append((time.perf_counter() - start) * 1000)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    start = time.perf_counter()
+    for i in range(records):
+        price = rng.uniform(0.1, 100)
+        quantity = rng.lognormvariate(8, 1.5) / price
+        sink.add(Liquidation(rng.choice(symbols), rng.choice(("BUY", "SELL")), "LIMIT", "IOC", quantity, price,
+                             price, "FILLED", quantity, quantity, now + i))
+        if i % 1000 == 0:
+            time.sleep(0)  # let the writer and reader threads in, as the event loop would between messages
+    sink.flush()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    sink.close()
+
+    query_ms.sort()
+    return {
+        "directory": directory,
+        "rate": records / elapsed,
+        "batches": sink.batches,
+        "dropped": sink.dropped,
+        "queries": len(query_ms),
+        "query_p50_ms": query_ms[len(query_ms) // 2] if query_ms else 0.0,
+        "query_max_ms": query_ms[-1] if query_ms else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite sink throughput with concurrent queries")
+    parser.add_argument("--bench", action="store_true", required=True)
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+
+    result = bench(args.records)
+    print(f"Inserted {args.records:,} liquidations at {result['rate']:,.0f}/s in {result['batches']:,} transactions "
+          f"({result['dropped']} dropped), database in {result['directory']}")
+    print(f"{result['queries']:,} concurrent queries, p50 {result['query_p50_ms']:.2f}ms, max {result['query_max_ms']:.2f}ms")
+    if result["rate"] < PEAK_CASCADE_RATE or result["dropped"]:
+        print(f"BELOW PEAK CASCADE RATE ({PEAK_CASCADE_RATE:,}/s) or dropping records")
+        sys.exit(1)
+    print("Sustains the peak cascade rate")
+
+
+if __name__ == "__main__":
+    main()
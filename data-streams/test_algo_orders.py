@@ -0,0 +1,239 @@
+"""
+Scheduler tests for algo_orders.ExecutionEngine against a fake venue and a fake clock.
+"""
+
+import asyncio
+import itertools
+
+import pytest
+
+import algo_orders
+from algo_orders import ExecutionEngine, ParentOrder
+
+ASK = 100.0
+BID = 99.9
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class FakeVenue:
+    """Answers every order with the next scripted status ("resting" / "filled" / "error")"""
+
+    def __init__(self):
+        self.oids = itertools.count(1)
+        self.order_script = []  # status kinds for the next orders, "resting" when empty
+        self.cancel_script = []  # "success" / "error" for the next cancels, "success" when empty
+        self.orders = []
+        self.cancels = []
+        self.calls = []
+
+    async def ask_bid(self, coin):
+        return ASK, BID, None
+
+    async def bulk_orders(self, orders):
+        self.calls.append("orders")
+        statuses = []
+        for order in orders:
+            oid = next(self.oids)
+            self.orders.append(dict(order, oid=oid))
+            kind = self.order_script.pop(0) if self.order_script else "resting"
+            if kind == "filled":
+                statuses.append({"filled": {"oid": oid, "totalSz": str(order["sz"]), "avgPx": str(order["limit_px"])}})
+            elif kind == "error":
+                statuses.append({"error": "Order must have minimum value of $10."})
+            else:
+                statuses.append({"resting": {"oid": oid}})
+        return {"status": "ok", "response": {"type": "order", "data": {"statuses": statuses}}}
+
+    async def bulk_cancel(self, cancels):
+        self.calls.append("cancel")
+        statuses = []
+        for coin, oid in cancels:
+            self.cancels.append(oid)
+            kind = self.cancel_script.pop(0) if self.cancel_script else "success"
+            statuses.append("success" if kind == "success" else {"error": "Order was never placed, already canceled, or filled."})
+        return {"status": "ok", "response": {"type": "cancel", "data": {"statuses": statuses}}}
+
+    def placed_size(self):
+        return sum(order["sz"] for order in self.orders)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(algo_orders, "time", clock)
+    return clock
+
+
+def fill(oid, sz, px=ASK, tid=None):
+    return {"oid": oid, "sz": str(sz), "px": str(px), "tid": tid if tid is not None else f"{oid}-{sz}"}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_marketable_iceberg_child_waits_for_fill_feed(clock):
+    async def scenario():
+        venue = FakeVenue()
+        venue.order_script = ["filled"]
+        engine = ExecutionEngine(venue)
+        parent = await engine.submit(ParentOrder("ETH", True, 1.0, mode="iceberg", display_size=0.25))
+
+        await engine.tick()
+        for _ in range(5):  # the feed lags several ticks behind the order response
+            clock.now += 0.5
+            await engine.tick()
+        assert len(venue.orders) == 1
+        assert parent.outstanding == pytest.approx(0.25)
+
+        engine.on_fill(fill(venue.orders[0]["oid"], 0.25))
+        clock.now += 0.5
+        await engine.tick()
+        return venue, parent
+
+    venue, parent = run(scenario())
+    assert len(venue.orders) == 2
+    assert parent.filled == pytest.approx(0.25)
+
+
+def test_twap_slice_counts_unconfirmed_fill(clock):
+    async def scenario():
+        venue = FakeVenue()
+        venue.order_script = ["filled"] * 50
+        engine = ExecutionEngine(venue)
+        parent = await engine.submit(ParentOrder("ETH", True, 1.0, mode="twap", duration=100, slice_interval=10))
+        for _ in range(40):  # the whole duration and then some with the feed down
+            clock.now += 5
+            await engine.tick()
+        return venue, parent
+
+    venue, parent = run(scenario())
+    assert venue.placed_size() == pytest.approx(parent.size)
+    assert parent.filled == pytest.approx(parent.size)
+
+
+def test_unconfirmed_fill_is_settled_from_the_response_after_ttl(clock):
+    async def scenario():
+        venue = FakeVenue()
+        venue.order_script = ["filled"]
+        engine = ExecutionEngine(venue, child_ttl=10)
+        parent = await engine.submit(ParentOrder("ETH", True, 0.5, mode="iceberg", display_size=0.5))
+        await engine.tick()
+        clock.now += 11
+        await engine.tick()
+        # a late feed fill for the settled child is not counted again
+        engine.on_fill(fill(venue.orders[0]["oid"], 0.5))
+        return venue, parent
+
+    venue, parent = run(scenario())
+    assert parent.done.is_set()
+    assert parent.filled == pytest.approx(0.5)
+    assert len(venue.orders) == 1
+
+
+def test_reslice_only_after_cancel_confirms(clock):
+    async def scenario():
+        venue = FakeVenue()
+        engine = ExecutionEngine(venue, child_ttl=10)
+        parent = await engine.submit(ParentOrder("ETH", True, 0.5, mode="iceberg", display_size=0.5, limit_px=None))
+        await engine.tick()
+        first = venue.orders[0]["oid"]
+
+        # the child filled just before the cancel landed
+        venue.cancel_script = ["error"]
+        clock.now += 11
+        await engine.tick()
+        after_failed_cancel = len(venue.orders)
+        engine.on_fill(fill(first, 0.5))
+        clock.now += 0.5
+        await engine.tick()
+        return venue, parent, after_failed_cancel
+
+    venue, parent, after_failed_cancel = run(scenario())
+    assert after_failed_cancel == 1
+    assert len(venue.orders) == 1
+    assert parent.done.is_set()
+    assert parent.filled == pytest.approx(0.5)
+
+
+def test_cancel_goes_out_before_the_reslice(clock):
+    async def scenario():
+        venue = FakeVenue()
+        engine = ExecutionEngine(venue, child_ttl=10)
+        await engine.submit(ParentOrder("ETH", True, 0.5, mode="iceberg", display_size=0.5))
+        await engine.tick()
+        clock.now += 11
+        await engine.tick()
+        return venue
+
+    venue = run(scenario())
+    assert venue.calls == ["orders", "cancel", "orders"]
+    assert venue.cancels == [venue.orders[0]["oid"]]
+
+
+def test_fill_feed_beating_the_order_response_is_kept(clock):
+    async def scenario():
+        venue = FakeVenue()
+        engine = ExecutionEngine(venue)
+        parent = await engine.submit(ParentOrder("ETH", True, 0.5, mode="iceberg", display_size=0.5))
+        engine.on_fill(fill(1, 0.5))  # oid 1 is what the venue is about to hand out
+        await engine.tick()
+        return parent
+
+    parent = run(scenario())
+    assert parent.done.is_set()
+    assert parent.outstanding == 0
+
+
+def test_pinned_iceberg_below_minimum_rounds_up(clock):
+    async def scenario():
+        venue = FakeVenue()
+        engine = ExecutionEngine(venue)
+        parent = await engine.submit(ParentOrder("ETH", True, 1.0, mode="iceberg", display_size=0.01, limit_px=99.0))
+        await engine.tick()
+        return venue
+
+    venue = run(scenario())
+    assert len(venue.orders) == 1
+    assert venue.orders[0]["sz"] * venue.orders[0]["limit_px"] >= algo_orders.MIN_CHILD_USD - 1e-9
+
+
+def test_remainder_below_minimum_finishes_parent(clock):
+    async def scenario():
+        venue = FakeVenue()
+        engine = ExecutionEngine(venue)
+        parent = await engine.submit(ParentOrder("ETH", True, 0.05, mode="iceberg", display_size=0.05, limit_px=99.0))
+        await engine.tick()  # 0.05 ETH is $5, under the minimum
+        return venue, parent
+
+    venue, parent = run(scenario())
+    assert not venue.orders
+    assert parent.done.is_set()
+
+
+def test_dust_is_swept_into_the_last_child(clock):
+    async def scenario():
+        venue = FakeVenue()
+        engine = ExecutionEngine(venue)
+        parent = await engine.submit(ParentOrder("ETH", True, 0.2, mode="iceberg", display_size=0.15, limit_px=99.0))
+        await engine.tick()
+        return venue, parent
+
+    venue, parent = run(scenario())
+    assert [order["sz"] for order in venue.orders] == [pytest.approx(0.2)]
+
+
+def test_seen_fills_are_capped(clock, monkeypatch):
+    monkeypatch.setattr(algo_orders, "MAX_SEEN_FILLS", 100)
+    engine = ExecutionEngine(FakeVenue())
+    for tid in range(1000):
+        engine.on_fill(fill("other", 0.1, tid=tid))
+    assert len(engine.seen_fills) == 100
+    assert len(engine.early_fills) <= algo_orders.MAX_EARLY_FILLS
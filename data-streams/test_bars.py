@@ -0,0 +1,50 @@
+"""
+BarBuilder tests for trades that arrive after the wall-clock flush closed their bar.
+"""
+
+import numpy as np
+
+from bars import FLUSH_GRACE_MS, BarAggregator, BarStore
+
+MINUTE = 1_700_000_040_000  # a minute boundary
+LAST_SECOND = MINUTE + 59_000
+
+
+def build(tmp_path, events):
+    store = BarStore(str(tmp_path / "bars"))
+    aggregator = BarAggregator(store)
+    builder = aggregator.builder("BTCUSDT")
+    for kind, value in events:
+        if kind == "trade":
+            builder.on_trade(*value)
+        else:
+            aggregator.flush(value)
+    aggregator.flush(MINUTE + 10 ** 8, grace_ms=0)
+    return store, builder
+
+
+def test_flush_waits_out_the_grace_period(tmp_path):
+    store, builder = build(tmp_path, [
+        ("trade", (LAST_SECOND + 100, 100.0, 1.0, False)),
+        ("flush", LAST_SECOND + 1020),  # the second is over, the trade below is still in flight
+        ("trade", (LAST_SECOND + 900, 101.0, 2.0, True)),
+    ])
+    bars = store.load("BTCUSDT", 1)
+    assert list(bars["start"]) == [LAST_SECOND]
+    assert bars["volume"][0] == 3.0
+    assert builder.late_trades == 0
+
+
+def test_late_trade_never_reopens_a_closed_bar(tmp_path):
+    store, builder = build(tmp_path, [
+        ("trade", (LAST_SECOND + 100, 100.0, 1.0, False)),
+        ("flush", LAST_SECOND + 1000 + FLUSH_GRACE_MS),
+        ("trade", (LAST_SECOND + 900, 101.0, 2.0, True)),
+        ("trade", (MINUTE + 61_500, 102.0, 1.0, False)),
+    ])
+    for resolution in (1, 60, 300):
+        bars = store.load("BTCUSDT", resolution)
+        assert np.all(np.diff(bars["start"]) > 0)
+        assert bars["volume"].sum() == 4.0
+    assert list(store.load("BTCUSDT", 1)["start"]) == [LAST_SECOND, MINUTE + 60_000, MINUTE + 61_000]
+    assert builder.late_trades == 1
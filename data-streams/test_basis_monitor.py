@@ -0,0 +1,47 @@
+"""
+BasisMonitor tests: contract prefixes and per-symbol Binance funding intervals.
+"""
+
+import pytest
+
+from basis_monitor import BasisMonitor, binance_to_coin
+
+HOUR_MS = 3600 * 1000
+
+
+def test_contract_prefixes_map_to_hyperliquid_coins():
+    assert binance_to_coin("BTCUSDT") == ("BTC", 1.0)
+    assert binance_to_coin("1000PEPEUSDT") == ("kPEPE", 1.0)
+    assert binance_to_coin("1000000BOBUSDT") == ("BOB", 1000000.0)
+    assert binance_to_coin("1INCHUSDT") == ("1INCH", 1.0)
+    assert binance_to_coin("BTCUSDC") == (None, None)
+
+
+def setup():
+    monitor = BasisMonitor()
+    monitor.on_binance_marks([
+        {"s": "BTCUSDT", "p": "60000", "r": "0.0001", "T": 8 * HOUR_MS},
+        {"s": "1000000BOBUSDT", "p": "50", "r": "0.0001", "T": 4 * HOUR_MS},
+    ])
+    monitor.on_hyperliquid_ctxs({"universe": [{"name": "BTC"}, {"name": "BOB"}]},
+                                [{"funding": "0.0000125", "markPx": "60000"}, {"funding": "0.0000125", "markPx": "0.00005"}])
+    return monitor
+
+
+def ranked(monitor):
+    return {row["coin"]: row for row in monitor.rank()}
+
+
+def test_millionx_contract_price_is_per_coin():
+    assert ranked(setup())["BOB"]["basis_bps"] == pytest.approx(0.0)
+
+
+def test_funding_interval_comes_from_next_funding_time_and_funding_info():
+    monitor = setup()
+    assert ranked(monitor)["BTC"]["bn_yearly"] == pytest.approx(0.0001 * 3 * 365 * 100)  # 8h until told otherwise
+
+    monitor.on_binance_marks([{"s": "1000000BOBUSDT", "p": "50", "r": "0.0001", "T": 8 * HOUR_MS}])
+    assert ranked(monitor)["BOB"]["bn_yearly"] == pytest.approx(0.0001 * 6 * 365 * 100)  # stepped by 4h
+
+    monitor.on_binance_funding_info([{"symbol": "BTCUSDT", "fundingIntervalHours": 1}])
+    assert ranked(monitor)["BTC"]["bn_yearly"] == pytest.approx(0.0001 * 24 * 365 * 100)
@@ -0,0 +1,29 @@
+"""
+read_log_after on recorder logs that are only roughly in time order.
+"""
+
+from checkpoint import read_log_after
+
+HEADER = "symbol,time,usd_size"
+
+
+def write_log(tmp_path, times):
+    path = tmp_path / "log.csv"
+    path.write_text(HEADER + "\n" + "".join(f"BTCUSDT,{t},1000.0\n" for t in times))
+    return str(path)
+
+
+def test_late_row_before_the_block_boundary_is_kept(tmp_path):
+    # 1_001_000 was written first but only checkpointed up to 1_000_500, then older rows followed
+    times = [1_000_000 + i for i in range(0, 500, 10)] + [1_001_000] + [1_000_400 + i for i in range(0, 200, 5)]
+    path = write_log(tmp_path, times)
+    rows = list(read_log_after(path, 1_000_500, 1, block_size=64, lateness_ms=1000))
+    assert [int(row[1]) for row in rows] == [1_001_000, *[t for t in times[51:] if t > 1_000_500]]
+
+
+def test_rows_out_of_order_after_the_checkpoint_are_all_replayed(tmp_path):
+    times = list(range(1000, 2000, 10)) + [5000, 4000, 4500, 3000, 6000]
+    path = write_log(tmp_path, times)
+    rows = list(read_log_after(path, 2500, 1, block_size=32, lateness_ms=10_000))
+    assert [int(row[1]) for row in rows] == [5000, 4000, 4500, 3000, 6000]
+    assert list(read_log_after(path, 6000, 1, block_size=32)) == []
@@ -0,0 +1,32 @@
+"""
+csv_convert tests on a small liquidation CSV written the way _write_batch wrote them.
+"""
+
+import csv_convert
+
+ROWS = [
+    # _write_batch stripped USDT from the whole line, delivery contracts included
+    "BTC,SELL,LIMIT,IOC,0.010,60000.00,60010.00,FILLED,0.010,0.010,1756104046088,600.0",
+    "ETH_251226,BUY,LIMIT,IOC,0.500,4600.00,4605.00,FILLED,0.500,0.500,1756104046090,2300.0",
+    "ETH_251226,BUY,LIMIT,IOC,0.500,4600.00,4605.00,FILLED,0.500,0.500,1756104046090,2300.0",
+    "BTCUSDC,SELL,LIMIT,IOC,0.020,60000.00,60010.00,FILLED,0.020,0.020,1756104046095,1200.0",
+]
+
+
+def convert_fixture(tmp_path):
+    path = tmp_path / "liqs.csv"
+    path.write_text(csv_convert.LIQS_HEADER + "\n" + "\n".join(ROWS) + "\n")
+    report = csv_convert.convert(str(path), output_dir=str(tmp_path / "converted"))
+    return report, csv_convert.load(report["output"])
+
+
+def test_delivery_contracts_get_usdt_back_before_the_expiry(tmp_path):
+    report, rows = convert_fixture(tmp_path)
+    assert list(rows["symbol"]) == [b"BTCUSDT", b"ETHUSDT_251226", b"BTCUSDC"]
+    # both copies of the delivery row share one symbol key, so they dedupe like live data
+    assert report["duplicates"] == 1
+
+
+def test_restore_quote_leaves_quoted_symbols():
+    restored = csv_convert.restore_quote(["1000PEPE", "BTCUSDC", "ETHUSDT_250926", "BTC_250926"])
+    assert list(restored) == ["1000PEPEUSDT", "BTCUSDC", "ETHUSDT_250926", "BTCUSDT_250926"]
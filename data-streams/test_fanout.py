@@ -0,0 +1,64 @@
+"""
+FanoutServer / FanoutClient tests over a real Unix socket.
+"""
+
+import asyncio
+
+import pytest
+
+from fanout import HEADER, LAYOUTS, TRADE, FanoutClient, FanoutServer, pack, unpack
+from records import Trade
+
+
+def trade(agg_id, symbol="BTCUSDT"):
+    return Trade(symbol, agg_id, 60000.0, 0.1, agg_id, 1000 + agg_id, False, 1000 + agg_id)
+
+
+async def receive(path, since, count):
+    client = FanoutClient(path, since=since, reconnect=False)
+    seqs = []
+    async for seq, record in client:
+        seqs.append(seq)
+        if len(seqs) == count:
+            break
+    client.close()
+    return seqs, client
+
+
+def test_trade_frame_size():
+    assert HEADER.size + LAYOUTS[TRADE].size == 78
+
+
+def test_fresh_client_counts_frames_the_backlog_rolled_past(tmp_path):
+    async def scenario():
+        server = FanoutServer(str(tmp_path / "fanout.sock"), backlog=5)
+        await server.start()
+        for agg_id in range(1, 9):
+            server.publish(trade(agg_id))
+        try:
+            fresh = await asyncio.wait_for(receive(server.path, 0, 5), 5)
+            resumed = await asyncio.wait_for(receive(server.path, 6, 2), 5)
+        finally:
+            await server.close()
+        return fresh, resumed
+
+    (fresh_seqs, fresh), (resumed_seqs, resumed) = asyncio.run(scenario())
+    assert fresh_seqs == [4, 5, 6, 7, 8]
+    assert fresh.gaps == 3
+    assert resumed_seqs == [7, 8]
+    assert resumed.gaps == 0
+
+
+def test_symbol_longer_than_its_field_is_rejected_not_truncated():
+    # both would arrive as 1000000BABYDOGE if cut to 16 bytes
+    for symbol in ("1000000BABYDOGEUSDT", "1000000BABYDOGEUSDC"):
+        with pytest.raises(ValueError):
+            pack(trade(1, symbol))
+    record_type, payload = pack(trade(1, "ETHUSDT_251226"))
+    assert unpack(record_type, payload).symbol == "ETHUSDT_251226"
+
+    server = FanoutServer("/nonexistent/fanout.sock")
+    server.publish(trade(1, "1000000BABYDOGEUSDT"))
+    server.publish(trade(2))
+    assert server.stats()["rejected"] == 1
+    assert [seq for seq, _ in server.backlog] == [1]
@@ -0,0 +1,91 @@
+"""
+LiquidationHeatmap streaming tests (add, outliers, recentring, clusters) and the offline heatmap_from_rows.
+"""
+
+import numpy as np
+
+import csv_convert
+from liq_heatmap import RECENTER_PRINTS, LiquidationHeatmap, heatmap_from_rows, strongest_levels, to_dense
+
+T0 = 1756100000000  # ms
+MINUTE = 60000
+
+
+def rows(*liquidations):
+    """(symbol, side, price, usd, time) tuples as a converted liquidation array"""
+    out = np.zeros(len(liquidations), dtype=csv_convert.LIQ_DTYPE)
+    for row, (symbol, side, price, usd, t) in zip(out, liquidations):
+        row["symbol"], row["side"], row["price"], row["usd_size"], row["time"] = symbol, side, price, usd, t
+        row["filled_quantity"] = row["original_quantity"] = usd / price
+    return out
+
+
+def test_cluster_forms_at_the_liquidated_level():
+    heatmap = LiquidationHeatmap(price_bins=64, time_buckets=10)
+    for i in range(5):
+        assert heatmap.add("BTCUSDT", "SELL", 100.0, 50000, T0 + i * 1000)
+    heatmap.add("BTCUSDT", "BUY", 101.0, 10000, T0)
+    heatmap.set_price("BTCUSDT", 100.5)
+
+    clusters = heatmap.clusters("BTCUSDT", within_pct=2, now=T0)
+    assert clusters
+    assert abs(clusters[0]["price"] / 100.0 - 1) < 0.005
+    assert clusters[0]["longs_usd"] > clusters[0]["shorts_usd"]
+    assert heatmap.total("BTCUSDT", now=T0) == 260000
+
+
+def test_bad_print_is_held_then_dropped():
+    heatmap = LiquidationHeatmap(price_bins=64, time_buckets=10)
+    heatmap.add("BTCUSDT", "SELL", 100.0, 50000, T0)
+    heatmap.set_price("BTCUSDT", 100.0)
+
+    assert not heatmap.add("BTCUSDT", "SELL", 1000.0, 1e9, T0)  # a 10x print, held
+    assert heatmap.stats()["held"] == 1
+    assert heatmap.add("BTCUSDT", "SELL", 100.0, 50000, T0)  # the market is still here
+    stats = heatmap.stats()
+    assert stats["held"] == 0 and stats["outliers"] == 1
+    assert heatmap.total("BTCUSDT", now=T0) == 100000
+
+
+def test_confirmed_move_recentres_and_replays_held_prints():
+    heatmap = LiquidationHeatmap(price_bins=64, time_buckets=10)
+    heatmap.add("BTCUSDT", "SELL", 100.0, 50000, T0)
+    heatmap.set_price("BTCUSDT", 100.0)
+    for i in range(RECENTER_PRINTS):
+        heatmap.add("BTCUSDT", "BUY", 120.0, 10000, T0 + MINUTE + i)
+
+    grid = heatmap.grids["BTCUSDT"]
+    assert grid.lo <= np.log(120.0) / heatmap.step < grid.lo + 64
+    assert heatmap.stats()["held"] == 0
+    assert grid.added == 1 + RECENTER_PRINTS
+    heatmap.set_price("BTCUSDT", 120.0)
+    assert heatmap.clusters("BTCUSDT", within_pct=2, now=T0 + MINUTE)[0]["shorts_usd"] > 0
+
+
+def test_clusters_without_a_price_is_empty():
+    heatmap = LiquidationHeatmap(price_bins=8, time_buckets=10)
+    # the median of two far apart levels sits between them, neither row fits the window
+    heatmap.add_rows(rows(("ETHUSDT", "SELL", 100.0, 1000, T0), ("ETHUSDT", "SELL", 200.0, 1000, T0)))
+    assert heatmap.grids["ETHUSDT"].price is None
+    assert heatmap.clusters("ETHUSDT", now=T0) == []
+
+
+def test_heatmap_from_rows_sums_cells_per_symbol():
+    hour = 3600 * 1000
+    cells = heatmap_from_rows(rows(
+        ("BTCUSDT", "SELL", 60000.0, 1000, T0),
+        ("BTCUSDT", "BUY", 60001.0, 2000, T0 + 1000),  # same hour, same 25 bps level
+        ("BTCUSDT", "SELL", 66000.0, 500, T0 + 30 * hour),
+        ("ETHUSDT", "SELL", 4000.0, 700, T0),
+    ), bin_bps=25, bucket_seconds=3600)
+
+    assert sorted(cells) == ["BTCUSDT", "ETHUSDT"]
+    btc = cells["BTCUSDT"]
+    assert list(btc["usd"]) == [3000.0, 500.0]
+    assert np.all(np.diff(btc["time"]) > 0)
+    assert strongest_levels(btc, n=1)[0][1] == 3000.0
+
+    grid, first_time, first_price = to_dense(btc, bin_bps=25, bucket_seconds=3600)
+    assert grid.sum() == 3500.0
+    assert first_time == T0 - T0 % hour
+    assert first_price <= 60000.0
@@ -0,0 +1,44 @@
+"""
+SqliteSink tests: records reach their tables and a bad record doesn't stop the writer.
+"""
+
+import threading
+
+from records import Liquidation, MarkPrice, Trade
+from sqlite_sink import SqliteSink
+
+
+def liquidation(time):
+    return Liquidation("BTCUSDT", "SELL", "LIMIT", "IOC", 0.5, 60000.0, 60000.0, "FILLED", 0.5, 0.5, time)
+
+
+def test_records_reach_their_tables(tmp_path):
+    sink = SqliteSink(str(tmp_path / "market.db"))
+    sink.add_many([liquidation(1000), Trade("ETHUSDT", 1, 3000.0, 200.0, 1, 1001, False), MarkPrice("BTCUSDT", 60000.0, 0.0001, 1002)])
+    sink.flush()
+    assert sink.query("SELECT symbol, usd_size FROM liquidations") == [("BTCUSDT", 30000.0)]
+    assert sink.query("SELECT symbol, is_buyer_maker FROM trades") == [("ETHUSDT", 0)]
+    assert sink.query("SELECT COUNT(*) FROM funding") == [(1,)]
+    sink.close()
+
+
+def test_unknown_record_is_skipped_without_killing_the_writer(tmp_path):
+    sink = SqliteSink(str(tmp_path / "market.db"), queue_size=4)
+    sink.add(liquidation(1000))
+    sink.add({"not": "a record"})
+    sink.add(liquidation(1001))
+
+    flushed = threading.Thread(target=sink.flush, daemon=True)
+    flushed.start()
+    flushed.join(timeout=5)
+    assert not flushed.is_alive()
+    assert sink.thread.is_alive()
+    assert sink.errors == 1
+    assert sink.query("SELECT COUNT(*) FROM liquidations") == [(2,)]
+
+    sink.add_many(liquidation(t) for t in range(2000, 2004))  # fills the queue again
+    closed = threading.Thread(target=sink.close, daemon=True)
+    closed.start()
+    closed.join(timeout=5)
+    assert not closed.is_alive()
+    assert sink.query("SELECT COUNT(*) FROM liquidations") == [(6,)]
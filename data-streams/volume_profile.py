@@ -0,0 +1,237 @@
+"""
+Per-symbol volume profiles and footprint histograms from aggTrades.
+
+Every trade adds its quantity to the buy or sell side of its price bucket
+in the symbol's profile for the current session (UTC day). Buckets live in
+NumPy arrays that grow on demand in either direction, and the bucket width
+is set per symbol. Queries (point of control, value area, high/low volume
+nodes, footprint delta) are array operations over the used range, cheap
+enough to call from inside a strategy loop.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+from termcolor import cprint
+
+import loop_backend
+
+# Bucket width per symbol in quote currency, anything missing gets a width
+# of DEFAULT_BUCKET_BPS of its first traded price
+BUCKET_WIDTHS = {
+    "BTCUSDT": 10.0,
+    "ETHUSDT": 1.0,
+    "SOLUSDT": 0.05,
+    "XRPUSDT": 0.0005,
+    "LINKUSDT": 0.005,
+    "SUIUSDT": 0.0005,
+    "HBARUSDT": 0.00005,
+    "AAVEUSDT": 0.1,
+    "OPUSDT": 0.0005,
+}
+DEFAULT_BUCKET_BPS = 5
+
+# Profile settings
+SESSION_MS = 24 * 60 * 60 * 1000  # UTC day sessions
+SESSIONS_KEPT = 2
+INITIAL_BUCKETS = 256
+VALUE_AREA = 0.70
+DISPLAY_INTERVAL = 30  # seconds
+
+
+def default_bucket_width(price):
+    """DEFAULT_BUCKET_BPS of price, rounded down to 1, 2 or 5 times a power of ten"""
+    raw = price * DEFAULT_BUCKET_BPS / 10000
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for step in (5, 2, 1):
+        if step * magnitude <= raw:
+            return float(step * magnitude)
+    return float(magnitude)
+
+
+class VolumeProfile:
+    def __init__(self, bucket_width, capacity=INITIAL_BUCKETS):
+        self.bucket_width = bucket_width
+        self.buy = np.zeros(capacity)
+        self.sell = np.zeros(capacity)
+        self.base = None  # bucket number stored in slot 0
+        self.lo = None  # used slot range, inclusive
+        self.hi = None
+        self.trades = 0
+
+    def _grow(self, slot):
+        """Reallocates so slot fits, returns the slot's new position"""
+        size = len(self.buy)
+        shift = 0
+        needed = size
+        if slot < 0:
+            shift = -slot + size // 2
+            needed = size + shift
+        elif slot >= size:
+            needed = slot + 1
+        new_size = size
+        while new_size < needed:
+            new_size *= 2
+
+        buy = np.zeros(new_size)
+        sell = np.zeros(new_size)
+        buy[shift:shift + size] = self.buy
+        sell[shift:shift + size] = self.sell
+        self.buy, self.sell = buy, sell
+        self.base -= shift
+        self.lo += shift
+        self.hi += shift
+        return slot + shift
+
+    def add(self, price, quantity, is_buyer_maker):
+        bucket = int(price // self.bucket_width)
+        if self.base is None:
+            self.base = bucket - len(self.buy) // 2
+            self.lo = self.hi = bucket - self.base
+
+        slot = bucket - self.base
+        if slot < 0 or slot >= len(self.buy):
+            slot = self._grow(slot)
+
+        if is_buyer_maker:
+            self.sell[slot] += quantity
+        else:
+            self.buy[slot] += quantity
+        if slot < self.lo:
+            self.lo = slot
+        elif slot > self.hi:
+            self.hi = slot
+        self.trades += 1
+
+    # ---- queries ----
+
+    def _used(self):
+        if self.base is None:
+            return None, None, None
+        buy = self.buy[self.lo:self.hi + 1]
+        sell = self.sell[self.lo:self.hi + 1]
+        return buy, sell, buy + sell
+
+    def price_of(self, offset):
+        """Lower edge price of the offset-th used bucket"""
+        return (self.base + self.lo + offset) * self.bucket_width
+
+    def prices(self):
+        if self.base is None:
+            return np.empty(0)
+        return (self.base + np.arange(self.lo, self.hi + 1)) * self.bucket_width
+
+    def poc(self):
+        """Point of control, the bucket price with the most volume"""
+        _, _, total = self._used()
+        if total is None:
+            return None
+        return self.price_of(int(np.argmax(total)))
+
+    def value_area(self, fraction=VALUE_AREA):
+        """
+        (low, high) price range of the smallest set of buckets holding fraction
+        of the volume, taking buckets from the highest volume down
+        """
+        _, _, total = self._used()
+        if total is None:
+            return None
+        order = np.argsort(total)[::-1]
+        cumulative = np.cumsum(total[order])
+        count = int(np.searchsorted(cumulative, cumulative[-1] * fraction)) + 1
+        chosen = order[:count]
+        return self.price_of(int(chosen.min())), self.price_of(int(chosen.max())) + self.bucket_width
+
+    def volume_nodes(self, kind="high", threshold=1.0):
+        """
+        Prices of local peaks (kind="high") or troughs (kind="low") in the
+        profile that are threshold standard deviations above / below the mean
+        """
+        _, _, total = self._used()
+        if total is None or len(total) < 3:
+            return np.empty(0)
+        inner = total[1:-1]
+        mean, std = total.mean(), total.std()
+        if kind == "high":
+            mask = (inner >= total[:-2]) & (inner >= total[2:]) & (inner > mean + threshold * std)
+        else:
+            mask = (inner <= total[:-2]) & (inner <= total[2:]) & (inner < mean - threshold * std)
+        return (self.base + self.lo + 1 + np.flatnonzero(mask)) * self.bucket_width
+
+    def footprint(self):
+        """(prices, buy, sell, delta) for every used bucket"""
+        buy, sell, _ = self._used()
+        if buy is None:
+            empty = np.empty(0)
+            return empty, empty, empty, empty
+        return self.prices(), buy.copy(), sell.copy(), buy - sell
+
+    def total_volume(self):
+        _, _, total = self._used()
+        return float(total.sum()) if total is not None else 0.0
+
+
+class ProfileBook:
+    """Profiles for every symbol and session, plugs into the aggTrade listeners"""
+
+    def __init__(self, bucket_widths=None, sessions_kept=SESSIONS_KEPT):
+        self.bucket_widths = dict(BUCKET_WIDTHS if bucket_widths is None else bucket_widths)
+        self.sessions_kept = sessions_kept
+        self.profiles = {}  # symbol -> {session: VolumeProfile}
+
+    def on_trade(self, symbol, trade_time, price, quantity, is_buyer_maker):
+        session = trade_time // SESSION_MS
+        sessions = self.profiles.get(symbol)
+        if sessions is None:
+            sessions = self.profiles[symbol] = {}
+
+        profile = sessions.get(session)
+        if profile is None:
+            width = self.bucket_widths.get(symbol)
+            if width is None:
+                width = self.bucket_widths[symbol] = default_bucket_width(price)
+            profile = sessions[session] = VolumeProfile(width)
+            for old in sorted(sessions)[:-self.sessions_kept]:
+                del sessions[old]
+
+        profile.add(price, quantity, is_buyer_maker)
+
+    def profile(self, symbol, session=None):
+        """The profile for session (default: the latest one)"""
+        sessions = self.profiles.get(symbol)
+        if not sessions:
+            return None
+        return sessions[max(sessions) if session is None else session]
+
+    def print_summary(self):
+        cprint(f"{time.strftime('%H:%M:%S')} session volume profiles", "white", "on_black")
+        for symbol in sorted(self.profiles):
+            profile = self.profile(symbol)
+            low, high = profile.value_area()
+            hvn = ", ".join(f"{p:g}" for p in profile.volume_nodes("high")[:3])
+            cprint(f"{symbol.replace('USDT', ''):>6} POC {profile.poc():g}  VA {low:g}-{high:g}  HVN [{hvn}]",
+                   "black", "on_cyan")
+
+
+async def display_loop(book):
+    while True:
+        await asyncio.sleep(DISPLAY_INTERVAL)
+        book.print_summary()
+
+
+async def main():
+    import recent_trades
+
+    book = ProfileBook()
+    tasks = [
+        recent_trades.binance_trade_stream(
+            f"{recent_trades.websocket_url_base}{symbol.lower()}@aggTrade", symbol,
+            recent_trades.trades_filename, listeners=[book.on_trade])
+        for symbol in recent_trades.symbols
+    ]
+    await asyncio.gather(*tasks, display_loop(book))
+
+
+if __name__ == "__main__":
+    loop_backend.run(main())
@@ -0,0 +1,284 @@
+'''
+asyncio version of nice_funcs. everything goes through one pooled aiohttp
+session and independent requests (account state, open orders, the book)
+are fired concurrently instead of one after another.
+
+nothing in here calls asyncio.run, so the client can live on the same loop
+as the data-streams monitors:
+
+    async with AsyncHyperliquid(account) as hl:
+        state, orders, book = await hl.snapshot('ETH')
+'''
+
+import asyncio
+import time
+
+import aiohttp
+from hyperliquid.utils import constants
+from hyperliquid.utils.signing import (
+    order_request_to_order_wire,
+    order_wires_to_order_action,
+    sign_l1_action,
+)
+
+from meta_cache import AssetMetaCache
+
+POOL_SIZE = 20
+REQUEST_TIMEOUT = 10  # seconds
+KILL_SWITCH_POLL = 5  # seconds between close attempts
+
+
+def position_from_state(user_state, symbol):
+    '''
+    pulls the position for symbol out of a user_state response, returns
+    the same tuple as nice_funcs.get_position
+    '''
+    positions = []
+
+    for position in user_state["assetPositions"]:
+        if (position["position"]["coin"] == symbol) and float(position["position"]["szi"]) != 0:
+            positions.append(position["position"])
+            in_pos = True
+            size = float(position["position"]["szi"])
+            pos_sym = position["position"]["coin"]
+            entry_px = float(position["position"]["entryPx"])
+            pnl_perc = float(position["position"]["returnOnEquity"])*100
+            break
+    else:
+        in_pos = False
+        size = 0
+        pos_sym = None
+        entry_px = 0
+        pnl_perc = 0
+
+    if size > 0:
+        long = True
+    elif size < 0:
+        long = False
+    else:
+        long = None
+
+    return positions, in_pos, size, pos_sym, entry_px, pnl_perc, long
+
+
+class AsyncHyperliquid:
+    def __init__(self, account=None, base_url=constants.MAINNET_API_URL, meta_cache=None,
+                 pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT, book_cache=None):
+        self.account = account
+        self.base_url = base_url
+        self.meta_cache = meta_cache or AssetMetaCache(base_url)
+        self.book_cache = book_cache
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+        self._last_nonce = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Content-Type': 'application/json'},
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @property
+    def address(self):
+        return self.account.address
+
+    async def _post(self, path, payload):
+        if self.session is None:
+            await self.start()
+
+        async with self.session.post(f'{self.base_url}{path}', json=payload) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def info(self, payload):
+        return await self._post('/info', payload)
+
+    def _next_nonce(self):
+        # nonces have to be unique, concurrent actions can land in the same ms
+        nonce = max(int(time.time() * 1000), self._last_nonce + 1)
+        self._last_nonce = nonce
+        return nonce
+
+    async def post_action(self, action):
+        '''signs an l1 action with the account key and posts it to /exchange'''
+        nonce = self._next_nonce()
+        is_mainnet = self.base_url == constants.MAINNET_API_URL
+        signature = sign_l1_action(self.account, action, None, nonce, None, is_mainnet)
+
+        return await self._post('/exchange', {
+            'action': action,
+            'nonce': nonce,
+            'signature': signature,
+            'vaultAddress': None,
+        })
+
+    # ---- market data / account state ----
+
+    async def ensure_meta(self):
+        if not self.meta_cache.assets or self.meta_cache.is_stale():
+            self.meta_cache.load(await self.info({'type': 'meta'}))
+        return self.meta_cache
+
+    async def l2_book(self, symbol):
+        return await self.info({'type': 'l2Book', 'coin': symbol})
+
+    async def ask_bid(self, symbol):
+        '''this gets the ask and bid for any symbol passed in, from the book cache when it's fresh'''
+        if self.book_cache is not None:
+            book = self.book_cache.fresh_book(symbol)
+            if book is None:
+                book = self.book_cache.store_rest_book(symbol, await self.l2_book(symbol))
+            return book.best_ask, book.best_bid, book.levels
+
+        l2_data = (await self.l2_book(symbol))['levels']
+
+        bid = float(l2_data[0][0]['px'])
+        ask = float(l2_data[1][0]['px'])
+
+        return ask, bid, l2_data
+
+    async def user_state(self, address=None):
+        return await self.info({'type': 'clearinghouseState', 'user': address or self.address})
+
+    async def open_orders(self, address=None):
+        return await self.info({'type': 'openOrders', 'user': address or self.address})
+
+    async def acct_bal(self):
+        user_state = await self.user_state()
+        return user_state["marginSummary"]["accountValue"]
+
+    async def get_position(self, symbol):
+        return position_from_state(await self.user_state(), symbol)
+
+    async def snapshot(self, symbol):
+        '''account state, open orders and the book for symbol, all in flight at once'''
+        user_state, open_orders, book = await asyncio.gather(
+            self.user_state(),
+            self.open_orders(),
+            self.l2_book(symbol),
+        )
+        return user_state, open_orders, book
+
+    # ---- orders ----
+
+    async def bulk_orders(self, orders):
+        '''
+        orders are dicts shaped like the sdk OrderRequest
+        (coin, is_buy, sz, limit_px, order_type, reduce_only), all sent as one action
+        '''
+        meta = await self.ensure_meta()
+        wires = [self._order_wire(meta, order) for order in orders]
+
+        return await self.post_action(order_wires_to_order_action(wires))
+
+    def _order_wire(self, meta, order):
+        order = dict(order)
+        order['sz'] = meta.round_size(order['coin'], order['sz'])
+        order['limit_px'] = meta.round_price(order['coin'], order['limit_px'])
+        return order_request_to_order_wire(order, meta.asset_id(order['coin']))
+
+    async def bulk_modify(self, modifies):
+        '''
+        modifies is a list of (oid, order) with order shaped like in bulk_orders.
+        the orders are amended in place, one batchModify action for all of them
+        '''
+        if not modifies:
+            return None
+
+        meta = await self.ensure_meta()
+        action = {
+            'type': 'batchModify',
+            'modifies': [{'oid': oid, 'order': self._order_wire(meta, order)} for oid, order in modifies],
+        }
+        return await self.post_action(action)
+
+    async def limit_order(self, coin, is_buy, sz, limit_px, reduce_only):
+        return await self.bulk_orders([{
+            'coin': coin,
+            'is_buy': is_buy,
+            'sz': sz,
+            'limit_px': limit_px,
+            'order_type': {'limit': {'tif': 'Gtc'}},
+            'reduce_only': reduce_only,
+        }])
+
+    async def bulk_cancel(self, cancels):
+        '''cancels is a list of (coin, oid), all cancelled in one action'''
+        if not cancels:
+            return None
+
+        meta = await self.ensure_meta()
+        action = {
+            'type': 'cancel',
+            'cancels': [{'a': meta.asset_id(coin), 'o': oid} for coin, oid in cancels],
+        }
+        return await self.post_action(action)
+
+    async def cancel_all_orders(self, symbol=None):
+        open_orders = await self.open_orders()
+        cancels = [(o['coin'], o['oid']) for o in open_orders if symbol is None or o['coin'] == symbol]
+        return await self.bulk_cancel(cancels)
+
+    # ---- risk ----
+
+    async def kill_switch(self, symbol, poll_interval=KILL_SWITCH_POLL, tracker=None):
+        '''
+        with a PositionTracker the position is read from memory and the loop
+        wakes up on the next fill instead of sleeping out the full poll interval
+        '''
+        async def read_position():
+            if tracker is not None:
+                return tracker.get_position(symbol)
+            return await self.get_position(symbol)
+
+        position, im_in_pos, pos_size, pos_sym, entry_px, pnl_perc, long = await read_position()
+
+        while im_in_pos:
+            # cancelling and reading the book don't depend on each other
+            _, (ask, bid, l2) = await asyncio.gather(
+                self.cancel_all_orders(symbol),
+                self.ask_bid(symbol),
+            )
+
+            if long:
+                await self.limit_order(pos_sym, False, abs(pos_size), ask, True)
+                print('kill switch - SELL TO CLOSE SUBMITTED ')
+            else:
+                await self.limit_order(pos_sym, True, abs(pos_size), bid, True)
+                print('kill switch - BUY TO CLOSE SUBMITTED ')
+
+            if tracker is not None:
+                await tracker.wait_for_fill(timeout=poll_interval)
+            else:
+                await asyncio.sleep(poll_interval)
+            position, im_in_pos, pos_size, pos_sym, entry_px, pnl_perc, long = await read_position()
+
+        print('position succesfully closed in the kill switch')
+
+    async def pnl_close(self, symbol, target, max_loss):
+        position, im_in_pos, pos_size, pos_sym, entry_px, pnl_perc, long = await self.get_position(symbol)
+
+        if pnl_perc > target:
+            print(f'pnl gain is {pnl_perc} and target is {target}... closing position WIN')
+            await self.kill_switch(pos_sym)
+        elif pnl_perc <= max_loss:
+            print(f'pnl loss is {pnl_perc} and max loss is {max_loss}... closing position LOSS')
+            await self.kill_switch(pos_sym)
+        else:
+            print(f'pnl loss is {pnl_perc} and max loss is {max_loss} and target {target}... not closing position')
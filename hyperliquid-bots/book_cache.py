@@ -0,0 +1,164 @@
+'''
+local hyperliquid order books fed by the l2Book websocket subscription.
+hyperliquid pushes the whole (20 level) book on every update, so each
+message simply replaces the coin's Book. reads (best ask/bid, depth) come
+straight from memory; a book that hasn't updated within max_age, or has an
+empty side, is treated as stale and re-fetched over REST instead.
+
+async code passes the cache to AsyncHyperliquid(book_cache=...), sync
+scripts can run it on a background thread with start_in_thread() and hand
+it to nice_funcs.use_book_cache().
+'''
+
+import asyncio
+import json
+import threading
+import time
+
+import requests
+from hyperliquid.utils import constants
+
+from hl_ws import HyperliquidStream
+
+MAX_AGE = 2.0  # seconds before a book counts as stale
+
+
+class Book:
+    __slots__ = ('coin', 'time', 'levels', 'bids', 'asks', 'received')
+
+    def __init__(self, coin, exchange_time, levels):
+        self.coin = coin
+        self.time = exchange_time
+        self.levels = levels
+        self.bids = [(float(level['px']), float(level['sz'])) for level in levels[0]]
+        self.asks = [(float(level['px']), float(level['sz'])) for level in levels[1]]
+        self.received = time.monotonic()
+
+    @property
+    def best_bid(self):
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_ask(self):
+        return self.asks[0][0] if self.asks else None
+
+
+class L2BookCache:
+    def __init__(self, coins, stream=None, base_url=constants.MAINNET_API_URL, max_age=MAX_AGE):
+        self.coins = list(coins)
+        self.base_url = base_url
+        self.max_age = max_age
+        self._owns_stream = stream is None
+        self.stream = stream or HyperliquidStream(base_url)
+        self.books = {}
+        self.rest_fallbacks = 0
+        self.dropped_out_of_order = 0
+        self._thread = None
+
+    # ---- feed ----
+
+    def _on_book(self, data):
+        coin = data['coin']
+        current = self.books.get(coin)
+        if current is not None and data['time'] < current.time:
+            self.dropped_out_of_order += 1
+            return
+        # one assignment, readers on other threads see the old book or the new one
+        self.books[coin] = Book(coin, data['time'], data['levels'])
+
+    def _on_connect(self):
+        # nothing that arrived before the reconnect can be trusted as current
+        for book in self.books.values():
+            book.received = 0
+
+    def start(self):
+        self.stream.on_connect(self._on_connect)
+        for coin in self.coins:
+            self.add_coin(coin)
+
+    def add_coin(self, coin):
+        if coin not in self.coins:
+            self.coins.append(coin)
+        self.stream.subscribe({'type': 'l2Book', 'coin': coin}, self._on_book)
+
+    async def run(self):
+        self.start()
+        if self._owns_stream:
+            await self.stream.run()
+
+    def start_in_thread(self):
+        '''runs the feed on its own event loop in a daemon thread, for sync scripts'''
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+            self._thread.start()
+        return self
+
+    # ---- reads ----
+
+    def age(self, coin):
+        book = self.books.get(coin)
+        return time.monotonic() - book.received if book is not None else None
+
+    def is_stale(self, coin):
+        return self.fresh_book(coin) is None
+
+    def fresh_book(self, coin):
+        '''the cached book, or None when it is missing, stale or has an empty side'''
+        book = self.books.get(coin)
+        if book is None or not book.bids or not book.asks or time.monotonic() - book.received > self.max_age:
+            return None
+        return book
+
+    def store_rest_book(self, coin, l2_data):
+        '''
+        feeds a REST l2Book response in, so the fallback also warms the cache.
+        the response is what the book looks like right now, so it replaces the
+        cached one even when that has a later time or the response has none
+        '''
+        self.rest_fallbacks += 1
+        book = self.books[coin] = Book(coin, l2_data.get('time', 0), l2_data['levels'])
+        return book
+
+    def _fetch_rest(self, coin):
+        url = f'{self.base_url}/info'
+        headers = {'Content-Type': 'application/json'}
+        response = requests.post(url, headers=headers, data=json.dumps({'type': 'l2Book', 'coin': coin}), timeout=5)
+        response.raise_for_status()
+        return self.store_rest_book(coin, response.json())
+
+    def get_book(self, coin):
+        book = self.fresh_book(coin)
+        if book is None:
+            book = self._fetch_rest(coin)
+        return book
+
+    def ask_bid(self, coin):
+        '''same return as nice_funcs.ask_bid, from memory unless the book is stale'''
+        book = self.get_book(coin)
+        return book.best_ask, book.best_bid, book.levels
+
+    def depth(self, coin, side, levels=None, within_bps=None):
+        '''
+        cumulative (size, notional) on one side ('bid' or 'ask'), over the top
+        levels and/or everything within within_bps of the touch
+        '''
+        book = self.get_book(coin)
+        book_side = book.bids if side == 'bid' else book.asks
+        if levels is not None:
+            book_side = book_side[:levels]
+
+        size = notional = 0.0
+        if not book_side:
+            return size, notional
+
+        if within_bps is not None:
+            touch = book_side[0][0]
+            limit = touch * (1 - within_bps / 10000) if side == 'bid' else touch * (1 + within_bps / 10000)
+
+        for px, sz in book_side:
+            if within_bps is not None and (px < limit if side == 'bid' else px > limit):
+                break
+            size += sz
+            notional += px * sz
+
+        return size, notional
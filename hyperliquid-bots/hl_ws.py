@@ -0,0 +1,128 @@
+'''
+one hyperliquid websocket connection shared by everything that wants a feed.
+subscriptions are registered with a callback per channel and re-sent after
+every reconnect, same backoff idea as the data-streams WebSocketManager.
+'''
+
+import asyncio
+import json
+import random
+
+from hyperliquid.utils import constants
+from websockets import connect
+
+PING_INTERVAL = 50  # hyperliquid drops connections that are silent for 60s
+RECV_TIMEOUT = 60
+BASE_RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+
+# subscription type -> channel name on the messages that come back
+CHANNELS = {
+    'userEvents': 'user',
+}
+
+
+def ws_url(base_url=constants.MAINNET_API_URL):
+    return base_url.replace('https://', 'wss://').replace('http://', 'ws://') + '/ws'
+
+
+class HyperliquidStream:
+    def __init__(self, base_url=constants.MAINNET_API_URL):
+        self.uri = ws_url(base_url)
+        self.subscriptions = []
+        self.handlers = {}
+        self.connect_handlers = []
+        self.websocket = None
+        self.is_connected = False
+        self.should_stop = False
+        self.reconnect_attempts = 0
+
+    def subscribe(self, subscription, callback):
+        '''
+        subscription is the hyperliquid subscription dict, e.g. {'type': 'l2Book', 'coin': 'ETH'}.
+        callback(data) gets the data part of every message on that channel, it can be sync or async
+        '''
+        channel = CHANNELS.get(subscription['type'], subscription['type'])
+        if subscription not in self.subscriptions:
+            self.subscriptions.append(subscription)
+            if self.is_connected:
+                asyncio.ensure_future(self._send_subscribe(subscription))
+
+        self.handlers.setdefault(channel, [])
+        if callback not in self.handlers[channel]:
+            self.handlers[channel].append(callback)
+
+    def on_connect(self, callback):
+        '''callback() runs after every (re)connect, before any messages are dispatched'''
+        self.connect_handlers.append(callback)
+
+    async def _send_subscribe(self, subscription):
+        try:
+            await self.websocket.send(json.dumps({'method': 'subscribe', 'subscription': subscription}))
+        except Exception as e:
+            print(f'Failed to subscribe to {subscription}: {e}')
+
+    async def _call(self, callback, *args):
+        try:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            print(f'Error in hyperliquid stream handler: {e}')
+
+    async def _dispatch(self, message):
+        msg = json.loads(message)
+        channel = msg.get('channel')
+        for callback in self.handlers.get(channel, ()):
+            await self._call(callback, msg.get('data'))
+
+    async def _keepalive(self):
+        while self.is_connected:
+            await asyncio.sleep(PING_INTERVAL)
+            try:
+                await self.websocket.send(json.dumps({'method': 'ping'}))
+            except Exception:
+                return
+
+    def calculate_reconnect_delay(self):
+        delay = min(BASE_RECONNECT_DELAY * (2 ** self.reconnect_attempts), MAX_RECONNECT_DELAY)
+        return max(0.5, delay + delay * 0.2 * (random.random() - 0.5))
+
+    async def run(self):
+        while not self.should_stop:
+            keepalive = None
+            try:
+                async with connect(self.uri, max_size=None, compression=None) as websocket:
+                    self.websocket = websocket
+                    self.is_connected = True
+                    self.reconnect_attempts = 0
+                    print(f'Connected to hyperliquid stream {self.uri}')
+
+                    for subscription in self.subscriptions:
+                        await self._send_subscribe(subscription)
+                    for callback in self.connect_handlers:
+                        await self._call(callback)
+
+                    keepalive = asyncio.create_task(self._keepalive())
+                    while not self.should_stop:
+                        message = await asyncio.wait_for(websocket.recv(), timeout=RECV_TIMEOUT)
+                        await self._dispatch(message)
+
+            except asyncio.TimeoutError:
+                print('Timeout on hyperliquid stream, reconnecting...')
+            except Exception as e:
+                print(f'Hyperliquid stream error: {e}')
+            finally:
+                self.is_connected = False
+                self.websocket = None
+                if keepalive:
+                    keepalive.cancel()
+
+            if not self.should_stop:
+                self.reconnect_attempts += 1
+                delay = self.calculate_reconnect_delay()
+                print(f'Reconnecting to hyperliquid stream in {delay:.1f} seconds (attempt {self.reconnect_attempts})')
+                await asyncio.sleep(delay)
+
+    def stop(self):
+        self.should_stop = True
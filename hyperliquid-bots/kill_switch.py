@@ -0,0 +1,180 @@
+'''
+multi-symbol kill switch. every open order is cancelled in one batched
+action while the books are read, then every position gets its reduce-only
+closing order in one batched order action. whatever is still open after
+that is repriced in place with batchModify (no cancel-and-replace) until
+the account is flat. each run reports its time-to-flat.
+
+    python kill_switch.py          # flatten everything on the .env account
+'''
+
+import asyncio
+import os
+import time
+
+import eth_account
+from dotenv import load_dotenv
+
+from async_funcs import AsyncHyperliquid
+
+REPRICE_INTERVAL = 0.25  # seconds between reprice rounds
+MAX_ROUNDS = 40
+CROSS_BPS = 10  # closing orders go this far through the touch so they fill right away
+
+
+def order_statuses(response):
+    try:
+        return response['response']['data']['statuses']
+    except (KeyError, TypeError):
+        return []
+
+
+class KillSwitch:
+    def __init__(self, client, tracker=None, reprice_interval=REPRICE_INTERVAL,
+                 max_rounds=MAX_ROUNDS, cross_bps=CROSS_BPS):
+        self.client = client
+        self.tracker = tracker
+        self.reprice_interval = reprice_interval
+        self.max_rounds = max_rounds
+        self.cross_bps = cross_bps
+        self.last_report = None
+
+    async def _positions(self, symbols=None):
+        '''{coin: szi} for every open position, from the tracker when there is one'''
+        if self.tracker is not None:
+            positions = {coin: self.tracker.positions[coin].szi for coin in self.tracker.open_symbols()}
+        else:
+            user_state = await self.client.user_state()
+            positions = {}
+            for item in user_state['assetPositions']:
+                szi = float(item['position']['szi'])
+                if szi != 0:
+                    positions[item['position']['coin']] = szi
+
+        if symbols is not None:
+            positions = {coin: szi for coin, szi in positions.items() if coin in symbols}
+        return positions
+
+    async def _prices(self, coins):
+        books = await asyncio.gather(*(self.client.ask_bid(coin) for coin in coins), return_exceptions=True)
+        prices = {}
+        for coin, book in zip(coins, books):
+            if isinstance(book, Exception):
+                print(f'kill switch - could not read {coin} book: {book}')
+                continue
+            ask, bid, _ = book
+            prices[coin] = (ask, bid)
+        return prices
+
+    def _close_order(self, coin, szi, ask, bid):
+        is_buy = szi < 0
+        if is_buy:
+            limit_px = ask * (1 + self.cross_bps / 10000)
+        else:
+            limit_px = bid * (1 - self.cross_bps / 10000)
+
+        return {
+            'coin': coin,
+            'is_buy': is_buy,
+            'sz': abs(szi),
+            'limit_px': limit_px,
+            'order_type': {'limit': {'tif': 'Gtc'}},
+            'reduce_only': True,
+        }
+
+    def _track_resting(self, resting, coins, response):
+        for coin, status in zip(coins, order_statuses(response)):
+            if 'resting' in status:
+                resting[coin] = status['resting']['oid']
+            else:
+                # filled or rejected, either way there's nothing left to modify
+                resting.pop(coin, None)
+                if 'error' in status:
+                    print(f'kill switch - {coin} order error: {status["error"]}')
+
+    async def flatten_all(self, symbols=None):
+        '''closes every position (or just symbols) and returns the time-to-flat report'''
+        start = time.perf_counter()
+
+        def elapsed_ms():
+            return (time.perf_counter() - start) * 1000
+
+        open_orders, positions = await asyncio.gather(self.client.open_orders(), self._positions(symbols))
+        cancels = [(o['coin'], o['oid']) for o in open_orders if symbols is None or o['coin'] in symbols]
+        targets = list(positions)
+
+        report = {
+            'symbols': len(targets),
+            'cancelled': len(cancels),
+            'rounds': 0,
+            'cancel_ms': None,
+            'submit_ms': None,
+            'time_to_flat_ms': None,
+            'flat_ms': {},
+            'flat': False,
+        }
+
+        # cancels and book reads don't depend on each other
+        _, prices = await asyncio.gather(self.client.bulk_cancel(cancels), self._prices(targets))
+        report['cancel_ms'] = elapsed_ms()
+
+        resting = {}
+        while positions and report['rounds'] < self.max_rounds:
+            modifies, new_orders, new_coins, modify_coins = [], [], [], []
+            for coin, szi in positions.items():
+                if coin not in prices:
+                    continue
+                order = self._close_order(coin, szi, *prices[coin])
+                if coin in resting:
+                    modifies.append((resting[coin], order))
+                    modify_coins.append(coin)
+                else:
+                    new_orders.append(order)
+                    new_coins.append(coin)
+
+            order_response, modify_response = await asyncio.gather(
+                self.client.bulk_orders(new_orders) if new_orders else asyncio.sleep(0),
+                self.client.bulk_modify(modifies),
+            )
+            self._track_resting(resting, new_coins, order_response)
+            self._track_resting(resting, modify_coins, modify_response)
+            if report['submit_ms'] is None:
+                report['submit_ms'] = elapsed_ms()
+
+            if self.tracker is not None:
+                await self.tracker.wait_for_fill(timeout=self.reprice_interval)
+            else:
+                await asyncio.sleep(self.reprice_interval)
+
+            positions = await self._positions(targets)
+            for coin in targets:
+                if coin not in positions and coin not in report['flat_ms']:
+                    report['flat_ms'][coin] = elapsed_ms()
+
+            report['rounds'] += 1
+            if positions:
+                prices = await self._prices(list(positions))
+
+        report['flat'] = not positions
+        report['time_to_flat_ms'] = elapsed_ms()
+        self.last_report = report
+
+        if report['flat']:
+            print(f"kill switch - flat on {report['symbols']} symbols in {report['time_to_flat_ms']:.0f}ms "
+                  f"({report['cancelled']} orders cancelled, {report['rounds']} rounds)")
+        else:
+            print(f"kill switch - still open after {report['rounds']} rounds: {list(positions)}")
+
+        return report
+
+
+async def main():
+    load_dotenv()
+    account = eth_account.Account.from_key(os.getenv("PH_SECRET_KEY"))
+
+    async with AsyncHyperliquid(account) as client:
+        await KillSwitch(client).flatten_all()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+'''
+cached hyperliquid asset metadata. the meta universe is downloaded once,
+indexed by coin name and refreshed in the background when the ttl runs out,
+so placing an order never has to wait on a metadata request.
+'''
+
+import json
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from hyperliquid.utils import constants
+
+# perps allow at most 6 decimals (minus szDecimals) and 5 significant figures
+MAX_PX_DECIMALS = 6
+MAX_SIG_FIGS = 5
+DEFAULT_TTL = 300  # seconds
+
+AssetMeta = namedtuple('AssetMeta', ['name', 'asset', 'sz_decimals', 'px_decimals', 'max_leverage'])
+
+
+class AssetMetaCache:
+    def __init__(self, base_url=constants.MAINNET_API_URL, ttl=DEFAULT_TTL):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.meta = None
+        self.assets = {}
+        self.loaded_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def _fetch_meta(self):
+        url = f'{self.base_url}/info'
+        headers = {'Content-Type': 'application/json'}
+        response = requests.post(url, headers=headers, data=json.dumps({'type': 'meta'}), timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def refresh(self):
+        '''downloads the meta universe and rebuilds the coin index'''
+        return self.load(self._fetch_meta())
+
+    def load(self, meta):
+        '''indexes an already fetched meta response, used by the async client'''
+        assets = {}
+        for asset, info in enumerate(meta['universe']):
+            sz_decimals = info['szDecimals']
+            assets[info['name']] = AssetMeta(
+                name=info['name'],
+                asset=asset,
+                sz_decimals=sz_decimals,
+                px_decimals=max(MAX_PX_DECIMALS - sz_decimals, 0),
+                max_leverage=info.get('maxLeverage'),
+            )
+
+        with self._lock:
+            self.meta = meta
+            self.assets = assets
+            self.loaded_at = time.time()
+
+        return assets
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f'Error refreshing asset meta: {e}')
+        finally:
+            self._refreshing = False
+
+    def is_stale(self):
+        return time.time() - self.loaded_at > self.ttl
+
+    def ensure_loaded(self):
+        '''blocks on the first load, after that stale data is served while a refresh runs'''
+        if not self.assets:
+            self.refresh()
+            return
+
+        if self.is_stale() and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def get(self, coin):
+        self.ensure_loaded()
+        asset_meta = self.assets.get(coin)
+        if asset_meta is None:
+            raise KeyError(f'{coin} not found in hyperliquid meta')
+        return asset_meta
+
+    def sz_decimals(self, coin):
+        return self.get(coin).sz_decimals
+
+    def px_decimals(self, coin):
+        return self.get(coin).px_decimals
+
+    def asset_id(self, coin):
+        return self.get(coin).asset
+
+    def round_size(self, coin, sz):
+        return round(sz, self.get(coin).sz_decimals)
+
+    def round_price(self, coin, px):
+        '''
+        rounds to 5 significant figures and at most 6 - szDecimals decimals.
+        integer prices are always valid so anything >= 100k is just rounded to an int
+        '''
+        asset_meta = self.get(coin)
+        if abs(px) >= 10 ** MAX_SIG_FIGS:
+            return float(round(px))
+        return round(float(f'{px:.{MAX_SIG_FIGS}g}'), asset_meta.px_decimals)
@@ -1,6 +1,7 @@
 import nice_funcs as n 
 from eth_account.signers.local import LocalAccount
 import eth_account 
+import asyncio 
 import json 
 import time 
 from hyperliquid.info import Info 
@@ -11,12 +12,32 @@ import pandas as pd
 import datetime 
 import schedule 
 import requests 
+from meta_cache import AssetMetaCache
 
 symbol='ETH'
 
+meta_cache = AssetMetaCache()
+_exchanges = {}
+
+book_cache = None
+
+def use_book_cache(coins):
+    '''
+    starts a websocket fed book cache for coins on a background thread,
+    ask_bid reads from it from then on (and falls back to REST when it's stale)
+    '''
+    global book_cache
+    from book_cache import L2BookCache
+
+    book_cache = L2BookCache(coins).start_in_thread()
+    return book_cache
+
 def ask_bid(symbol):
     '''this gets the ask and bid for any symbol passed in'''
 
+    if book_cache is not None:
+        return book_cache.ask_bid(symbol)
+
     url = 'https://api.hyperliquid.xyz/info'
     headers = {'Content-Type': 'application/json'}
 
@@ -37,46 +58,36 @@ def ask_bid(symbol):
 
 def get_sz_px_decimals(coin):
 
-    ''' this returns size devimals and price decimals '''
+    ''' this returns size decimals and price decimals from the cached meta '''
 
-    url = 'https://api.hyperliquid.xyz/info'
-    headers = {'Content-Type': 'application/json'}
-    data = {'type': 'meta'}
+    asset_meta = meta_cache.get(coin)
 
-    response = requests.post(url, headers=headers, data=json.dumps(data))
+    return asset_meta.sz_decimals, asset_meta.px_decimals
 
-    if response.status_code == 200:
-        data = response.json()
-        symbols = data['universe']
-        symbol_info = next((s for s in symbols if s['name'] == symbol), None)
-        if symbol_info:
-            sz_decimals = symbol_info['szDecimals']
 
-        else:
-            print('symbol not found')
+def get_exchange(account):
 
-    else:
-        print('Error:', response.status_code)
+    ''' one Exchange per account, built from the cached meta so it only pays the setup once '''
 
-    
-    ask = ask_bid(symbol)[0]
+    meta_cache.ensure_loaded()
+    exchange, loaded_at = _exchanges.get(account.address, (None, 0))
 
-    ask_str = str(ask)
-    if '.' in ask_str:
-        px_decimals = len(ask_str.split('.')[1])
-    else:
-        px_decimals = 0 
+    if exchange is None:
+        exchange = Exchange(account, constants.MAINNET_API_URL, meta=meta_cache.meta)
+    elif loaded_at != meta_cache.loaded_at:
+        # the meta was refreshed since, pick up any new listings
+        exchange.info.set_perp_meta(meta_cache.meta, 0)
 
-    print(f'{symbol} this is the price {sz_decimals} decimals')
+    _exchanges[account.address] = (exchange, meta_cache.loaded_at)
 
-    return sz_decimals, px_decimals
+    return exchange
 
 
 # MAKE A BUY AND A SELL ORDER
 def limit_order(coin, is_buy, sz, limit_px, reduce_only, account):
-    exchange = Exchange(account, constants.MAINNET_API_URL)
-    rounding = get_sz_px_decimals(coin)[0]
-    sz = round(sz, rounding)
+    exchange = get_exchange(account)
+    sz = meta_cache.round_size(coin, sz)
+    limit_px = meta_cache.round_price(coin, limit_px)
     print(f'coin: {coin}, type: {type(coin)}')
     print(f'is_buy: {is_buy}, type: {type(coin)}')
     print(f'sz: {sz}, type: {type(limit_px)}')
@@ -149,17 +160,15 @@ def get_position(symbol, account):
 
 def cancel_all_orders(account):
 
-    # this cancels all open orders
-    #account = LocalAccount = eth_account.Account.from_key(key)
-    exchange = Exchange(account, constants.MAINNET_API_URL)
+    # this cancels all open orders in one batched cancel action
+    exchange = get_exchange(account)
     info = Info(constants.MAINNET_API_URL, skip_ws=True)
 
     open_orders = info.open_orders(account.address)
 
     print('above are the open orders... need to cancel any...')
-    for open_order in open_orders:
-        #print(f'cancelling order {open_order}')
-        exchange.cancel(open_order['coin'], open_order['oid'])
+    if open_orders:
+        exchange.bulk_cancel([{'coin': o['coin'], 'oid': o['oid']} for o in open_orders])
 
 
 def kill_switch(symbol, account):
@@ -188,6 +197,22 @@ def kill_switch(symbol, account):
     print('position succesfully closed in the kill switch')
 
 
+def kill_switch_all(account):
+
+    '''
+    flattens every position on the account at once, see kill_switch.py
+    '''
+
+    from kill_switch import KillSwitch
+    from async_funcs import AsyncHyperliquid
+
+    async def flatten():
+        async with AsyncHyperliquid(account, meta_cache=meta_cache) as client:
+            return await KillSwitch(client).flatten_all()
+
+    return asyncio.run(flatten())
+
+
 def pnl_close(symbol, target, max_loss, account):
 
     '''
@@ -0,0 +1,287 @@
+'''
+in-memory positions and pnl fed by the hyperliquid userFills / userEvents
+channels and the allMids price feed (userEvents only on a stream of its own,
+its messages carry no user). one REST user_state seeds the state
+(and periodically re-syncs it), after that every fill and every mid price
+update the numbers directly, so pnl_close / acct_min checks can run the
+moment something changes instead of on the next poll.
+'''
+
+import asyncio
+import time
+from collections import deque
+
+from async_funcs import AsyncHyperliquid
+from hl_ws import HyperliquidStream
+
+RESYNC_INTERVAL = 60  # seconds, catches anything the stream doesn't carry
+MAX_SEEN_FILLS = 5000
+MAX_SZ_DECIMALS = 8  # sizes are rounded to this until the coin's szDecimals is known
+
+
+class Position:
+    __slots__ = ('coin', 'szi', 'entry_px', 'leverage', 'mark_px', 'sz_decimals')
+
+    def __init__(self, coin, szi=0.0, entry_px=0.0, leverage=1.0, mark_px=0.0, sz_decimals=MAX_SZ_DECIMALS):
+        self.coin = coin
+        self.szi = szi
+        self.entry_px = entry_px
+        self.leverage = leverage
+        self.mark_px = mark_px or entry_px
+        self.sz_decimals = sz_decimals
+
+    @property
+    def unrealized_pnl(self):
+        return self.szi * (self.mark_px - self.entry_px)
+
+    @property
+    def margin_used(self):
+        return abs(self.szi) * self.entry_px / self.leverage
+
+    @property
+    def pnl_perc(self):
+        # same number as returnOnEquity*100 in user_state
+        margin = self.margin_used
+        return self.unrealized_pnl / margin * 100 if margin else 0
+
+    def apply_fill(self, is_buy, sz, px):
+        signed = sz if is_buy else -sz
+        # sizes are whole lots, rounding keeps 0.1 + 0.2 - 0.3 from leaving a 5e-17 position open
+        # (+ 0.0 turns a rounded -0.0 into 0.0)
+        new_szi = round(self.szi + signed, self.sz_decimals) + 0.0
+
+        if self.szi == 0 or (self.szi > 0) == (signed > 0):
+            # opening or adding, entry is the size weighted average
+            self.entry_px = (self.entry_px * abs(self.szi) + px * sz) / abs(new_szi)
+        elif new_szi != 0 and (new_szi > 0) != (self.szi > 0):
+            # flipped through zero, the remainder was opened at this fill
+            self.entry_px = px
+        # reducing keeps the entry price
+
+        self.szi = new_szi
+        if self.szi == 0:
+            self.entry_px = 0.0
+
+
+class PositionTracker:
+    def __init__(self, account, client=None, stream=None, resync_interval=RESYNC_INTERVAL):
+        self.account = account
+        self.address = account.address
+        self.client = client or AsyncHyperliquid(account)
+        # a shared stream is run by whoever owns it
+        self._owns_stream = stream is None
+        self.stream = stream or HyperliquidStream(self.client.base_url)
+        self.resync_interval = resync_interval
+
+        self.positions = {}
+        self.mids = {}
+        # account value minus unrealized pnl, moves with realized pnl, fees and funding
+        self.cash = 0.0
+        self.last_update = 0
+        self.synced = False
+
+        self._seen_fills = set()
+        self._seen_order = deque()
+        self._listeners = []
+        self._position_changed = asyncio.Event()
+        self._watch_tasks = {}
+
+    # ---- state ----
+
+    @property
+    def account_value(self):
+        return self.cash + sum(p.unrealized_pnl for p in self.positions.values())
+
+    def acct_bal(self):
+        return self.account_value
+
+    def get_position(self, symbol):
+        '''same tuple as nice_funcs.get_position, read from memory'''
+        pos = self.positions.get(symbol)
+        if pos is None or pos.szi == 0:
+            return [], False, 0, None, 0, 0, None
+        return [pos], True, pos.szi, pos.coin, pos.entry_px, pos.pnl_perc, pos.szi > 0
+
+    def open_symbols(self):
+        return [coin for coin, pos in self.positions.items() if pos.szi != 0]
+
+    def _sz_decimals(self, coin):
+        '''szDecimals from the client's meta cache, never waits on a meta request'''
+        asset_meta = self.client.meta_cache.assets.get(coin)
+        return asset_meta.sz_decimals if asset_meta is not None else MAX_SZ_DECIMALS
+
+    async def resync(self):
+        '''rebuilds everything from one REST user_state'''
+        user_state = await self.client.user_state(self.address)
+
+        positions = {}
+        unrealized = 0.0
+        for item in user_state['assetPositions']:
+            p = item['position']
+            szi = float(p['szi'])
+            if szi == 0:
+                continue
+            entry_px = float(p['entryPx'])
+            mark_px = float(p['positionValue']) / abs(szi)
+            positions[p['coin']] = Position(p['coin'], szi, entry_px, float(p['leverage']['value']), mark_px,
+                                            self._sz_decimals(p['coin']))
+            unrealized += float(p['unrealizedPnl'])
+
+        self.positions = positions
+        self.cash = float(user_state['marginSummary']['accountValue']) - unrealized
+        self.synced = True
+        self._position_changed.set()
+        self._notify(None)
+
+    # ---- stream handlers ----
+
+    def _remember_fill(self, tid):
+        if tid in self._seen_fills:
+            return False
+        self._seen_fills.add(tid)
+        self._seen_order.append(tid)
+        if len(self._seen_order) > MAX_SEEN_FILLS:
+            self._seen_fills.discard(self._seen_order.popleft())
+        return True
+
+    def _apply_fill(self, fill):
+        # userFills and userEvents both carry fills, only count each once
+        if not self._remember_fill(fill['tid']):
+            return
+
+        coin = fill['coin']
+        sz = float(fill['sz'])
+        px = float(fill['px'])
+        pos = self.positions.get(coin)
+        if pos is None:
+            pos = self.positions[coin] = Position(coin, mark_px=self.mids.get(coin, px),
+                                                  sz_decimals=self._sz_decimals(coin))
+
+        pos.apply_fill(fill['side'] == 'B', sz, px)
+        self.cash += float(fill.get('closedPnl', 0)) - float(fill.get('fee', 0))
+        self._position_changed.set()
+        self._notify(coin)
+
+    def _on_user_fills(self, data):
+        # a shared stream carries every account's fills on the same channel
+        if data.get('user', self.address).lower() != self.address.lower():
+            return
+        # the first message is a snapshot of history that resync already covers
+        if data.get('isSnapshot'):
+            for fill in data.get('fills', []):
+                self._remember_fill(fill['tid'])
+            return
+        for fill in data.get('fills', []):
+            self._apply_fill(fill)
+            if fill.get('liquidation'):
+                asyncio.ensure_future(self.resync())
+
+    def _on_user_events(self, data):
+        for fill in data.get('fills', []):
+            self._apply_fill(fill)
+        if 'funding' in data:
+            self.cash += float(data['funding'].get('usdc', 0))
+            self._notify(data['funding'].get('coin'))
+        if 'liquidation' in data:
+            # too many moving parts, just take the exchange's word for it
+            asyncio.ensure_future(self.resync())
+
+    def _on_mids(self, data):
+        changed = []
+        for coin, px in data['mids'].items():
+            px = float(px)
+            self.mids[coin] = px
+            pos = self.positions.get(coin)
+            if pos is not None and pos.mark_px != px:
+                pos.mark_px = px
+                changed.append(coin)
+        for coin in changed:
+            self._notify(coin)
+
+    # ---- listeners ----
+
+    def add_listener(self, callback):
+        '''callback(tracker, coin) after every fill / mark change, coin is None after a resync'''
+        self._listeners.append(callback)
+
+    def _notify(self, coin):
+        self.last_update = time.time()
+        for callback in self._listeners:
+            try:
+                result = callback(self, coin)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                print(f'Error in position listener: {e}')
+
+    async def wait_for_fill(self, timeout=None):
+        '''returns True once a fill or resync changed positions, False on timeout'''
+        self._position_changed.clear()
+        try:
+            await asyncio.wait_for(self._position_changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _fire(self, key, action):
+        # one action per key at a time, a closing position keeps ticking while we close it
+        task = self._watch_tasks.get(key)
+        if task is not None and not task.done():
+            return False
+        self._watch_tasks[key] = asyncio.ensure_future(action())
+        return True
+
+    def watch_pnl_close(self, symbol, target, max_loss, action):
+        '''
+        runs action() (a coroutine function, e.g. the kill switch) as soon as
+        pnl_perc on symbol goes over target or under max_loss
+        '''
+        def check(tracker, coin):
+            if coin not in (symbol, None):
+                return
+            _, in_pos, _, _, _, pnl_perc, _ = tracker.get_position(symbol)
+            if in_pos and (pnl_perc > target or pnl_perc <= max_loss):
+                if tracker._fire(('pnl', symbol), action):
+                    print(f'{symbol} pnl is {pnl_perc:.2f}% (target {target}, max loss {max_loss})... closing position')
+
+        self.add_listener(check)
+
+    def watch_acct_min(self, acct_min, action):
+        '''runs action() as soon as account value drops under acct_min'''
+        def check(tracker, coin):
+            if tracker.synced and tracker.account_value < acct_min:
+                if tracker._fire(('acct_min',), action):
+                    print(f'account value is {tracker.account_value:.2f} and closing because out low is {acct_min}')
+
+        self.add_listener(check)
+
+    # ---- run ----
+
+    async def _resync_loop(self):
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                await self.resync()
+            except Exception as e:
+                print(f'Error resyncing positions: {e}')
+
+    async def start(self):
+        '''subscribes to the streams and seeds state, the stream itself runs in run()'''
+        await self.client.ensure_meta()  # szDecimals, so fills round to whole lots
+        self.stream.subscribe({'type': 'userFills', 'user': self.address}, self._on_user_fills)
+        if self._owns_stream:
+            # userEvents messages don't say whose they are, on a shared stream they would land
+            # in every account's tracker. userFills plus the resync loop cover funding and liquidations
+            self.stream.subscribe({'type': 'userEvents', 'user': self.address}, self._on_user_events)
+        self.stream.subscribe({'type': 'allMids'}, self._on_mids)
+        self.stream.on_connect(self.resync)
+        if self.stream.is_connected:
+            # joined a shared stream that is already up, on_connect won't fire until the next reconnect
+            await self.resync()
+
+    async def run(self):
+        await self.start()
+        if self._owns_stream:
+            await asyncio.gather(self.stream.run(), self._resync_loop())
+        else:
+            await self._resync_loop()
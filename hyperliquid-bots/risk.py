@@ -1,6 +1,11 @@
 '''
 this file shows how to build a kill switch and pnl close
 for hyper liquid. use at your own risk. 
+
+python risk.py            runs the risk daemon (risk_daemon.py) with the settings below,
+                          or with risk_config.json next to this file if you made one
+                          (copy risk_config.example.json)
+python risk.py --once     runs bot() once and exits
 '''
 
 import nice_funcs as n 
@@ -16,7 +21,10 @@ import datetime
 import schedule 
 import requests 
 import os
+import sys
+import asyncio
 from dotenv import load_dotenv
+from risk_daemon import CONFIG_FILE, RiskDaemon, load_config
 
 load_dotenv()
 
@@ -57,8 +65,20 @@ def bot():
         print(f'account value is {acct_val} and closing because out low is {acct_min}')
         n.kill_switch(symbol, account)
 
-bot()
-
+def daemon_config():
 
+    ''' the settings above as a risk_daemon config, used when there is no risk_config.json next to risk.py '''
 
+    return {'accounts': [{
+        'name': 'main',
+        'key_env': 'PH_SECRET_KEY',
+        'acct_min': acct_min,
+        'symbols': {symbol: {'target': target, 'max_loss': max_loss}},
+    }]}
 
+if __name__ == "__main__":
+    if '--once' in sys.argv:
+        bot()
+    else:
+        config = load_config(CONFIG_FILE) if os.path.exists(CONFIG_FILE) else daemon_config()
+        asyncio.run(RiskDaemon(config).run())
@@ -0,0 +1,226 @@
+'''
+resident risk engine. instead of running risk.py's bot() once and exiting,
+this stays up with warm connections and re-checks pnl_close, the acct_min
+floor and the per-symbol limits on every fill and every price tick that
+touches a position, for every account in the config.
+
+config (json):
+
+    {
+        "accounts": [
+            {
+                "name": "main",
+                "key_env": "PH_SECRET_KEY",
+                "acct_min": 7,
+                "max_positions": 5,
+                "default": {"target": 4, "max_loss": -5},
+                "symbols": {"ETH": {"target": 4, "max_loss": -5, "max_position_usd": 1000}}
+            }
+        ]
+    }
+
+symbols without their own entry use "default", leave "default" out to
+only watch the listed symbols. copy risk_config.example.json to
+risk_config.json next to this file, it is not committed.
+
+flattens run one at a time per account: a per-coin close and an acct_min
+close of everything would otherwise cancel each other's closing orders.
+'''
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+import eth_account
+from dotenv import load_dotenv
+
+from async_funcs import AsyncHyperliquid
+from book_cache import L2BookCache
+from hl_ws import HyperliquidStream
+from kill_switch import KillSwitch
+from meta_cache import AssetMetaCache
+from position_tracker import PositionTracker
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'risk_config.json')
+STATS_INTERVAL = 60  # seconds between latency reports
+LATENCY_SAMPLES = 10000
+
+
+class LatencyStats:
+    def __init__(self, maxlen=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, micros):
+        self.samples.append(micros)
+        self.count += 1
+        if micros > self.max:
+            self.max = micros
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50_us': self.percentile(50),
+            'p99_us': self.percentile(99),
+            'max_us': self.max,
+        }
+
+
+class AccountRisk:
+    def __init__(self, config, stream, meta_cache, book_cache=None):
+        self.name = config.get('name', config['key_env'])
+        self.acct_min = config.get('acct_min')
+        self.max_positions = config.get('max_positions')
+        self.default_limits = config.get('default')
+        self.symbol_limits = config.get('symbols', {})
+
+        account = eth_account.Account.from_key(os.getenv(config['key_env']))
+        self.client = AsyncHyperliquid(account, meta_cache=meta_cache, book_cache=book_cache)
+        self.tracker = PositionTracker(account, self.client, stream)
+        self.kill = KillSwitch(self.client, self.tracker)
+        self.tracker.add_listener(self.evaluate)
+
+        self.stats = {name: LatencyStats() for name in ('pnl_close', 'acct_min', 'symbol_limits', 'max_positions')}
+        self.action_stats = LatencyStats()
+        self._actions = {}
+        self._flatten_lock = None  # made on the daemon's loop, the account is built before it runs
+        self._max_positions_warned = False
+
+    def limits_for(self, coin):
+        return self.symbol_limits.get(coin, self.default_limits)
+
+    def _fire(self, key, reason, symbols=None):
+        # a closing position keeps ticking, only one flatten per key at a time
+        task = self._actions.get(key)
+        if task is not None and not task.done():
+            return
+        print(f'[{self.name}] {reason}')
+        self._actions[key] = asyncio.ensure_future(self._flatten(symbols))
+
+    async def _flatten(self, symbols):
+        try:
+            # one flatten at a time, each one cancels the account's open orders on its coins
+            if self._flatten_lock is None:
+                self._flatten_lock = asyncio.Lock()
+            async with self._flatten_lock:
+                report = await self.kill.flatten_all(symbols)
+            self.action_stats.add(report['time_to_flat_ms'] * 1000)
+        except Exception as e:
+            print(f'[{self.name}] kill switch failed: {e}')
+
+    def _timed(self, name, check, *args):
+        start = time.perf_counter()
+        check(*args)
+        self.stats[name].add((time.perf_counter() - start) * 1e6)
+
+    def evaluate(self, tracker, coin):
+        '''runs on every tracker update, coin is None after a resync'''
+        coins = tracker.open_symbols() if coin is None else [coin]
+
+        for c in coins:
+            limits = self.limits_for(c)
+            if limits is None:
+                continue
+            self._timed('pnl_close', self.check_pnl_close, c, limits)
+            self._timed('symbol_limits', self.check_symbol_limits, c, limits)
+
+        if self.acct_min is not None:
+            self._timed('acct_min', self.check_acct_min)
+        if self.max_positions is not None:
+            self._timed('max_positions', self.check_max_positions)
+
+    def check_pnl_close(self, coin, limits):
+        _, in_pos, _, _, _, pnl_perc, _ = self.tracker.get_position(coin)
+        if not in_pos:
+            return
+        if pnl_perc > limits['target']:
+            self._fire(('close', coin), f'pnl gain is {pnl_perc:.2f} and target is {limits["target"]}... closing {coin} WIN', [coin])
+        elif pnl_perc <= limits['max_loss']:
+            self._fire(('close', coin), f'pnl loss is {pnl_perc:.2f} and max loss is {limits["max_loss"]}... closing {coin} LOSS', [coin])
+
+    def check_symbol_limits(self, coin, limits):
+        max_usd = limits.get('max_position_usd')
+        pos = self.tracker.positions.get(coin)
+        if max_usd is None or pos is None:
+            return
+        notional = abs(pos.szi) * pos.mark_px
+        if notional > max_usd:
+            self._fire(('close', coin), f'{coin} position is ${notional:,.0f} and the limit is ${max_usd:,.0f}... closing', [coin])
+
+    def check_acct_min(self):
+        if not self.tracker.synced:
+            return
+        acct_val = self.tracker.account_value
+        if acct_val < self.acct_min and self.tracker.open_symbols():
+            self._fire(('all',), f'account value is {acct_val:.2f} and closing because out low is {self.acct_min}')
+
+    def check_max_positions(self):
+        open_count = len(self.tracker.open_symbols())
+        if open_count > self.max_positions:
+            if not self._max_positions_warned:
+                print(f'[{self.name}] {open_count} positions open, max is {self.max_positions}')
+                self._max_positions_warned = True
+        else:
+            self._max_positions_warned = False
+
+    def latency_report(self):
+        report = {name: stats.summary() for name, stats in self.stats.items()}
+        report['time_to_flat'] = self.action_stats.summary()
+        return report
+
+
+class RiskDaemon:
+    def __init__(self, config):
+        # one connection, one meta cache and one set of books for every account, allMids is shared
+        self.stream = HyperliquidStream()
+        self.meta_cache = AssetMetaCache()
+        coins = sorted({coin for cfg in config['accounts'] for coin in cfg.get('symbols', {})})
+        self.book_cache = L2BookCache(coins, stream=self.stream)
+        self.accounts = [AccountRisk(cfg, self.stream, self.meta_cache, self.book_cache) for cfg in config['accounts']]
+
+    def latency_report(self):
+        return {acct.name: acct.latency_report() for acct in self.accounts}
+
+    async def _stats_loop(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            for name, report in self.latency_report().items():
+                for check, s in report.items():
+                    if s['count']:
+                        print(f"[{name}] {check}: {s['count']} checks, p50 {s['p50_us']:.0f}us, "
+                              f"p99 {s['p99_us']:.0f}us, max {s['max_us']:.0f}us")
+
+    async def run(self):
+        print(f'risk daemon watching {len(self.accounts)} account(s)')
+        self.book_cache.start()
+        try:
+            await asyncio.gather(
+                self.stream.run(),
+                self._stats_loop(),
+                *(acct.tracker.run() for acct in self.accounts),
+            )
+        finally:
+            for acct in self.accounts:
+                await acct.client.close()
+
+
+def load_config(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import sys
+
+    load_dotenv()
+    config_path = sys.argv[1] if len(sys.argv) > 1 else CONFIG_FILE
+    asyncio.run(RiskDaemon(load_config(config_path)).run())
@@ -0,0 +1,47 @@
+'''
+the REST fallback: a book with an empty side or a stale one gets re-fetched,
+and the fetched book is what gets served afterwards.
+'''
+
+from book_cache import L2BookCache
+
+
+class FakeStream:
+    def on_connect(self, callback):
+        pass
+
+    def subscribe(self, subscription, callback):
+        pass
+
+
+def levels(bids, asks):
+    return [[{'px': str(px), 'sz': '1', 'n': 1} for px in bids],
+            [{'px': str(px), 'sz': '1', 'n': 1} for px in asks]]
+
+
+def cache_with_rest(rest_book):
+    cache = L2BookCache(['ETH'], stream=FakeStream())
+    cache._fetch_rest = lambda coin: cache.store_rest_book(coin, rest_book)
+    return cache
+
+
+def test_empty_side_falls_back_to_rest():
+    cache = cache_with_rest({'coin': 'ETH', 'time': 2000, 'levels': levels([2999.0], [3001.0])})
+    cache._on_book({'coin': 'ETH', 'time': 1000, 'levels': levels([2999.5], [])})
+
+    assert cache.is_stale('ETH')
+    ask, bid, _ = cache.ask_bid('ETH')
+    assert (ask, bid) == (3001.0, 2999.0)
+    assert cache.rest_fallbacks == 1
+
+
+def test_rest_book_replaces_stale_book_without_time():
+    cache = cache_with_rest({'levels': levels([2900.0], [2901.0])})
+    cache._on_book({'coin': 'ETH', 'time': 1000, 'levels': levels([3000.0], [3001.0])})
+    cache._on_connect()  # reconnect, the cached book can't be trusted
+
+    ask, bid, _ = cache.ask_bid('ETH')
+    assert (ask, bid) == (2901.0, 2900.0)
+    # the fetched book is fresh now, no second REST call
+    assert cache.ask_bid('ETH')[:2] == (2901.0, 2900.0)
+    assert cache.rest_fallbacks == 1
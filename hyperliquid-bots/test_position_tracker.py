@@ -0,0 +1,112 @@
+'''
+two accounts on one shared HyperliquidStream, fills interleaved on the
+userFills channel, each tracker should only book its own.
+'''
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from hl_ws import HyperliquidStream
+from meta_cache import AssetMetaCache
+from position_tracker import PositionTracker
+
+ADDRESS_A = '0xAAAA000000000000000000000000000000000001'
+ADDRESS_B = '0xbbbb000000000000000000000000000000000002'
+
+
+class FakeClient:
+    base_url = 'https://api.hyperliquid.xyz'
+
+    def __init__(self, account_value):
+        self.account_value = account_value
+        self.resyncs = 0
+        self.meta_cache = AssetMetaCache(self.base_url)
+
+    async def ensure_meta(self):
+        self.meta_cache.load({'universe': [{'name': 'ETH', 'szDecimals': 4}, {'name': 'BTC', 'szDecimals': 5}]})
+        return self.meta_cache
+
+    async def user_state(self, address):
+        self.resyncs += 1
+        return {'assetPositions': [], 'marginSummary': {'accountValue': str(self.account_value)}}
+
+
+def fill(tid, coin, side, sz, px, closed_pnl=0, fee=0):
+    return {'tid': tid, 'coin': coin, 'side': side, 'sz': str(sz), 'px': str(px),
+            'closedPnl': str(closed_pnl), 'fee': str(fee)}
+
+
+def message(channel, data):
+    return json.dumps({'channel': channel, 'data': data})
+
+
+async def setup():
+    stream = HyperliquidStream()
+    trackers = {}
+    for address, value in ((ADDRESS_A, 1000), (ADDRESS_B, 500)):
+        tracker = PositionTracker(SimpleNamespace(address=address), client=FakeClient(value), stream=stream)
+        await tracker.start()
+        await tracker.resync()
+        trackers[address] = tracker
+    return stream, trackers[ADDRESS_A], trackers[ADDRESS_B]
+
+
+def test_interleaved_fills_stay_with_their_account():
+    async def run():
+        stream, a, b = await setup()
+        # address casing differs between the subscription and the exchange's messages
+        await stream._dispatch(message('userFills', {'user': ADDRESS_A.lower(), 'fills': [fill(1, 'ETH', 'B', 2, 3000, fee=1)]}))
+        await stream._dispatch(message('userFills', {'user': ADDRESS_B, 'fills': [fill(2, 'ETH', 'A', 1, 3010)]}))
+        await stream._dispatch(message('userFills', {'user': ADDRESS_B, 'fills': [fill(3, 'BTC', 'B', 0.1, 60000)]}))
+        await stream._dispatch(message('userFills', {'user': ADDRESS_A, 'fills': [fill(4, 'ETH', 'A', 1, 3100, closed_pnl=100)]}))
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a.positions['ETH'].szi == 1
+    assert a.positions['ETH'].entry_px == 3000
+    assert 'BTC' not in a.positions
+    assert a.cash == 1000 - 1 + 100
+
+    assert b.positions['ETH'].szi == -1
+    assert b.positions['BTC'].szi == 0.1
+    assert b.cash == 500
+
+
+def test_shared_stream_skips_user_events():
+    async def run():
+        stream, a, b = await setup()
+        # no user on userEvents, neither tracker can tell whose funding this is
+        await stream._dispatch(message('user', {'funding': {'coin': 'ETH', 'usdc': '-5'}}))
+        return stream, a, b
+
+    stream, a, b = asyncio.run(run())
+    assert not any(s['type'] == 'userEvents' for s in stream.subscriptions)
+    assert a.cash == 1000
+    assert b.cash == 500
+
+
+def test_liquidation_fill_resyncs_only_its_account():
+    async def run():
+        stream, a, b = await setup()
+        liquidated = dict(fill(5, 'ETH', 'A', 1, 2900), liquidation={'method': 'market'})
+        await stream._dispatch(message('userFills', {'user': ADDRESS_B, 'fills': [liquidated]}))
+        await asyncio.sleep(0)
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a.client.resyncs == 1
+    assert b.client.resyncs == 2
+
+
+def test_closing_to_flat_leaves_no_dust_position():
+    async def run():
+        stream, a, b = await setup()
+        await stream._dispatch(message('userFills', {'user': ADDRESS_A, 'fills': [
+            fill(6, 'ETH', 'B', 0.1, 3000), fill(7, 'ETH', 'B', 0.2, 3010), fill(8, 'ETH', 'A', 0.3, 3020)]}))
+        return a
+
+    a = asyncio.run(run())
+    assert a.positions['ETH'].szi == 0
+    assert a.get_position('ETH')[1] is False
+    assert a.open_symbols() == []
@@ -0,0 +1,49 @@
+'''
+a per-coin close and an acct_min close of everything firing together
+should run one after the other, not cancel each other's closing orders.
+'''
+
+import asyncio
+import os
+
+import eth_account
+
+import risk_daemon
+from hl_ws import HyperliquidStream
+from meta_cache import AssetMetaCache
+from risk_daemon import AccountRisk
+
+
+class FakeKillSwitch:
+    def __init__(self):
+        self.running = 0
+        self.overlapped = False
+        self.calls = []
+
+    async def flatten_all(self, symbols=None):
+        self.running += 1
+        self.overlapped = self.overlapped or self.running > 1
+        self.calls.append(symbols)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return {'time_to_flat_ms': 10}
+
+
+def test_flattens_run_one_at_a_time(monkeypatch):
+    monkeypatch.setenv('RISK_TEST_KEY', eth_account.Account.create().key.hex())
+
+    async def run():
+        acct = AccountRisk({'name': 'test', 'key_env': 'RISK_TEST_KEY'}, HyperliquidStream(), AssetMetaCache())
+        acct.kill = FakeKillSwitch()
+        acct._fire(('close', 'ETH'), 'eth over its limit', ['ETH'])
+        acct._fire(('all',), 'account under acct_min')
+        await asyncio.gather(*acct._actions.values())
+        return acct.kill
+
+    kill = asyncio.run(run())
+    assert kill.calls == [['ETH'], None]
+    assert not kill.overlapped
+
+
+def test_config_file_does_not_depend_on_the_working_directory():
+    assert risk_daemon.CONFIG_FILE == os.path.join(os.path.dirname(os.path.abspath(risk_daemon.__file__)), 'risk_config.json')